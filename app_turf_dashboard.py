@@ -62,6 +62,7 @@ def display_overview():
     """Affiche la vue d'ensemble de la base de données"""
     
     from turf_database_complete import get_turf_database
+    from create_sql_views import ensure_fresh_aggregates
     
     st.header("📊 Vue d'ensemble de la Base de Données")
     
@@ -90,7 +91,14 @@ def display_overview():
             
             try:
                 with st.spinner("Import en cours..."):
-                    stats = import_any_csv(tmp_path)
+                    progress = st.progress(0.0, text="Import en cours...")
+                    stats = import_any_csv(
+                        tmp_path,
+                        stream=True,
+                        progress_callback=lambda lignes, fraction: progress.progress(
+                            fraction, text=f"{lignes:,} lignes lues"
+                        )
+                    )
                     
                 st.success(f"✅ Import réussi !")
                 st.info(f"📊 {stats['courses']} courses, {stats['partants']} partants importés")
@@ -145,20 +153,21 @@ def display_overview():
     # Courses par hippodrome (top 10)
     st.subheader("🏟️ Top 10 Hippodromes")
     
+    ensure_fresh_aggregates(db)
+    
     query = """
         SELECT 
             h.nom,
-            COUNT(c.id) as nb_courses,
-            COUNT(DISTINCT r.date) as nb_jours
-        FROM courses c
-        JOIN reunions r ON c.reunion_id = r.id
-        JOIN hippodromes h ON r.hippodrome_id = h.id
-        GROUP BY h.nom
-        ORDER BY nb_courses DESC
+            mv.nb_courses,
+            mv.nb_jours
+        FROM mv_stats_hippodromes mv
+        JOIN hippodromes h ON mv.hippodrome_id = h.id
+        WHERE mv.nb_courses > 0
+        ORDER BY mv.nb_courses DESC
         LIMIT 10
     """
     
-    df_hippo = pd.read_sql_query(query, db.conn)
+    df_hippo = db.read_sql(query)
     
     col1, col2 = st.columns([2, 1])
     
@@ -271,34 +280,38 @@ def display_cheval_analysis():
     """Analyse des performances des chevaux"""
     
     from turf_database_complete import get_turf_database
+    from create_sql_views import ensure_fresh_aggregates
     
     st.header("🐴 Analyse des Chevaux")
     
     db = get_turf_database()
+    ensure_fresh_aggregates(db)
     
     # Recherche de cheval
     cheval_search = st.text_input("🔍 Rechercher un cheval", placeholder="Nom du cheval...")
     
     if cheval_search:
+        # Recherche plein texte : préfixes de mots, sans accents, par pertinence
         query = """
             SELECT 
                 ch.nom,
                 ch.age,
                 ch.sexe,
                 ch.elo,
-                COUNT(DISTINCT p.id) as nb_courses,
-                COUNT(DISTINCT CASE WHEN p.rang_arrivee = 1 THEN p.id END) as nb_victoires,
-                COUNT(DISTINCT CASE WHEN p.rang_arrivee <= 3 AND p.rang_arrivee > 0 THEN p.id END) as nb_places,
-                ROUND(AVG(p.cote_pmu), 2) as cote_moyenne
-            FROM chevaux ch
-            LEFT JOIN partants p ON ch.id = p.cheval_id
-            WHERE LOWER(ch.nom) LIKE LOWER(?)
-            GROUP BY ch.id, ch.nom, ch.age, ch.sexe, ch.elo
-            ORDER BY nb_courses DESC
+                COALESCE(mv.nb_courses, 0) as nb_courses,
+                COALESCE(mv.nb_victoires, 0) as nb_victoires,
+                COALESCE(mv.nb_places, 0) as nb_places,
+                ROUND(mv.cote_moyenne, 2) as cote_moyenne
+            FROM chevaux_fts
+            JOIN chevaux ch ON ch.id = chevaux_fts.rowid
+            LEFT JOIN mv_perf_chevaux mv ON ch.id = mv.cheval_id
+            WHERE chevaux_fts MATCH ?
+            ORDER BY chevaux_fts.rank, nb_courses DESC
             LIMIT 10
         """
         
-        df = pd.read_sql_query(query, db.conn, params=[f"%{cheval_search}%"])
+        match = db.search_match(cheval_search)
+        df = db.read_sql(query, params=[match]) if match else pd.DataFrame()
         
         if not df.empty:
             st.dataframe(df, use_container_width=True, hide_index=True)
@@ -314,18 +327,16 @@ def display_cheval_analysis():
         SELECT 
             ch.nom,
             ch.elo,
-            COUNT(DISTINCT p.id) as nb_courses,
-            COUNT(DISTINCT CASE WHEN p.rang_arrivee = 1 THEN p.id END) as victoires,
-            COUNT(DISTINCT CASE WHEN p.rang_arrivee <= 3 AND p.rang_arrivee > 0 THEN p.id END) as places
-        FROM chevaux ch
-        LEFT JOIN partants p ON ch.id = p.cheval_id
-        GROUP BY ch.id, ch.nom, ch.elo
-        HAVING nb_courses > 0
-        ORDER BY nb_courses DESC
+            mv.nb_courses,
+            mv.nb_victoires as victoires,
+            mv.nb_places as places
+        FROM mv_perf_chevaux mv
+        JOIN chevaux ch ON mv.cheval_id = ch.id
+        ORDER BY mv.nb_courses DESC
         LIMIT 20
     """
     
-    df_top = pd.read_sql_query(query, db.conn)
+    df_top = db.read_sql(query)
     if not df_top.empty:
         st.dataframe(df_top, use_container_width=True, hide_index=True)
     else:
@@ -336,32 +347,36 @@ def display_driver_analysis():
     """Analyse des performances des drivers"""
     
     from turf_database_complete import get_turf_database
+    from create_sql_views import ensure_fresh_aggregates
     
     st.header("👨‍🏫 Analyse des Drivers")
     
     db = get_turf_database()
+    ensure_fresh_aggregates(db)
     
     # Recherche de driver
     driver_search = st.text_input("🔍 Rechercher un driver", placeholder="Nom du driver...")
     
     if driver_search:
+        # Recherche plein texte : préfixes de mots, sans accents, par pertinence
         query = """
             SELECT 
                 d.nom,
                 d.elo,
-                COUNT(DISTINCT p.id) as nb_courses,
-                COUNT(DISTINCT CASE WHEN p.rang_arrivee = 1 THEN p.id END) as nb_victoires,
-                COUNT(DISTINCT CASE WHEN p.rang_arrivee <= 3 AND p.rang_arrivee > 0 THEN p.id END) as nb_places,
-                ROUND(COUNT(DISTINCT CASE WHEN p.rang_arrivee = 1 THEN p.id END) * 100.0 / NULLIF(COUNT(DISTINCT p.id), 0), 2) as taux_victoire
-            FROM drivers d
-            LEFT JOIN partants p ON d.id = p.driver_id
-            WHERE LOWER(d.nom) LIKE LOWER(?)
-            GROUP BY d.id, d.nom, d.elo
-            ORDER BY nb_courses DESC
+                COALESCE(mv.nb_courses, 0) as nb_courses,
+                COALESCE(mv.nb_victoires, 0) as nb_victoires,
+                COALESCE(mv.nb_places, 0) as nb_places,
+                ROUND(mv.nb_victoires * 100.0 / mv.nb_courses, 2) as taux_victoire
+            FROM drivers_fts
+            JOIN drivers d ON d.id = drivers_fts.rowid
+            LEFT JOIN mv_perf_drivers mv ON d.id = mv.driver_id
+            WHERE drivers_fts MATCH ?
+            ORDER BY drivers_fts.rank, nb_courses DESC
             LIMIT 10
         """
         
-        df = pd.read_sql_query(query, db.conn, params=[f"%{driver_search}%"])
+        match = db.search_match(driver_search)
+        df = db.read_sql(query, params=[match]) if match else pd.DataFrame()
         
         if not df.empty:
             st.dataframe(df, use_container_width=True, hide_index=True)
@@ -377,18 +392,16 @@ def display_driver_analysis():
         SELECT 
             d.nom,
             d.elo,
-            COUNT(DISTINCT p.id) as nb_courses,
-            COUNT(DISTINCT CASE WHEN p.rang_arrivee = 1 THEN p.id END) as victoires,
-            ROUND(COUNT(DISTINCT CASE WHEN p.rang_arrivee = 1 THEN p.id END) * 100.0 / NULLIF(COUNT(DISTINCT p.id), 0), 2) as taux_victoire
-        FROM drivers d
-        LEFT JOIN partants p ON d.id = p.driver_id
-        GROUP BY d.id, d.nom, d.elo
-        HAVING nb_courses > 0
-        ORDER BY nb_courses DESC
+            mv.nb_courses,
+            mv.nb_victoires as victoires,
+            ROUND(mv.nb_victoires * 100.0 / mv.nb_courses, 2) as taux_victoire
+        FROM mv_perf_drivers mv
+        JOIN drivers d ON mv.driver_id = d.id
+        ORDER BY mv.nb_courses DESC
         LIMIT 20
     """
     
-    df_top = pd.read_sql_query(query, db.conn)
+    df_top = db.read_sql(query)
     if not df_top.empty:
         st.dataframe(df_top, use_container_width=True, hide_index=True)
     else:
@@ -32,9 +32,17 @@ def main():
     if uploaded_file is not None:
         with st.sidebar:
             with st.spinner("Import en cours..."):
-                stats = db_adapter.import_csv_file(uploaded_file)
+                progress = st.progress(0.0, text="Import en cours...")
+                stats = db_adapter.import_csv_file(
+                    uploaded_file,
+                    progress_callback=lambda lignes, fraction: progress.progress(
+                        fraction, text=f"{lignes:,} lignes lues"
+                    )
+                )
                 
-                if stats and not stats.get('errors'):
+                if stats and stats.get('deja_importe'):
+                    st.info("⏭️ Fichier déjà importé, rien à faire")
+                elif stats and not stats.get('errors'):
                     st.success(f"✅ Import réussi!")
                     st.info(f"📝 {stats['courses']} courses")
                     st.info(f"🐴 {stats['partants']} partants")
@@ -20,22 +20,22 @@ class BettingInterface:
     
     def _ensure_paris_table(self):
         """Crée la table paris si elle n'existe pas"""
-        self.db.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS paris (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_id INTEGER NOT NULL,
-                type_pari TEXT NOT NULL,
-                numeros TEXT NOT NULL,
-                mise REAL NOT NULL,
-                option TEXT,
-                statut TEXT DEFAULT 'en_attente',
-                resultat TEXT,
-                gain REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
-            )
-        """)
-        self.db.conn.commit()
+        with self.db.connections.write() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS paris (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    course_id INTEGER NOT NULL,
+                    type_pari TEXT NOT NULL,
+                    numeros TEXT NOT NULL,
+                    mise REAL NOT NULL,
+                    option TEXT,
+                    statut TEXT DEFAULT 'en_attente',
+                    resultat TEXT,
+                    gain REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
+                )
+            """)
     
     def save_pari(self, course_code: str, target_date: date, type_pari: str, 
                   numeros: list, mise: float, option: str = None):
@@ -55,13 +55,13 @@ class BettingInterface:
         course_id = result[0]
         
         # Sauvegarder le pari
-        self.db.cursor.execute("""
-            INSERT INTO paris
-            (course_id, type_pari, numeros, mise, option)
-            VALUES (?, ?, ?, ?, ?)
-        """, (course_id, type_pari, ','.join(map(str, numeros)), mise, option))
+        with self.db.connections.write() as cursor:
+            cursor.execute("""
+                INSERT INTO paris
+                (course_id, type_pari, numeros, mise, option)
+                VALUES (?, ?, ?, ?, ?)
+            """, (course_id, type_pari, ','.join(map(str, numeros)), mise, option))
         
-        self.db.conn.commit()
         return True
     
     def get_paris_for_date(self, target_date: date):
@@ -92,8 +92,8 @@ class BettingInterface:
             # Si erreur de colonne, peut-être que la table est mal formée
             if "no such column" in str(e):
                 # Recréer la table
-                self.db.cursor.execute("DROP TABLE IF EXISTS paris")
-                self.db.conn.commit()
+                with self.db.connections.write() as cursor:
+                    cursor.execute("DROP TABLE IF EXISTS paris")
                 self._ensure_paris_table()
             # Retourner DataFrame vide
             return pd.DataFrame()
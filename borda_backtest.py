@@ -0,0 +1,421 @@
+"""
+📈 BACKTEST DES CONFIGURATIONS BORDA
+Rejoue N configurations Borda (borda_configs et custom_bordas.json) sur M
+courses historiques à l'arrivée connue, en opérations matricielles :
+taux de réussite, taux top 3 et ROI simple gagnant par config, et par
+hippodrome / discipline
+"""
+
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from borda_calculator_db import BordaCalculator
+
+
+# Colonnes SQL des critères disponibles pour le backtest (cf. _load_day_runners)
+CRITERE_COLUMNS = ['cote_pmu', 'cote_bzh', 'ia_gagnant', 'ia_couple', 'ia_trio',
+                   'elo_cheval', 'elo_jockey', 'turf_points', 'tpch_90']
+
+CUSTOM_BORDAS_FILE = Path.home() / "bordasAnalyse" / "borda_configs" / "custom_bordas.json"
+
+SEGMENT_COLUMNS = ['hippodrome', 'discipline']
+
+
+class BordaBacktester:
+    """
+    Backtest vectorisé des configurations Borda
+
+    L'historique (partants des courses avec arrivée) est chargé en une
+    requête, puis ses critères normalisés par course sont gardés en cache
+    (matrice partants × critères) : chaque backtest ne fait plus qu'un
+    produit matriciel partants × configs et des réductions par course.
+
+    Note : les ELO sont ceux de la base au moment du backtest (pas ceux du
+    jour de la course).
+    """
+
+    def __init__(self, calculator: BordaCalculator = None):
+        self.calculator = calculator or BordaCalculator()
+        self.db = self.calculator.db
+        self._historiques = {}
+
+    # ==================== HISTORIQUE ====================
+
+    def _load_history_runners(self, date_debut=None, date_fin=None) -> pd.DataFrame:
+        """Partants des courses dont l'arrivée est connue, triés par course"""
+
+        query = """
+            SELECT
+                c.id as course_id,
+                c.course_code,
+                c.discipline,
+                c.nombre_partants,
+                r.date,
+                r.hippodrome_id,
+                h.nom as hippodrome,
+                p.id as partant_id,
+                p.numero,
+                p.cote_pmu,
+                p.cote_bzh,
+                p.ia_gagnant,
+                p.ia_couple,
+                p.ia_trio,
+                ch.elo as elo_cheval,
+                d.elo as elo_jockey,
+                p.turf_points,
+                p.tpch_90,
+                p.rang_arrivee,
+                COALESCE(p.rapport_simple_gagnant,
+                         CASE WHEN p.rang_arrivee = 1 THEN a.rapport_simple_gagnant END) as rapport_gagnant
+            FROM partants p
+            JOIN courses c ON p.course_id = c.id
+            JOIN reunions r ON c.reunion_id = r.id
+            JOIN hippodromes h ON r.hippodrome_id = h.id
+            JOIN chevaux ch ON p.cheval_id = ch.id
+            LEFT JOIN drivers d ON p.driver_id = d.id
+            LEFT JOIN arrivees a ON a.course_id = c.id
+            WHERE p.non_partant = 0
+            AND c.id IN (SELECT course_id FROM partants WHERE rang_arrivee = 1)
+            AND r.date >= ? AND r.date <= ?
+            ORDER BY c.id, p.numero
+        """
+
+        return pd.read_sql_query(query, self.db.conn, params=[
+            str(date_debut) if date_debut else '0000-00-00',
+            str(date_fin) if date_fin else '9999-99-99',
+        ])
+
+    def load_history(self, date_debut=None, date_fin=None) -> dict:
+        """
+        Historique et matrice des critères normalisés (en cache par période)
+
+        Returns:
+            Dict {
+                'courses': DataFrame une ligne par course (périmètre, segments),
+                'debuts': index de la première ligne de chaque course,
+                'course_index': index de course de chaque ligne,
+                'criteres': colonnes de la matrice,
+                'matrice': critères normalisés (partants × critères),
+                'rang', 'gain': arrivée et rapport simple gagnant par partant
+            }
+        """
+
+        cle = (str(date_debut), str(date_fin))
+        if cle in self._historiques:
+            return self._historiques[cle]
+
+        df = self._load_history_runners(date_debut, date_fin)
+
+        debuts = np.flatnonzero(np.r_[True, df['course_id'].to_numpy()[1:] != df['course_id'].to_numpy()[:-1]]) \
+            if len(df) else np.zeros(0, dtype=int)
+        course_index = np.zeros(len(df), dtype=int)
+        course_index[debuts[1:]] = 1
+        course_index = np.cumsum(course_index)
+
+        normalises = self.calculator._normalized_criteria(df, CRITERE_COLUMNS)
+        criteres = list(normalises)
+
+        # Rapport pour 1 € : rapport officiel, à défaut la cote PMU
+        rapport = df['rapport_gagnant'].astype(float).to_numpy()
+        cote = df['cote_pmu'].astype(float).to_numpy()
+
+        historique = {
+            'courses': df.iloc[debuts][['course_id', 'course_code', 'date', 'hippodrome_id',
+                                        'hippodrome', 'discipline', 'nombre_partants']]
+                         .reset_index(drop=True),
+            'debuts': debuts,
+            'course_index': course_index,
+            'criteres': criteres,
+            'matrice': np.column_stack([normalises[c] for c in criteres]) if criteres
+                       else np.zeros((len(df), 0)),
+            'rang': df['rang_arrivee'].astype(float).to_numpy(),
+            'gain': np.nan_to_num(np.where(np.isnan(rapport), cote, rapport)),
+        }
+
+        self._historiques[cle] = historique
+        return historique
+
+    @staticmethod
+    def restrict(historique: dict, course_mask: np.ndarray) -> dict:
+        """Historique limité à une partie de ses courses (mêmes clés que load_history)"""
+
+        lignes = course_mask[historique['course_index']]
+        course_index = historique['course_index'][lignes]
+        nouvel_index = np.cumsum(course_mask) - 1
+
+        return {
+            'courses': historique['courses'][course_mask].reset_index(drop=True),
+            'debuts': np.flatnonzero(np.r_[True, course_index[1:] != course_index[:-1]])
+                      if len(course_index) else np.zeros(0, dtype=int),
+            'course_index': nouvel_index[course_index],
+            'criteres': historique['criteres'],
+            'matrice': historique['matrice'][lignes],
+            'rang': historique['rang'][lignes],
+            'gain': historique['gain'][lignes],
+        }
+
+    def clear_cache(self):
+        """Oublie les historiques chargés (après un import de résultats)"""
+        self._historiques.clear()
+
+    # ==================== CONFIGURATIONS ====================
+
+    @staticmethod
+    def load_json_configs(path=None) -> list:
+        """
+        Configurations de custom_bordas.json au format de load_configs
+        (périmètre par nom d'hippodrome au lieu de hippodrome_id)
+        """
+
+        path = Path(path) if path else CUSTOM_BORDAS_FILE
+        if not path.exists():
+            return []
+
+        with open(path, 'r') as f:
+            custom = json.load(f)
+
+        configs = []
+        for config_id, config in custom.items():
+            if not config.get('criteria'):
+                continue
+
+            nb_min = nb_max = None
+            plage = config.get('nb_partants_range')
+            try:
+                if isinstance(plage, str):
+                    plage = plage.replace('+', '-').split('-')
+                if plage:
+                    nb_min = int(plage[0]) if str(plage[0]).strip() else None
+                    nb_max = int(plage[1]) if len(plage) > 1 and str(plage[1]).strip() else None
+            except:
+                pass
+
+            configs.append({
+                'id': None,
+                'config_id': config_id,
+                'hippodrome': config.get('hippodrome'),
+                'discipline': config.get('discipline'),
+                'nb_partants_min': nb_min,
+                'nb_partants_max': nb_max,
+                'criteria': config['criteria'],
+            })
+
+        return configs
+
+    def load_all_configs(self, json_path=None) -> list:
+        """Configurations actives de la base + celles de custom_bordas.json"""
+        return self.calculator.load_configs() + self.load_json_configs(json_path)
+
+    @staticmethod
+    def _critere_column(critere: str) -> str:
+        """Colonne de l'historique d'un critère de config ('Cote PMU' → 'cote_pmu')"""
+        return critere.replace(' ', '_').lower()
+
+    @classmethod
+    def weight_matrix(cls, configs: list, criteres: list) -> np.ndarray:
+        """
+        Matrice critères × configs (points cumulés par colonne de critère)
+
+        Les critères sans colonne dans l'historique ne comptent pas (cf.
+        unmapped_criteria).
+        """
+
+        W = np.zeros((len(criteres), len(configs)))
+        position = {col: i for i, col in enumerate(criteres)}
+
+        for j, config in enumerate(configs):
+            for critere, points in config['criteria'].items():
+                i = position.get(cls._critere_column(critere))
+                if i is not None:
+                    W[i, j] += points
+
+        return W
+
+    @classmethod
+    def unmapped_criteria(cls, configs: list, criteres: list) -> dict:
+        """Critères de chaque config absents de l'historique {config_id: [critères]}"""
+
+        colonnes = set(criteres)
+        non_mappes = {}
+        for config in configs:
+            absents = [c for c in config['criteria'] if cls._critere_column(c) not in colonnes]
+            if absents:
+                non_mappes[config['config_id']] = absents
+        return non_mappes
+
+    @staticmethod
+    def scope_matrix(courses: pd.DataFrame, configs: list) -> np.ndarray:
+        """Masque courses × configs du périmètre de chaque config"""
+
+        A = np.zeros((len(courses), len(configs)), dtype=bool)
+        hippo_lower = courses['hippodrome'].fillna('').str.lower()
+
+        for j, config in enumerate(configs):
+            mask = BordaCalculator._config_applies(courses, config)
+            if config.get('hippodrome'):
+                mask &= hippo_lower.str.contains(config['hippodrome'].lower(), regex=False).to_numpy()
+            A[:, j] = mask
+
+        return A
+
+    # ==================== BACKTEST ====================
+
+    @staticmethod
+    def pick_rows(historique: dict, W: np.ndarray) -> np.ndarray:
+        """
+        Ligne du cheval classé 1er par chaque config dans chaque course
+        (à égalité de score, le plus petit numéro)
+
+        Returns:
+            np.ndarray courses × configs d'index de lignes
+        """
+
+        # Configs × partants : les réductions par course portent sur des lignes contiguës
+        scores = W.T @ historique['matrice'].T
+        debuts = historique['debuts']
+        n = scores.shape[1]
+
+        if n == 0:
+            return np.zeros((0, W.shape[1]), dtype=int)
+
+        maximum = np.maximum.reduceat(scores, debuts, axis=1)
+        est_max = scores >= maximum[:, historique['course_index']]
+        lignes = np.where(est_max, np.arange(n), n)
+        return np.minimum.reduceat(lignes, debuts, axis=1).T
+
+    def backtest(self, configs: list = None, date_debut=None, date_fin=None) -> dict:
+        """
+        Rejoue les configurations sur l'historique
+
+        Pour chaque course du périmètre d'une config, le cheval classé 1er
+        est joué 1 € simple gagnant.
+
+        Args:
+            configs: Configurations (défaut: load_all_configs())
+            date_debut, date_fin: Période (défaut: tout l'historique)
+
+        Returns:
+            Dict {
+                'global': DataFrame par config (courses, taux_reussite,
+                          taux_top3, mises, gains, roi),
+                'segments': même chose par config × hippodrome × discipline,
+                'courses': nombre de courses de l'historique,
+                'criteres_non_mappes': {config_id: critères ignorés, absents
+                                        de l'historique (cf. CRITERE_COLUMNS)},
+                'configs_exclues': config_id sans aucun critère utilisable
+                                   (absentes de 'global' et 'segments'),
+                'duree': secondes
+            }
+        """
+
+        debut = time.perf_counter()
+
+        if configs is None:
+            configs = self.load_all_configs()
+
+        historique = self.load_history(date_debut, date_fin)
+
+        # Une config dont aucun critère n'est dans l'historique jouerait le
+        # plus petit numéro de chaque course : exclue plutôt que rejouée
+        non_mappes = self.unmapped_criteria(configs, historique['criteres'])
+        utilisables = self.weight_matrix(configs, historique['criteres']).any(axis=0)
+        exclues = [config['config_id'] for config, ok in zip(configs, utilisables) if not ok]
+
+        for config_id, criteres in non_mappes.items():
+            print(f"⚠️ {config_id}: critères ignorés (absents de l'historique) : {', '.join(criteres)}")
+        if exclues:
+            print(f"⚠️ Configs exclues (aucun critère utilisable) : {', '.join(map(str, exclues))}")
+
+        resultat = self.evaluate(historique, [c for c, ok in zip(configs, utilisables) if ok])
+        resultat['criteres_non_mappes'] = non_mappes
+        resultat['configs_exclues'] = exclues
+        resultat['duree'] = time.perf_counter() - debut
+        return resultat
+
+    @classmethod
+    def evaluate(cls, historique: dict, configs: list, par_segment: bool = True) -> dict:
+        """
+        Cœur du backtest sur un historique déjà chargé (cf. backtest)
+
+        Sans accès à la base : utilisable dans un processus séparé.
+        """
+
+        courses = historique['courses']
+
+        W = cls.weight_matrix(configs, historique['criteres'])
+        lignes = cls.pick_rows(historique, W)
+        perimetre = cls.scope_matrix(courses, configs)
+
+        rang = historique['rang'][lignes]
+        victoires = perimetre & (rang == 1)
+        top3 = perimetre & (rang <= 3)
+        gains = np.where(victoires, historique['gain'][lignes], 0.0)
+
+        colonnes = {
+            'courses': perimetre.astype(int),
+            'victoires': victoires.astype(int),
+            'top3': top3.astype(int),
+            'gains': gains,
+        }
+
+        config_ids = [config['config_id'] for config in configs]
+
+        globaux = pd.DataFrame({nom: valeurs.sum(axis=0) for nom, valeurs in colonnes.items()})
+        globaux.insert(0, 'config_id', config_ids)
+
+        if not par_segment:
+            return {'global': cls._add_rates(globaux), 'courses': len(courses)}
+
+        segments = courses[SEGMENT_COLUMNS].fillna('')
+        sommes = []
+        for nom, valeurs in colonnes.items():
+            somme = pd.DataFrame(valeurs, columns=range(len(configs))).groupby(
+                [segments[col] for col in SEGMENT_COLUMNS]
+            ).sum()
+            sommes.append(somme.stack().rename(nom))
+
+        if sommes:
+            segments_df = pd.concat(sommes, axis=1).reset_index()
+            segments_df.columns = SEGMENT_COLUMNS + ['config'] + list(colonnes)
+            segments_df.insert(0, 'config_id', [config_ids[j] for j in segments_df.pop('config')])
+            segments_df = segments_df[segments_df['courses'] > 0].reset_index(drop=True)
+        else:
+            segments_df = pd.DataFrame(columns=['config_id'] + SEGMENT_COLUMNS + list(colonnes))
+
+        return {
+            'global': cls._add_rates(globaux),
+            'segments': cls._add_rates(segments_df),
+            'courses': len(courses),
+        }
+
+    @staticmethod
+    def _add_rates(df: pd.DataFrame) -> pd.DataFrame:
+        """Taux (%) et ROI (%) à partir des compteurs"""
+
+        courses = df['courses'].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df['taux_reussite'] = np.where(courses > 0, df['victoires'] / courses * 100, 0.0)
+            df['taux_top3'] = np.where(courses > 0, df['top3'] / courses * 100, 0.0)
+            df['mises'] = courses
+            df['roi'] = np.where(courses > 0, (df['gains'] - courses) / courses * 100, 0.0)
+        return df
+
+
+if __name__ == "__main__":
+    print("📈 BACKTEST DES CONFIGURATIONS BORDA")
+    print("="*60)
+
+    backtester = BordaBacktester()
+    resultat = backtester.backtest()
+
+    print(f"✅ {resultat['courses']} courses rejouées en {resultat['duree']:.2f}s")
+    print()
+
+    for _, ligne in resultat['global'].sort_values('roi', ascending=False).iterrows():
+        print(f"📊 {ligne['config_id']}: {int(ligne['courses'])} courses - "
+              f"réussite {ligne['taux_reussite']:.1f}% - top 3 {ligne['taux_top3']:.1f}% - "
+              f"ROI {ligne['roi']:+.1f}%")
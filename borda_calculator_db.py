@@ -4,11 +4,20 @@ Calcule et stocke les scores Borda pour toutes les courses
 """
 
 from turf_database_complete import get_turf_database
+import numpy as np
 import pandas as pd
-from datetime import date
+from datetime import date, datetime
+import hashlib
 import json
 
 
+# Version du classement mis en cache (à incrémenter si le calcul ou les
+# colonnes du classement changent : les anciennes entrées ne sont plus lues)
+PREDICTION_ENGINE_VERSION = 'borda-db-1'
+
+PREDICTION_COLUMNS = ['numero', 'cheval', 'driver', 'score_total', 'rang',
+                      'details', 'cote_pmu', 'cote_bzh']
+
 class BordaCalculator:
     """Calcule les scores Borda depuis la DB"""
     
@@ -19,14 +28,14 @@ class BordaCalculator:
     
     def _ensure_default_config(self):
         """S'assure que la config 'default' existe"""
-        self.db.cursor.execute("SELECT id FROM borda_configs WHERE config_id = 'default'")
-        if not self.db.cursor.fetchone():
-            self.db.cursor.execute("""
-                INSERT INTO borda_configs
-                (config_id, nom, description, is_active)
-                VALUES ('default', 'Configuration par défaut', 'Config générique pour toutes les courses', 1)
-            """)
-            self.db.conn.commit()
+        with self.db.connections.write() as cursor:
+            cursor.execute("SELECT id FROM borda_configs WHERE config_id = 'default'")
+            if not cursor.fetchone():
+                cursor.execute("""
+                    INSERT INTO borda_configs
+                    (config_id, nom, description, is_active)
+                    VALUES ('default', 'Configuration par défaut', 'Config générique pour toutes les courses', 1)
+                """)
     
     def _get_config_db_id(self, config_id: str) -> int:
         """Convertit config_id (string) en ID de la DB (integer)"""
@@ -75,96 +84,386 @@ class BordaCalculator:
             if result and result[0]:
                 date_course = result[0]
         
-        # Récupérer les partants de la course
+        # Récupérer les partants de la course (plage contiguë de faits_partants)
         query = """
             SELECT 
-                p.id as partant_id,
-                p.numero,
-                ch.nom as cheval,
-                d.nom as driver,
-                p.cote_pmu,
-                p.cote_bzh,
-                p.ia_gagnant,
-                p.ia_couple,
-                p.ia_trio,
-                ch.elo as elo_cheval,
-                d.elo as elo_jockey,
-                p.turf_points,
-                p.tpch_90
-            FROM partants p
-            JOIN courses c ON p.course_id = c.id
-            JOIN reunions r ON c.reunion_id = r.id
-            JOIN chevaux ch ON p.cheval_id = ch.id
-            LEFT JOIN drivers d ON p.driver_id = d.id
-            WHERE c.course_code = ?
-            AND r.date = ?
-            AND p.non_partant = 0
-            ORDER BY p.numero
+                course_id,
+                partant_id,
+                numero,
+                cheval,
+                driver,
+                cote_pmu,
+                cote_bzh,
+                ia_gagnant,
+                ia_couple,
+                ia_trio,
+                elo_cheval,
+                elo_jockey,
+                turf_points,
+                tpch_90
+            FROM faits_partants
+            WHERE date = ?
+            AND course_code = ?
+            AND non_partant = 0
+            ORDER BY numero
         """
         
-        df = pd.read_sql_query(query, self.db.conn, params=[course_code, date_course])
+        df = pd.read_sql_query(query, self.db.conn, params=[date_course, course_code])
         
         if df.empty:
             return None
         
-        # Calculer le score total
-        df['score_borda'] = 0.0
-        details = {}
-        
-        total_points = sum(criteria.values())
-        
+        return self._compute_scores(df, criteria)
+    
+    @staticmethod
+    def _criteria_columns(df: pd.DataFrame, criteria: dict) -> dict:
+        """Associe chaque critère à sa colonne SQL (critères sans colonne ignorés)"""
+        colonnes = {}
         for critere, points in criteria.items():
             col_name = critere.replace(' ', '_').lower()
-            
-            # Mapper les noms de colonnes
-            if col_name == 'ia_gagnant':
-                col_name = 'ia_gagnant'
-            elif col_name == 'cote_bzh':
-                col_name = 'cote_bzh'
-            elif col_name == 'elo_cheval':
-                col_name = 'elo_cheval'
-            elif col_name == 'elo_jockey':
-                col_name = 'elo_jockey'
-            
             if col_name in df.columns:
-                # Calculer le score pour ce critère
-                values = df[col_name].fillna(0)
-                
-                # Pour les cotes : inverse (meilleure cote = meilleur score)
-                if 'cote' in col_name:
-                    # Inverser : cote basse = score élevé
-                    max_val = values.max()
-                    if max_val > 0:
-                        normalized = (max_val - values) / max_val
-                    else:
-                        normalized = 0
-                else:
-                    # Pour les autres : valeur haute = score élevé
-                    max_val = values.max()
-                    if max_val > 0:
-                        normalized = values / max_val
-                    else:
-                        normalized = 0
-                
-                score_critere = normalized * points
-                df['score_borda'] += score_critere
-                details[critere] = score_critere.tolist()
+                colonnes[critere] = col_name
+        return colonnes
+    
+    def _normalized_criteria(self, df: pd.DataFrame, criteres) -> dict:
+        """
+        Ramène chaque critère à [0, 1] par rapport au maximum de sa course
+        (colonne course_id), inversé pour les cotes : cote basse = score élevé
+        
+        Returns:
+            Dict {critère: np.ndarray} (critères sans colonne ignorés)
+        """
+        
+        normalises = {}
+        
+        for critere, col_name in self._criteria_columns(df, dict.fromkeys(criteres)).items():
+            values = df[col_name].astype(float).fillna(0).to_numpy()
+            max_val = self._course_max(values, df['course_id'].to_numpy())
+            normalises[critere] = self._normalize(values, max_val, col_name)
+        
+        return normalises
+    
+    @staticmethod
+    def _course_max(values: np.ndarray, course_ids: np.ndarray) -> np.ndarray:
+        """Maximum de la course de chaque ligne"""
+        return pd.Series(values).groupby(course_ids, sort=False).transform('max').to_numpy()
+    
+    @staticmethod
+    def _normalize(values: np.ndarray, max_val: np.ndarray, col_name: str) -> np.ndarray:
+        """Valeur / maximum de la course (inversé pour les cotes), 0 si maximum nul"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if 'cote' in col_name:
+                return np.where(max_val > 0, (max_val - values) / max_val, 0.0)
+            return np.where(max_val > 0, values / max_val, 0.0)
+    
+    @staticmethod
+    def _details_json(criteres, scores_criteres, scores_finaux) -> list:
+        """Sérialise le détail par critère de chaque partant"""
+        return [
+            json.dumps({
+                'criteres': {k: float(v) for k, v in zip(criteres, valeurs)},
+                'score_final': float(final)
+            })
+            for valeurs, final in zip(
+                zip(*scores_criteres) if len(scores_criteres) else [()] * len(scores_finaux),
+                scores_finaux
+            )
+        ]
+    
+    def _compute_scores(self, df: pd.DataFrame, criteria: dict) -> pd.DataFrame:
+        """
+        Calcule score_borda, rang_borda et details pour une ou plusieurs
+        courses (normalisation par course via la colonne course_id)
+        
+        Chaque critère normalisé est pondéré par ses points puis le total
+        est ramené sur 100.
+        """
+        
+        df = df.reset_index(drop=True)
+        total_points = sum(criteria.values())
+        
+        details = {
+            critere: normalized * criteria[critere]
+            for critere, normalized in self._normalized_criteria(df, criteria).items()
+        }
+        score = np.zeros(len(df))
+        for score_critere in details.values():
+            score += score_critere
         
         # Normaliser sur le total des points
         if total_points > 0:
-            df['score_borda'] = (df['score_borda'] / total_points) * 100
+            score = score / total_points * 100
+        
+        df['score_borda'] = score
         
-        # Ajouter le rang
-        df['rang_borda'] = df['score_borda'].rank(ascending=False, method='min').astype(int)
+        # Ajouter le rang (par course)
+        df['rang_borda'] = df.groupby('course_id', sort=False)['score_borda'].rank(
+            ascending=False, method='min'
+        ).astype(int)
         
         # Stocker les détails
-        df['details'] = df.apply(lambda row: json.dumps({
-            'criteres': {k: v[row.name] for k, v in details.items()},
-            'score_final': row['score_borda']
-        }), axis=1)
+        df['details'] = self._details_json(list(details), list(details.values()), score)
         
         return df
     
+    def calculate_borda_for_day(self, target_date: date, criteria: dict = None) -> pd.DataFrame:
+        """
+        Calcule les scores Borda de toutes les courses d'une date
+        
+        Une seule requête charge tous les partants du jour ; la normalisation
+        se fait par course sur les colonnes entières.
+        
+        Args:
+            target_date: Date des courses
+            criteria: Dict des critères et leurs poids
+        
+        Returns:
+            DataFrame (course_code, hippodrome, partant_id, score_borda, rang_borda, details...)
+        """
+        
+        if criteria is None:
+            criteria = self.get_default_criteria()
+        
+        df = self._load_day_runners(target_date)
+        
+        if df.empty:
+            return df
+        
+        return self._compute_scores(df, criteria)
+    
+    def _load_day_runners(self, target_date: date) -> pd.DataFrame:
+        """Tous les partants d'une date, avec les colonnes des critères"""
+        
+        query = """
+            SELECT 
+                course_id,
+                course_code,
+                discipline,
+                nombre_partants,
+                hippodrome_id,
+                hippodrome,
+                partant_id,
+                numero,
+                cheval,
+                driver,
+                cote_pmu,
+                cote_bzh,
+                ia_gagnant,
+                ia_couple,
+                ia_trio,
+                elo_cheval,
+                elo_jockey,
+                turf_points,
+                tpch_90
+            FROM faits_partants
+            WHERE date = ?
+            AND non_partant = 0
+            ORDER BY course_code, numero
+        """
+        
+        return pd.read_sql_query(query, self.db.conn, params=[str(target_date)])
+    
+    def save_borda_scores_batch(self, df: pd.DataFrame, config_id: str = 'default'):
+        """
+        Sauvegarde en une fois les scores de calculate_borda_for_day
+        (partant_id déjà présent dans le DataFrame)
+        """
+        
+        config_db_id = self._get_config_db_id(config_id)
+        
+        with self.db.connections.write() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO borda_scores
+                (partant_id, config_id, score_total, rang, details)
+                VALUES (?, ?, ?, ?, ?)
+            """, zip(
+                df['partant_id'].astype(int).tolist(),
+                [config_db_id] * len(df),
+                df['score_borda'].astype(float).tolist(),
+                df['rang_borda'].astype(int).tolist(),
+                df['details'].tolist()
+            ))
+    
+    # ==================== ÉVALUATION MULTI-CONFIGS ====================
+    
+    def load_configs(self, active_only: bool = True) -> list:
+        """
+        Charge les configurations Borda stockées et leurs critères
+        
+        La config 'default' sans critères en base utilise get_default_criteria().
+        
+        Returns:
+            Liste de dicts (id, config_id, hippodrome_id, discipline,
+            nb_partants_min, nb_partants_max, criteria)
+        """
+        
+        configs = pd.read_sql_query(f"""
+            SELECT id, config_id, hippodrome_id, discipline, nb_partants_min, nb_partants_max
+            FROM borda_configs
+            {'WHERE is_active = 1' if active_only else ''}
+            ORDER BY id
+        """, self.db.conn)
+        
+        criteres = pd.read_sql_query(
+            "SELECT config_id, critere_nom, points FROM borda_criteres", self.db.conn
+        )
+        par_config = {
+            config_id: dict(zip(groupe['critere_nom'], groupe['points']))
+            for config_id, groupe in criteres.groupby('config_id')
+        }
+        
+        result = []
+        for config in configs.to_dict('records'):
+            criteria = par_config.get(config['id'])
+            if not criteria:
+                if config['config_id'] != 'default':
+                    continue
+                criteria = self.get_default_criteria()
+            config['criteria'] = criteria
+            result.append(config)
+        
+        return result
+    
+    @staticmethod
+    def _config_applies(df: pd.DataFrame, config: dict) -> np.ndarray:
+        """Masque des partants dont la course entre dans le périmètre de la config"""
+        
+        mask = np.ones(len(df), dtype=bool)
+        if pd.notna(config.get('hippodrome_id')):
+            mask &= (df['hippodrome_id'] == config['hippodrome_id']).to_numpy()
+        if pd.notna(config.get('discipline')) and config['discipline']:
+            mask &= (df['discipline'].fillna('').str.upper() == config['discipline'].upper()).to_numpy()
+        if pd.notna(config.get('nb_partants_min')):
+            mask &= (df['nombre_partants'].fillna(0) >= config['nb_partants_min']).to_numpy()
+        if pd.notna(config.get('nb_partants_max')):
+            mask &= (df['nombre_partants'].fillna(0) <= config['nb_partants_max']).to_numpy()
+        return mask
+    
+    def calculate_borda_matrix(self, target_date: date, configs: list = None) -> pd.DataFrame:
+        """
+        Calcule en une passe les scores de toutes les configurations pour une date
+        
+        Les critères normalisés sont calculés une seule fois (matrice
+        partants × critères) puis multipliés par la matrice des poids
+        (critères × configs) : scores et rangs de chaque config en une opération.
+        
+        Args:
+            target_date: Date des courses
+            configs: Configurations (défaut: load_configs())
+        
+        Returns:
+            DataFrame long (partant_id, course_id, course_code, config_db_id,
+            config_id, score_borda, rang_borda, details), limité au
+            périmètre de chaque config
+        """
+        
+        if configs is None:
+            configs = self.load_configs()
+        
+        df = self._load_day_runners(target_date)
+        
+        if df.empty or not configs:
+            return pd.DataFrame()
+        
+        # Matrice partants × critères (union des critères de toutes les configs)
+        tous_criteres = list(dict.fromkeys(c for config in configs for c in config['criteria']))
+        normalises = self._normalized_criteria(df, tous_criteres)
+        criteres = list(normalises)
+        N = np.column_stack([normalises[c] for c in criteres]) if criteres else np.zeros((len(df), 0))
+        
+        # Matrice critères × configs, total des points de chaque config
+        W = np.array([[config['criteria'].get(c, 0) for config in configs] for c in criteres],
+                     dtype=float).reshape(len(criteres), len(configs))
+        totaux = np.array([sum(config['criteria'].values()) for config in configs], dtype=float)
+        
+        scores = N @ W
+        scores = np.where(totaux > 0, scores / np.where(totaux > 0, totaux, 1) * 100, scores)
+        
+        # Rangs par course pour toutes les configs
+        rangs = pd.DataFrame(scores).groupby(df['course_id'].to_numpy(), sort=False).rank(
+            ascending=False, method='min'
+        ).to_numpy().astype(int)
+        
+        resultats = []
+        for j, config in enumerate(configs):
+            mask = self._config_applies(df, config)
+            if not mask.any():
+                continue
+            
+            utilises = [i for i, c in enumerate(criteres) if c in config['criteria']]
+            resultat = df.loc[mask, ['partant_id', 'course_id', 'course_code', 'numero']].copy()
+            resultat['config_db_id'] = config['id']
+            resultat['config_id'] = config['config_id']
+            resultat['score_borda'] = scores[mask, j]
+            resultat['rang_borda'] = rangs[mask, j]
+            resultat['details'] = self._details_json(
+                [criteres[i] for i in utilises],
+                [N[mask, i] * W[i, j] for i in utilises],
+                scores[mask, j]
+            )
+            resultats.append(resultat)
+        
+        if not resultats:
+            return pd.DataFrame()
+        
+        return pd.concat(resultats, ignore_index=True)
+    
+    def save_borda_matrix(self, df: pd.DataFrame):
+        """Sauvegarde en une transaction les scores de calculate_borda_matrix"""
+        
+        with self.db.connections.write() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO borda_scores
+                (partant_id, config_id, score_total, rang, details)
+                VALUES (?, ?, ?, ?, ?)
+            """, zip(
+                df['partant_id'].astype(int).tolist(),
+                df['config_db_id'].astype(int).tolist(),
+                df['score_borda'].astype(float).tolist(),
+                df['rang_borda'].astype(int).tolist(),
+                df['details'].tolist()
+            ))
+    
+    def calculate_all_configs(self, target_date: date = None):
+        """
+        Calcule et enregistre les scores de toutes les configurations actives
+        
+        Returns:
+            Dict avec stats de calcul
+        """
+        
+        if target_date is None:
+            target_date = datetime.now().date()
+        
+        stats = {
+            'configs': 0,
+            'courses_calculees': 0,
+            'scores_enregistres': 0,
+            'erreurs': []
+        }
+        
+        try:
+            df = self.calculate_borda_matrix(target_date)
+            
+            if df.empty:
+                print(f"⚠️  Aucun partant trouvé pour le {target_date}")
+                return stats
+            
+            self.save_borda_matrix(df)
+            
+            for config_id, nb in df.groupby('config_id', sort=False)['course_id'].nunique().items():
+                print(f"📊 Config {config_id}: ✅ {nb} courses")
+            
+            stats['configs'] = df['config_id'].nunique()
+            stats['courses_calculees'] = df['course_id'].nunique()
+            stats['scores_enregistres'] = len(df)
+        
+        except Exception as e:
+            stats['erreurs'].append(f"{target_date}: {e}")
+            print(f"   ❌ Erreur: {e}")
+        
+        return stats
+    
     def save_borda_scores(self, course_code: str, df: pd.DataFrame, config_id: str = 'default', date_course: date = None):
         """
         Sauvegarde les scores Borda dans la DB
@@ -190,91 +489,125 @@ class BordaCalculator:
             if result and result[0]:
                 date_course = result[0]
         
-        for _, row in df.iterrows():
-            # Récupérer le vrai partant_id depuis la DB avec la date
-            self.db.cursor.execute("""
-                SELECT p.id FROM partants p
-                JOIN courses c ON p.course_id = c.id
-                JOIN reunions r ON c.reunion_id = r.id
-                WHERE c.course_code = ? 
-                AND p.numero = ?
-                AND r.date = ?
-            """, (course_code, row['numero'], date_course))
-            
-            result = self.db.cursor.fetchone()
-            if not result:
-                continue
-            
-            partant_id = result[0]
-            
-            self.db.cursor.execute("""
-                INSERT OR REPLACE INTO borda_scores
-                (partant_id, config_id, score_total, rang, details)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                partant_id,
-                config_db_id,  # Utiliser l'ID integer
-                row['score_borda'],
-                row['rang_borda'],
-                row['details']
-            ))
-        
-        self.db.conn.commit()
+        # Lectures et écritures sur le curseur de l'écrivain (une transaction)
+        with self.db.connections.write() as cursor:
+            for _, row in df.iterrows():
+                # Récupérer le vrai partant_id depuis la DB avec la date
+                cursor.execute("""
+                    SELECT p.id FROM partants p
+                    JOIN courses c ON p.course_id = c.id
+                    JOIN reunions r ON c.reunion_id = r.id
+                    WHERE c.course_code = ? 
+                    AND p.numero = ?
+                    AND r.date = ?
+                """, (course_code, row['numero'], date_course))
+                
+                result = cursor.fetchone()
+                if not result:
+                    continue
+                
+                partant_id = result[0]
+                
+                cursor.execute("""
+                    INSERT OR REPLACE INTO borda_scores
+                    (partant_id, config_id, score_total, rang, details)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (
+                    partant_id,
+                    config_db_id,  # Utiliser l'ID integer
+                    row['score_borda'],
+                    row['rang_borda'],
+                    row['details']
+                ))
     
-    def calculate_all_today(self, target_date: date = None):
+    def calculate_all_today(self, target_date: date = None, incremental: bool = False):
         """
         Calcule les scores Borda pour toutes les courses d'une date
         
+        Le jour est calculé et écrit en une passe ; si cette passe échoue,
+        rien n'est écrit et les courses sont reprises une par une : une
+        course en erreur est notée dans stats['erreurs'] sans empêcher
+        l'enregistrement des autres.
+        
         Args:
             target_date: Date cible (défaut: aujourd'hui)
+            incremental: Ne recalculer que les critères / courses dont les
+                         données ont changé et ne réécrire que les scores qui
+                         ont bougé (voir calculate_borda_incremental)
         
         Returns:
             Dict avec stats de calcul
         """
         
         if target_date is None:
-            from datetime import datetime
             target_date = datetime.now().date()
         
-        # Récupérer toutes les courses de la date
-        query = """
-            SELECT DISTINCT c.course_code, c.nombre_partants, h.nom as hippodrome
-            FROM courses c
-            JOIN reunions r ON c.reunion_id = r.id
-            JOIN hippodromes h ON r.hippodrome_id = h.id
-            WHERE r.date = ?
-            ORDER BY c.course_code
-        """
-        
-        courses = pd.read_sql_query(query, self.db.conn, params=[target_date])
-        
         stats = {
             'courses_calculees': 0,
             'partants_analyses': 0,
             'erreurs': []
         }
         
+        try:
+            if incremental:
+                df, recalculees = self.calculate_borda_incremental(target_date, self.get_default_criteria())
+            else:
+                df = self.calculate_borda_for_day(target_date, self.get_default_criteria())
+            
+            if df.empty:
+                print(f"⚠️  Aucun partant trouvé pour le {target_date}")
+                return stats
+            
+            if incremental:
+                stats['courses_recalculees'] = len(recalculees)
+                stats['scores_reecrits'] = self.save_changed_borda_scores(df, target_date, 'default')
+                df_affiche = df[df['course_id'].isin(recalculees)]
+            else:
+                self.save_borda_scores_batch(df, 'default')
+                df_affiche = df
+            
+            for (course_code, hippodrome), nb in df_affiche.groupby(['course_code', 'hippodrome'], sort=False).size().items():
+                print(f"📊 Borda {course_code} ({hippodrome}): ✅ {nb} partants analysés")
+            
+            stats['courses_calculees'] = df['course_id'].nunique()
+            stats['partants_analyses'] = len(df)
+        
+        except Exception as e:
+            print(f"   ⚠️  Calcul groupé du {target_date} impossible ({e}) : reprise course par course")
+            self._calculate_courses_separately(target_date, stats)
+        
+        return stats
+    
+    def _calculate_courses_separately(self, target_date: date, stats: dict):
+        """Calcule et enregistre chaque course de la date isolément (une transaction par course)"""
+        
+        courses = self.db.read_sql("""
+            SELECT c.course_code, h.nom as hippodrome
+            FROM courses c
+            JOIN reunions r ON c.reunion_id = r.id
+            JOIN hippodromes h ON r.hippodrome_id = h.id
+            WHERE r.date = ?
+            ORDER BY c.course_code
+        """, params=[str(target_date)])
+        
         criteria = self.get_default_criteria()
+        stats['courses_calculees'] = 0
+        stats['partants_analyses'] = 0
         
-        for _, course in courses.iterrows():
+        for course_code, hippodrome in courses.itertuples(index=False):
             try:
-                print(f"📊 Calcul Borda pour {course['course_code']} ({course['hippodrome']})...")
+                df = self.calculate_borda_for_course(course_code, criteria, target_date)
+                if df is None or df.empty:
+                    continue
                 
-                df = self.calculate_borda_for_course(course['course_code'], criteria, target_date)
-                
-                if df is not None and not df.empty:
-                    self.save_borda_scores(course['course_code'], df, 'default', target_date)
-                    stats['courses_calculees'] += 1
-                    stats['partants_analyses'] += len(df)
-                    print(f"   ✅ {len(df)} partants analysés")
-                else:
-                    print(f"   ⚠️  Aucun partant trouvé")
+                self.save_borda_scores_batch(df, 'default')
+                stats['courses_calculees'] += 1
+                stats['partants_analyses'] += len(df)
+                print(f"📊 Borda {course_code} ({hippodrome}): ✅ {len(df)} partants analysés")
             
             except Exception as e:
-                stats['erreurs'].append(f"{course['course_code']}: {e}")
-                print(f"   ❌ Erreur: {e}")
-        
-        return stats
+                stats['erreurs'].append(f"{course_code}: {e}")
+                print(f"📊 Borda {course_code} ({hippodrome}): ❌ Erreur: {e}")
     
     def get_borda_scores_for_course(self, course_code: str, config_id: str = 'default', date_course: date = None):
         """
@@ -303,6 +636,26 @@ class BordaCalculator:
             if result and result[0]:
                 date_course = result[0]
         
+        # Config 'default' : scores dénormalisés dans faits_partants
+        if config_id == 'default':
+            query = """
+                SELECT 
+                    numero,
+                    cheval,
+                    driver,
+                    borda_score as score_total,
+                    borda_rang as rang,
+                    borda_details as details,
+                    cote_pmu,
+                    cote_bzh
+                FROM faits_partants
+                WHERE date = ?
+                AND course_code = ?
+                AND borda_score IS NOT NULL
+                ORDER BY borda_rang
+            """
+            return pd.read_sql_query(query, self.db.conn, params=[date_course, course_code])
+        
         query = """
             SELECT 
                 p.numero,
@@ -327,31 +680,279 @@ class BordaCalculator:
         
         return pd.read_sql_query(query, self.db.conn, params=[course_code, config_db_id, date_course])
 
+    # ==================== CACHE DES PRONOSTICS ====================
+    
+    def weights_fingerprint(self, config_id: str = 'default') -> str:
+        """Empreinte des poids d'une config (critères en base + critères par défaut)"""
+        self.db.cursor.execute("""
+            SELECT bc.critere_nom, bc.points FROM borda_criteres bc
+            JOIN borda_configs c ON bc.config_id = c.id
+            WHERE c.config_id = ?
+            ORDER BY bc.critere_nom
+        """, (config_id,))
+        contenu = {'config': config_id, 'criteres': self.db.cursor.fetchall()}
+        if config_id == 'default':
+            contenu['defaut'] = self.get_default_criteria()
+        return hashlib.sha1(json.dumps(contenu, sort_keys=True).encode()).hexdigest()
+    
+    def _load_day_scores(self, target_date: date, config_db_id: int) -> pd.DataFrame:
+        """Scores Borda stockés de toutes les courses d'une date (une requête)"""
+        query = """
+            SELECT 
+                c.course_code,
+                c.id as course_id,
+                p.numero,
+                ch.nom as cheval,
+                d.nom as driver,
+                bs.score_total,
+                bs.rang,
+                bs.details,
+                p.cote_pmu,
+                p.cote_bzh
+            FROM borda_scores bs
+            JOIN partants p ON bs.partant_id = p.id
+            JOIN courses c ON p.course_id = c.id
+            JOIN reunions r ON c.reunion_id = r.id
+            JOIN chevaux ch ON p.cheval_id = ch.id
+            LEFT JOIN drivers d ON p.driver_id = d.id
+            WHERE bs.config_id = ?
+            AND r.date = ?
+            ORDER BY c.course_code, bs.rang
+        """
+        return pd.read_sql_query(query, self.db.conn, params=[config_db_id, str(target_date)])
+    
+    def get_day_predictions(self, target_date: date, course_codes: list = None,
+                            config_id: str = 'default') -> dict:
+        """
+        Classements Borda de toutes les courses d'une date, via le cache
+        
+        Le cache est lu en une requête indexée ; seules les courses absentes
+        (jamais calculées, ou invalidées par un import / recalcul) sont
+        relues depuis borda_scores, en une requête pour le jour, puis mises
+        en cache.
+        
+        Args:
+            target_date: Date des courses
+            course_codes: Courses attendues (défaut: celles du cache uniquement)
+            config_id: ID de la configuration (string, ex: 'default')
+        
+        Returns:
+            Dict {course_code: DataFrame classé par rang}
+        """
+        cle = (target_date, PREDICTION_ENGINE_VERSION, self.weights_fingerprint(config_id))
+        
+        cached = self.db.get_cached_predictions(*cle)
+        predictions = {
+            course_code: pd.DataFrame(json.loads(contenu), columns=PREDICTION_COLUMNS)
+            for course_code, contenu in cached.items()
+        }
+        
+        manquantes = [c for c in (course_codes or []) if c not in predictions]
+        if not manquantes:
+            return predictions
+        
+        scores = self._load_day_scores(target_date, self._get_config_db_id(config_id))
+        scores = scores[scores['course_code'].isin(manquantes)]
+        
+        entries = []
+        for (course_code, course_id), course_df in scores.groupby(['course_code', 'course_id'], sort=False):
+            classement = course_df[PREDICTION_COLUMNS].reset_index(drop=True)
+            predictions[course_code] = classement
+            entries.append((course_code, int(course_id), json.dumps(classement.to_dict('records'))))
+        
+        if entries:
+            self.db.store_cached_predictions(*cle, entries)
+        
+        return predictions
+    
+    # ==================== CALCUL INCRÉMENTAL ====================
+    
+    def calculate_borda_incremental(self, target_date: date, criteria: dict = None,
+                                    config_id: str = 'default'):
+        """
+        Recalcule les scores Borda d'une date en ne reprenant que ce qui a bougé
+        
+        Le dernier calcul de la date est conservé (valeurs d'entrée, critères
+        normalisés et maxima par course) : un critère n'est renormalisé que
+        sur les lignes dont la valeur a changé (ou toute la course si son
+        maximum a bougé), et seules les courses dont un critère normalisé a
+        changé sont rescorées et reclassées. Sans calcul précédent (ou si les
+        partants d'une course changent), la course est recalculée entièrement.
+        
+        Le résultat est identique à calculate_borda_for_day.
+        
+        Returns:
+            (DataFrame comme calculate_borda_for_day, set des course_id recalculés)
+        """
+        
+        if criteria is None:
+            criteria = self.get_default_criteria()
+        
+        df = self._load_day_runners(target_date)
+        
+        if df.empty:
+            return df, set()
+        
+        cle = (str(target_date), config_id, tuple(criteria.items()))
+        etat = self.db.incremental_states.get(cle)
+        
+        n = len(df)
+        ids = df['partant_id'].to_numpy()
+        courses = df['course_id'].to_numpy()
+        
+        # Position de chaque partant dans le calcul précédent (-1 : nouveau)
+        if etat is None:
+            position = np.full(n, -1)
+            recomposees = np.ones(n, dtype=bool)
+        else:
+            position = pd.Index(etat['partant_id']).get_indexer(ids)
+            retires = ~np.isin(etat['partant_id'], ids)
+            recomposees = np.isin(courses, np.concatenate([courses[position < 0],
+                                                           etat['course_id'][retires]]))
+        
+        def reprendre(nom, critere=None, defaut=np.nan):
+            """Valeurs du calcul précédent réalignées sur les partants actuels"""
+            if etat is None or (critere is not None and critere not in etat[nom]):
+                return np.full(n, defaut, dtype=object if nom == 'details' else float)
+            ancien = etat[nom] if critere is None else etat[nom][critere]
+            return np.where(position >= 0, ancien[position], defaut)
+        
+        entrees, normalises, maximums = {}, {}, {}
+        a_reclasser = recomposees.copy()
+        
+        for critere, col_name in self._criteria_columns(df, criteria).items():
+            valeurs = df[col_name].astype(float).fillna(0).to_numpy()
+            ancien_max = reprendre('maximums', critere)
+            normalise = reprendre('normalises', critere)
+            
+            # Lignes dont la valeur a changé, puis maximum des courses touchées
+            sales = recomposees | (reprendre('entrees', critere) != valeurs)
+            maximum = ancien_max.copy()
+            if sales.any():
+                touchees = np.isin(courses, courses[sales])
+                maximum[touchees] = self._course_max(valeurs[touchees], courses[touchees])
+                
+                a_normaliser = sales | (touchees & (maximum != ancien_max))
+                normalise[a_normaliser] = self._normalize(valeurs[a_normaliser],
+                                                          maximum[a_normaliser], col_name)
+            
+            bouge = normalise != reprendre('normalises', critere)
+            a_reclasser |= np.isin(courses, courses[bouge])
+            
+            entrees[critere], normalises[critere], maximums[critere] = valeurs, normalise, maximum
+        
+        # Scores, rangs et détails des seules courses touchées
+        score = reprendre('score')
+        rang = reprendre('rang', defaut=0).astype(int)
+        details = reprendre('details', defaut=None)
+        
+        if a_reclasser.any():
+            scores_criteres = [normalises[c][a_reclasser] * criteria[c] for c in normalises]
+            nouveau = np.zeros(int(a_reclasser.sum()))
+            for score_critere in scores_criteres:
+                nouveau += score_critere
+            
+            total_points = sum(criteria.values())
+            if total_points > 0:
+                nouveau = nouveau / total_points * 100
+            
+            score[a_reclasser] = nouveau
+            rang[a_reclasser] = pd.Series(nouveau).groupby(courses[a_reclasser], sort=False).rank(
+                ascending=False, method='min'
+            ).astype(int).to_numpy()
+            details[a_reclasser] = self._details_json(list(normalises), scores_criteres, nouveau)
+        
+        self.db.incremental_states.put(cle, {
+            'partant_id': ids,
+            'course_id': courses,
+            'entrees': entrees,
+            'normalises': normalises,
+            'maximums': maximums,
+            'score': score,
+            'rang': rang,
+            'details': details,
+        })
+        
+        df['score_borda'] = score
+        df['rang_borda'] = rang
+        df['details'] = details.tolist()
+        
+        return df, set(courses[a_reclasser].tolist())
+    
+    def save_changed_borda_scores(self, df: pd.DataFrame, target_date: date,
+                                  config_id: str = 'default') -> int:
+        """
+        Ne réécrit que les scores absents de la base ou dont le score, le rang
+        ou le détail diffère de la valeur stockée
+        
+        Returns:
+            Nombre de scores réécrits
+        """
+        
+        config_db_id = self._get_config_db_id(config_id)
+        
+        stockes = pd.read_sql_query("""
+            SELECT bs.partant_id, bs.score_total, bs.rang, bs.details
+            FROM borda_scores bs
+            JOIN partants p ON bs.partant_id = p.id
+            JOIN courses c ON p.course_id = c.id
+            JOIN reunions r ON c.reunion_id = r.id
+            WHERE bs.config_id = ?
+            AND r.date = ?
+        """, self.db.conn, params=[config_db_id, str(target_date)])
+        
+        stockes = stockes.set_index('partant_id').reindex(df['partant_id'])
+        modifies = ~(
+            (stockes['score_total'].to_numpy() == df['score_borda'].to_numpy()) &
+            (stockes['rang'].to_numpy() == df['rang_borda'].to_numpy()) &
+            (stockes['details'].to_numpy() == df['details'].to_numpy())
+        )
+        
+        if modifies.any():
+            self.save_borda_scores_batch(df[modifies], config_id)
+        
+        return int(modifies.sum())
+
 
-def calculate_borda_for_date(target_date: date = None):
+def calculate_borda_for_date(target_date: date = None, all_configs: bool = False,
+                             incremental: bool = False):
     """
     Fonction utilitaire pour calculer les scores du jour
+    (config 'default', ou toutes les configs actives si all_configs)
     """
     calculator = BordaCalculator()
-    return calculator.calculate_all_today(target_date)
+    if all_configs:
+        return calculator.calculate_all_configs(target_date)
+    return calculator.calculate_all_today(target_date, incremental=incremental)
 
 
 if __name__ == "__main__":
-    from datetime import datetime
+    import sys
     
     print("🎯 CALCUL DES SCORES BORDA")
     print("="*60)
     
     calculator = BordaCalculator()
     
-    # Calculer pour aujourd'hui
-    stats = calculator.calculate_all_today()
+    # Calculer pour aujourd'hui (--all-configs : toutes les configs actives,
+    # --incremental : ne réécrire que les scores qui ont bougé)
+    if '--all-configs' in sys.argv[1:]:
+        stats = calculator.calculate_all_configs()
+    else:
+        stats = calculator.calculate_all_today(incremental='--incremental' in sys.argv[1:])
     
     print("\n" + "="*60)
     print("📊 RÉSULTAT")
     print("="*60)
     print(f"✅ Courses calculées: {stats['courses_calculees']}")
-    print(f"✅ Partants analysés: {stats['partants_analyses']}")
+    if 'scores_enregistres' in stats:
+        print(f"✅ Configs évaluées: {stats['configs']}")
+        print(f"✅ Scores enregistrés: {stats['scores_enregistres']}")
+    else:
+        print(f"✅ Partants analysés: {stats['partants_analyses']}")
+    if 'scores_reecrits' in stats:
+        print(f"✅ Courses recalculées: {stats['courses_recalculees']}")
+        print(f"✅ Scores réécrits: {stats['scores_reecrits']}")
     
     if stats['erreurs']:
         print(f"\n⚠️  Erreurs: {len(stats['erreurs'])}")
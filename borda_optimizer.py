@@ -0,0 +1,495 @@
+"""
+🔧 OPTIMISATION DES POIDS BORDA
+Recherche des poids Borda par (hippodrome, discipline, tranche de partants) :
+grille, tirage aléatoire ou descente par coordonnées, candidats évalués en
+parallèle par le backtest vectorisé, validés sur une période réservée puis
+enregistrés comme nouvelles configs dans borda_configs
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from borda_backtest import BordaBacktester, CRITERE_COLUMNS
+from borda_routing import FIELD_SIZE_BUCKETS, field_size_bucket
+
+
+CHECKPOINT_DIR = Path.home() / "bordasAnalyse" / "optimisation"
+
+STRATEGIES = ('grille', 'aleatoire', 'coordonnees')
+OBJECTIVES = ('taux_reussite', 'taux_top3', 'roi')
+
+METRIC_COLUMNS = ['courses', 'taux_reussite', 'taux_top3', 'roi']
+
+
+# ==================== PROCESSUS DE CALCUL ====================
+
+# Historiques (entraînement / validation) du processus, reçus une fois à
+# l'initialisation du pool pour ne pas les renvoyer avec chaque lot
+_worker_historiques = {}
+
+
+def _init_worker(historiques: dict):
+    _worker_historiques.clear()
+    _worker_historiques.update(historiques)
+
+
+def _evaluate_batch(criteres: list, lot: list) -> list:
+    """Métriques (entraînement, validation) d'un lot de vecteurs de poids"""
+
+    configs = [{'config_id': str(i), 'criteria': dict(zip(criteres, poids))}
+               for i, poids in enumerate(lot)]
+
+    par_periode = {
+        periode: BordaBacktester.evaluate(historique, configs, par_segment=False)['global']
+                                .loc[:, METRIC_COLUMNS].to_dict('records')
+        for periode, historique in _worker_historiques.items()
+    }
+    return list(zip(par_periode['entrainement'], par_periode['validation']))
+
+
+# ==================== OPTIMISEUR ====================
+
+def field_size_range(tranche: str):
+    """Bornes incluses (min, max) d'une tranche de FIELD_SIZE_BUCKETS (ex: '10-12' → (10, 11))"""
+
+    minimum = None
+    for borne, nom in FIELD_SIZE_BUCKETS:
+        if nom == tranche:
+            return minimum, (borne - 1 if borne is not None else None)
+        minimum = borne
+    raise ValueError(f"Tranche de partants inconnue: {tranche}")
+
+
+class BordaOptimizer:
+    """
+    Recherche de poids Borda par segment (hippodrome, discipline, tranche)
+
+    Chaque candidat est un vecteur de points sur les critères de
+    borda_criteres (+ critères par défaut). Les candidats sont évalués par
+    lots (un lot = un produit matriciel du backtest) répartis sur un pool
+    de processus, sur la période d'entraînement et sur la période réservée.
+    Le gagnant est choisi sur l'entraînement et n'est retenu que s'il
+    diffère des poids de départ et fait strictement mieux qu'eux sur une
+    période réservée d'au moins `min_validation` courses.
+
+    Chaque lot évalué est ajouté à un fichier de checkpoint : une recherche
+    interrompue reprend sans réévaluer les candidats déjà vus (les
+    stratégies sont déterministes).
+    """
+
+    def __init__(self, backtester: BordaBacktester = None, processes: int = None,
+                 batch_size: int = 64, checkpoint_dir=None):
+        self.backtester = backtester or BordaBacktester()
+        self.calculator = self.backtester.calculator
+        self.db = self.backtester.db
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else CHECKPOINT_DIR
+
+    # ==================== ESPACE DE RECHERCHE ====================
+
+    def search_criteria(self) -> list:
+        """
+        Critères optimisables : noms de borda_criteres et critères par défaut
+        ayant une colonne dans l'historique (un nom par colonne)
+        """
+
+        self.db.cursor.execute("SELECT DISTINCT critere_nom FROM borda_criteres ORDER BY critere_nom")
+        noms = list(self.calculator.get_default_criteria()) + [r[0] for r in self.db.cursor.fetchall()]
+
+        par_colonne = {}
+        for nom in noms:
+            colonne = nom.replace(' ', '_').lower()
+            if colonne in CRITERE_COLUMNS and colonne not in par_colonne:
+                par_colonne[colonne] = nom
+
+        return list(par_colonne.values())
+
+    @staticmethod
+    def segment_scope(hippodrome_id=None, discipline=None, tranche=None) -> dict:
+        """Périmètre d'une config (format de load_configs) pour un segment"""
+
+        nb_min, nb_max = field_size_range(tranche) if tranche else (None, None)
+        return {
+            'hippodrome_id': hippodrome_id,
+            'discipline': discipline,
+            'nb_partants_min': nb_min,
+            'nb_partants_max': nb_max,
+        }
+
+    def segments(self, periode: tuple, min_courses: int = 30) -> list:
+        """Segments (hippodrome_id, discipline, tranche) ayant assez de courses sur la période"""
+
+        courses = self.backtester.load_history(*periode)['courses']
+        if courses.empty:
+            return []
+
+        tranches = courses['nombre_partants'].fillna(0).map(field_size_bucket)
+        comptes = courses.groupby([courses['hippodrome_id'], courses['discipline'].fillna(''), tranches]).size()
+
+        return [
+            (int(hippodrome_id), discipline or None, tranche)
+            for (hippodrome_id, discipline, tranche), nb in comptes.items()
+            if nb >= min_courses
+        ]
+
+    @staticmethod
+    def _candidates_grid(nb_criteres: int, niveaux, limite: int) -> list:
+        """Grille complète des niveaux (sous-échantillonnée régulièrement au-delà de la limite)"""
+
+        grille = [poids for poids in itertools.product(niveaux, repeat=nb_criteres) if any(poids)]
+        if len(grille) > limite:
+            grille = [grille[i] for i in np.linspace(0, len(grille) - 1, limite).astype(int)]
+        return grille
+
+    @staticmethod
+    def _candidates_random(nb_criteres: int, max_points: int, nombre: int, seed: int) -> list:
+        """Tirage uniforme (reproductible) des points de chaque critère"""
+
+        rng = np.random.default_rng(seed)
+        tirage = rng.integers(0, max_points + 1, size=(nombre, nb_criteres))
+        return [tuple(int(x) for x in poids) for poids in tirage if poids.any()]
+
+    # ==================== ÉVALUATION ====================
+
+    def _histories(self, scope: dict, entrainement: tuple, validation: tuple) -> dict:
+        """Historiques d'entraînement et de validation limités au segment"""
+
+        historiques = {}
+        for periode, (debut, fin) in (('entrainement', entrainement), ('validation', validation)):
+            historique = self.backtester.load_history(debut, fin)
+            masque = BordaBacktester.scope_matrix(historique['courses'], [scope])[:, 0]
+            historiques[periode] = BordaBacktester.restrict(historique, masque)
+        return historiques
+
+    @staticmethod
+    def _data_fingerprint(historiques: dict) -> dict:
+        """
+        Empreinte des données de chaque période (dates réelles, volumes,
+        dernier id de course, hash des critères et arrivées) : un checkpoint
+        n'est repris que si l'historique n'a pas bougé depuis
+        """
+
+        empreinte = {}
+        for periode, historique in historiques.items():
+            courses = historique['courses']
+            contenu = hashlib.sha1()
+            for tableau in (historique['matrice'], historique['rang'], historique['gain']):
+                contenu.update(np.ascontiguousarray(tableau, dtype=float).tobytes())
+            empreinte[periode] = {
+                'dates': [str(courses['date'].min()), str(courses['date'].max())] if len(courses) else None,
+                'courses': len(courses),
+                'partants': len(historique['rang']),
+                'max_course_id': int(courses['course_id'].max()) if len(courses) else None,
+                'contenu': contenu.hexdigest()[:16],
+            }
+        return empreinte
+
+    def _evaluate(self, candidats: list, recherche: dict) -> dict:
+        """
+        Évalue les candidats pas encore vus (en parallèle si plusieurs lots)
+        et met à jour le checkpoint après chaque lot
+        """
+
+        resultats = recherche['resultats']
+        nouveaux = list(dict.fromkeys(c for c in candidats if c not in resultats))
+        lots = [nouveaux[i:i + self.batch_size] for i in range(0, len(nouveaux), self.batch_size)]
+
+        if not lots:
+            return resultats
+
+        if self.processes > 1 and len(lots) > 1:
+            if recherche['pool'] is None:
+                recherche['pool'] = ProcessPoolExecutor(
+                    max_workers=self.processes, initializer=_init_worker,
+                    initargs=(recherche['historiques'],)
+                )
+            evaluations = recherche['pool'].map(_evaluate_batch, itertools.repeat(recherche['criteres']), lots)
+        else:
+            _init_worker(recherche['historiques'])
+            evaluations = (_evaluate_batch(recherche['criteres'], lot) for lot in lots)
+
+        for lot, metriques in zip(lots, evaluations):
+            for poids, (train, valid) in zip(lot, metriques):
+                resultats[poids] = {'entrainement': train, 'validation': valid}
+            self._save_checkpoint(recherche)
+
+        return resultats
+
+    def _score(self, metriques: dict, objectif: str) -> float:
+        return metriques['entrainement'][objectif]
+
+    def _coordinate_descent(self, depart: tuple, recherche: dict, objectif: str,
+                            pas: int, max_points: int, max_evaluations: int) -> None:
+        """
+        Descente par coordonnées : à chaque tour, tous les voisins (±pas,
+        ±2 pas sur un critère) sont évalués en un seul passage parallèle,
+        puis on se déplace vers le meilleur tant qu'il améliore l'objectif
+        """
+
+        courant = depart
+        self._evaluate([courant], recherche)
+
+        while len(recherche['resultats']) < max_evaluations:
+            voisins = []
+            for i in range(len(courant)):
+                for delta in (-2 * pas, -pas, pas, 2 * pas):
+                    valeur = min(max(courant[i] + delta, 0), max_points)
+                    voisin = courant[:i] + (valeur,) + courant[i + 1:]
+                    if voisin != courant and any(voisin):
+                        voisins.append(voisin)
+
+            resultats = self._evaluate(voisins, recherche)
+            meilleur = max(voisins, key=lambda v: self._score(resultats[v], objectif))
+
+            if self._score(resultats[meilleur], objectif) <= self._score(resultats[courant], objectif):
+                break
+            courant = meilleur
+
+    # ==================== CHECKPOINT ====================
+
+    def _checkpoint_path(self, parametres: dict) -> Path:
+        cle = hashlib.sha1(json.dumps(parametres, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        return self.checkpoint_dir / f"recherche_{cle}.json"
+
+    def _load_checkpoint(self, chemin: Path) -> dict:
+        """Résultats déjà évalués d'une recherche interrompue"""
+
+        if not chemin.exists():
+            return {}
+
+        try:
+            with open(chemin, 'r') as f:
+                contenu = json.load(f)
+            return {tuple(poids): metriques for poids, metriques in contenu['resultats']}
+        except:
+            print(f"⚠️  Checkpoint illisible ignoré: {chemin}")
+            return {}
+
+    def _save_checkpoint(self, recherche: dict):
+        """Écriture atomique (fichier temporaire puis renommage)"""
+
+        chemin = recherche['checkpoint']
+        if chemin is None:
+            return
+
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        temporaire = chemin.with_suffix('.tmp')
+        with open(temporaire, 'w') as f:
+            json.dump({
+                'parametres': recherche['parametres'],
+                'resultats': [[list(poids), metriques] for poids, metriques in recherche['resultats'].items()],
+            }, f)
+        os.replace(temporaire, chemin)
+
+    # ==================== RECHERCHE ====================
+
+    def optimize(self, scope: dict, entrainement: tuple, validation: tuple,
+                 strategie: str = 'coordonnees', objectif: str = 'taux_reussite',
+                 nombre: int = 200, niveaux=(0, 10, 20, 30), pas: int = 5,
+                 max_points: int = 50, seed: int = 0, depart: dict = None,
+                 min_courses: int = 30, min_validation: int = 10,
+                 checkpoint: bool = True) -> dict:
+        """
+        Recherche les meilleurs poids d'un segment
+
+        Args:
+            scope: Périmètre (cf. segment_scope)
+            entrainement: (date_debut, date_fin) de la recherche
+            validation: (date_debut, date_fin) réservée à la validation
+            strategie: 'grille', 'aleatoire' ou 'coordonnees'
+            objectif: 'taux_reussite', 'taux_top3' ou 'roi'
+            nombre: Nombre maximum de candidats évalués
+            niveaux: Points essayés par critère (grille)
+            pas: Pas de la descente par coordonnées
+            max_points: Points maximum d'un critère (aléatoire, coordonnées)
+            seed: Graine du tirage aléatoire
+            depart: Poids de départ et de référence (défaut: critères par défaut)
+            min_courses: Courses d'entraînement minimum du segment
+            min_validation: Courses de validation minimum pour retenir le gagnant
+            checkpoint: Reprendre / enregistrer la recherche sur disque
+
+        Returns:
+            Dict (criteres, poids, entrainement, validation, reference,
+            ameliore, evaluations, duree) ou None si le segment est trop petit
+        """
+
+        if strategie not in STRATEGIES:
+            raise ValueError(f"Stratégie inconnue: {strategie} ({', '.join(STRATEGIES)})")
+        if objectif not in OBJECTIVES:
+            raise ValueError(f"Objectif inconnu: {objectif} ({', '.join(OBJECTIVES)})")
+
+        debut = time.perf_counter()
+        criteres = self.search_criteria()
+        historiques = self._histories(scope, entrainement, validation)
+
+        nb_courses = len(historiques['entrainement']['courses'])
+        if nb_courses < min_courses:
+            print(f"⚠️  Segment ignoré: {nb_courses} courses d'entraînement (< {min_courses})")
+            return None
+
+        if depart is None:
+            depart = self.calculator.get_default_criteria()
+        reference = tuple(int(depart.get(c, 0)) for c in criteres)
+
+        parametres = {
+            'scope': scope, 'entrainement': entrainement, 'validation': validation,
+            'strategie': strategie, 'objectif': objectif, 'nombre': nombre,
+            'niveaux': list(niveaux), 'pas': pas, 'max_points': max_points,
+            'seed': seed, 'criteres': criteres, 'reference': reference,
+            'donnees': self._data_fingerprint(historiques),
+        }
+        chemin = self._checkpoint_path(parametres) if checkpoint else None
+
+        recherche = {
+            'parametres': parametres,
+            'criteres': criteres,
+            'historiques': historiques,
+            'resultats': self._load_checkpoint(chemin) if chemin else {},
+            'checkpoint': chemin,
+            'pool': None,
+        }
+        if recherche['resultats']:
+            print(f"♻️  Reprise: {len(recherche['resultats'])} candidats déjà évalués")
+
+        try:
+            if strategie == 'grille':
+                candidats = self._candidates_grid(len(criteres), niveaux, nombre)
+                self._evaluate([reference] + candidats, recherche)
+            elif strategie == 'aleatoire':
+                candidats = self._candidates_random(len(criteres), max_points, nombre, seed)
+                self._evaluate([reference] + candidats, recherche)
+            else:
+                self._coordinate_descent(reference, recherche, objectif, pas, max_points, nombre)
+        finally:
+            if recherche['pool'] is not None:
+                recherche['pool'].shutdown()
+
+        resultats = recherche['resultats']
+        gagnant = max(resultats, key=lambda poids: self._score(resultats[poids], objectif))
+
+        # Retenu seulement s'il bat strictement la référence sur assez de courses réservées
+        nb_validation = len(historiques['validation']['courses'])
+        ameliore = (gagnant != reference and nb_validation >= min_validation
+                    and resultats[gagnant]['validation'][objectif] > resultats[reference]['validation'][objectif])
+
+        return {
+            'scope': scope,
+            'objectif': objectif,
+            'criteres': criteres,
+            'poids': dict(zip(criteres, gagnant)),
+            'entrainement': resultats[gagnant]['entrainement'],
+            'validation': resultats[gagnant]['validation'],
+            'reference': resultats[reference],
+            'ameliore': ameliore,
+            'evaluations': len(resultats),
+            'duree': time.perf_counter() - debut,
+        }
+
+    def save_winner(self, resultat: dict, nom: str = None) -> str:
+        """
+        Enregistre les poids gagnants comme nouvelle config active
+
+        Returns:
+            config_id créé
+        """
+
+        scope = resultat['scope']
+        horodatage = datetime.now().strftime('%Y%m%d%H%M%S')
+        config_id = "opt_{}_{}_{}-{}_{}".format(
+            scope.get('hippodrome_id') or 'tous', scope.get('discipline') or 'tous',
+            scope.get('nb_partants_min') or 0, scope.get('nb_partants_max') or 'plus', horodatage
+        )
+        objectif = resultat['objectif']
+
+        with self.db.connections.write() as cursor:
+            cursor.execute("""
+                INSERT INTO borda_configs
+                (config_id, nom, hippodrome_id, discipline, nb_partants_min, nb_partants_max, description, is_active)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+            """, (
+                config_id,
+                nom or f"Optimisé {config_id}",
+                scope.get('hippodrome_id'),
+                scope.get('discipline'),
+                scope.get('nb_partants_min'),
+                scope.get('nb_partants_max'),
+                f"Optimisation {objectif}: {resultat['entrainement'][objectif]:.1f} (entraînement), "
+                f"{resultat['validation'][objectif]:.1f} (validation), "
+                f"référence {resultat['reference']['validation'][objectif]:.1f}"
+            ))
+            config_db_id = cursor.lastrowid
+
+            cursor.executemany("""
+                INSERT INTO borda_criteres (config_id, critere_nom, points)
+                VALUES (?, ?, ?)
+            """, [(config_db_id, critere, int(points)) for critere, points in resultat['poids'].items() if points > 0])
+
+        return config_id
+
+    def optimize_segments(self, entrainement: tuple, validation: tuple, min_courses: int = 30,
+                          enregistrer: bool = True, **options) -> list:
+        """
+        Optimise tous les segments assez fournis et enregistre les gagnants
+        qui tiennent sur la période de validation
+
+        Returns:
+            Liste des résultats de optimize (+ 'config_id' si enregistré)
+        """
+
+        resultats = []
+        for hippodrome_id, discipline, tranche in self.segments(entrainement, min_courses):
+            scope = self.segment_scope(hippodrome_id, discipline, tranche)
+            resultat = self.optimize(scope, entrainement, validation, min_courses=min_courses, **options)
+            if resultat is None:
+                continue
+
+            objectif = resultat['objectif']
+            print(f"📊 Segment {hippodrome_id}/{discipline}/{tranche}: "
+                  f"{resultat['validation'][objectif]:.1f} en validation "
+                  f"(référence {resultat['reference']['validation'][objectif]:.1f}) - "
+                  f"{resultat['evaluations']} candidats en {resultat['duree']:.1f}s")
+
+            if enregistrer and resultat['ameliore']:
+                resultat['config_id'] = self.save_winner(resultat)
+                print(f"   ✅ Config {resultat['config_id']} enregistrée")
+
+            resultats.append(resultat)
+
+        return resultats
+
+
+if __name__ == "__main__":
+    import sys
+
+    print("🔧 OPTIMISATION DES POIDS BORDA")
+    print("="*60)
+
+    # Usage: python borda_optimizer.py DEBUT SEPARATION FIN [strategie] [objectif]
+    # (entraînement de DEBUT à la veille de SEPARATION, validation de SEPARATION à FIN)
+    if len(sys.argv) < 4:
+        print("Usage: python borda_optimizer.py DEBUT SEPARATION FIN [grille|aleatoire|coordonnees] [objectif]")
+        sys.exit(1)
+
+    debut, separation, fin = sys.argv[1:4]
+    veille = date.fromisoformat(separation) - timedelta(days=1)
+    options = {}
+    if len(sys.argv) > 4:
+        options['strategie'] = sys.argv[4]
+    if len(sys.argv) > 5:
+        options['objectif'] = sys.argv[5]
+
+    optimizer = BordaOptimizer()
+    resultats = optimizer.optimize_segments((debut, str(veille)), (separation, fin), **options)
+
+    print("\n" + "="*60)
+    print(f"✅ Segments optimisés: {len(resultats)}")
+    print(f"✅ Configs enregistrées: {sum('config_id' in r for r in resultats)}")
@@ -0,0 +1,124 @@
+"""
+🧭 ROUTAGE DES SYSTÈMES BORDA
+Table de règles (hippodrome, discipline, tranche de partants) → colonne Borda,
+compilée une fois par jeu de colonnes et partagée par les moteurs de pronostic
+"""
+
+from functools import lru_cache
+from typing import Optional, Sequence
+
+import pandas as pd
+
+
+DEFAULT_BORDA = 'Borda - Borda par Défaut'
+
+# Tranches de partants (borne basse incluse, borne haute exclue)
+FIELD_SIZE_BUCKETS = (
+    (8, '0-8'),
+    (10, '8-10'),
+    (12, '10-12'),
+    (14, '12-14'),
+    (16, '14-16'),
+    (None, '16+'),
+)
+
+# Règles par famille d'hippodrome, évaluées dans l'ordre : la première famille
+# dont le motif apparaît dans le nom décide ; dans la famille, première règle
+# (discipline, tranche) qui correspond (None = toutes). Sans règle : Borda par défaut.
+BORDA_RULES = (
+    ('vincenne', (
+        (None, '8-10', 'Borda - trot 8-10 chevaux  vincenne'),
+        (None, '10-12', 'Borda - trot 10-12 chevaux  vincenne'),
+        (None, '12-14', 'Borda - trot 12-14 chevaux  vincenne'),
+        (None, '14-16', 'Borda - trot 14-16 chevaux  vincenne'),
+        (None, '16+', 'Borda - monté 12-16 chevaux  vincenne'),
+    )),
+    ('pau', (
+        ('A', None, 'Borda - Pau attelé'),
+        ('M', None, 'Borda - Pau monté'),
+        (None, None, 'Borda - Pau plat'),
+    )),
+    ('cagne', (
+        ('A', None, 'Borda - cagne sur mer attelé'),
+        (None, None, 'Borda - cagne sur mer monté'),
+    )),
+    ('deauville', (
+        (None, None, 'Borda - Deauville galot pcf'),
+    )),
+    ('bousc', (
+        (None, None, 'Borda - le boucast'),
+    )),
+)
+
+
+def field_size_bucket(nb_partants) -> str:
+    """Tranche de partants d'une course (ex: 11 → '10-12')"""
+    for borne, tranche in FIELD_SIZE_BUCKETS:
+        if borne is None or nb_partants < borne:
+            return tranche
+
+
+class BordaRouter:
+    """
+    Table de routage compilée pour un jeu de colonnes Borda
+
+    Chaque règle est résolue une fois en index de colonne (repli sur le
+    Borda par défaut si sa colonne manque), puis chaque combinaison
+    (hippodrome, discipline, tranche) est mémorisée.
+    """
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = list(columns)
+        index = {col: i for i, col in enumerate(self.columns)}
+        defaut = index.get(DEFAULT_BORDA)
+
+        self.default_index = defaut
+        self._rules = tuple(
+            (motif, tuple((discipline, tranche, index.get(col, defaut))
+                          for discipline, tranche, col in regles))
+            for motif, regles in BORDA_RULES
+        )
+        self._cache = {}
+
+    def column_index(self, hippodrome, discipline, nb_partants) -> Optional[int]:
+        """Index de la colonne à utiliser (None si aucune colonne disponible)"""
+        hippo_lower = hippodrome.lower() if isinstance(hippodrome, str) else ''
+        tranche = field_size_bucket(nb_partants)
+        cle = (hippo_lower, discipline, tranche)
+
+        if cle not in self._cache:
+            resultat = self.default_index
+            for motif, regles in self._rules:
+                if motif in hippo_lower:
+                    for disc_regle, tranche_regle, i in regles:
+                        if ((disc_regle is None or disc_regle == discipline) and
+                                (tranche_regle is None or tranche_regle == tranche)):
+                            resultat = i
+                            break
+                    break
+            self._cache[cle] = resultat
+
+        return self._cache[cle]
+
+    def resolve(self, hippodrome, discipline, nb_partants) -> Optional[str]:
+        """Nom de la colonne Borda à utiliser (None si aucune colonne disponible)"""
+        i = self.column_index(hippodrome, discipline, nb_partants)
+        return self.columns[i] if i is not None else None
+
+
+@lru_cache(maxsize=32)
+def _compile(columns: tuple) -> BordaRouter:
+    return BordaRouter(columns)
+
+
+def compile_borda_router(columns) -> BordaRouter:
+    """Routeur pour les colonnes Borda parmi `columns` (compilé une fois par jeu de colonnes)"""
+    return _compile(tuple(col for col in columns if 'Borda' in col))
+
+
+def borda_value(row: pd.Series, router: BordaRouter, hippodrome, discipline, nb_partants):
+    """Valeur brute du Borda choisi pour une ligne (0 si absent ou vide)"""
+    col = router.resolve(hippodrome, discipline, nb_partants)
+    if col is None or col not in row.index or pd.isna(row[col]):
+        return 0
+    return row[col]
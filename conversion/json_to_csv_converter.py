@@ -6,16 +6,53 @@ Convertit tous les fichiers JSON en un seul CSV consolidé
 
 import json
 import os
+import re
 import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import sys
 
+# Format colonnaire optionnel
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
 # Configuration
 SOURCE_DIR = Path.home() / "path/to/json/folder"  # À MODIFIER
 DESTINATION_DIR = Path.home() / "bordasAnalyse"
 OUTPUT_FILENAME = f"historique_turf_{datetime.now().strftime('%Y%m%d')}.csv"
 
+# Nombre de lignes (chevaux) accumulées avant écriture dans le fichier de sortie
+BATCH_SIZE = 5000
+
+# Colonnes du fichier de sortie : fixées à l'avance pour pouvoir écrire
+# par lots sans connaître toutes les courses
+PRIORITY_COLUMNS = ['date', 'heure', 'hippodrome', 'course_id', 'numero_reunion', 'numero_course',
+                    'discipline', 'distance', 'numero', 'cheval', 'driver', 'entraineur',
+                    'ordre_arrivee', 'cote_direct', 'cote_reference', 'favoris', 'age', 'sexe',
+                    'nombre_courses', 'nombre_victoires', 'musique']
+
+OTHER_COLUMNS = [
+    # Course
+    'code_hippodrome', 'hippodrome_court', 'libelle', 'libelle_court', 'specialite',
+    'parcours', 'type_piste', 'corde', 'montant_prix', 'montant_total', 'nombre_partants',
+    'categorie_particularite', 'condition_age', 'condition_sexe', 'statut', 'arrivee_definitive',
+    # Participant
+    'proprietaire', 'race', 'pays', 'place_corde', 'oeilleres', 'nombre_places',
+    'gains_carriere', 'gains_victoires', 'gains_annee_courante', 'gains_annee_precedente',
+    'handicap_valeur', 'handicap_poids', 'nom_pere', 'nom_mere', 'eleveur', 'distance_precedent',
+    # Rapports
+    'rapport_gagnant', 'combinaison_gagnant', 'rapport_place', 'rapport_couple_gagnant',
+    'combinaison_couple', 'rapport_trio', 'combinaison_trio'
+]
+
+OUTPUT_COLUMNS = PRIORITY_COLUMNS + OTHER_COLUMNS
+
 def find_json_files(directory):
     """Trouve tous les fichiers JSON dans le dossier et ses sous-dossiers"""
     json_files = {
@@ -169,17 +206,36 @@ def extract_participants(participants_data):
     
     return participants
 
+def dividende_pour_un_euro(rapport):
+    """Rapport pour 1 € en euros (les dividendes PMU sont en centimes), None si absent"""
+    dividende = rapport.get('dividendePourUnEuro', rapport.get('dividende'))
+    try:
+        return float(dividende) / 100
+    except (TypeError, ValueError):
+        return None
+
 def extract_rapports(rapports_data):
-    """Extrait les rapports (résultats des paris)"""
+    """
+    Extrait les rapports (résultats des paris)
+    
+    En plus des colonnes du CSV, 'dividendes' donne pour chaque type de
+    pari la liste (combinaison, rapport pour 1 €) : utilisé par l'import
+    direct en base, ignoré à l'écriture du CSV (hors OUTPUT_COLUMNS)
+    """
     if not rapports_data:
         return {}
     
-    rapports = {}
+    rapports = {'dividendes': {}}
     try:
         # rapports_data est une liste de types de paris
         for pari in rapports_data:
             type_pari = pari.get('typePari', '')
             
+            rapports['dividendes'][type_pari] = [
+                (r.get('combinaison', []), dividende_pour_un_euro(r))
+                for r in pari.get('rapports', [])
+            ]
+            
             # Pour les paris simples, prendre le premier rapport
             if 'rapports' in pari and len(pari['rapports']) > 0:
                 premier_rapport = pari['rapports'][0]
@@ -252,14 +308,232 @@ def process_race(infos_file, participants_file, orts_file=None, rapports_file=No
     
     return rows
 
-def main():
+def group_race_files(json_files):
+    """
+    Regroupe les fichiers JSON par course
+    
+    Returns:
+        Dict {course_id: {'infos', 'participants', 'orts', 'rapports'}}
+    """
+    courses = {}
+    
+    # Utiliser les fichiers infos comme référence
+    for infos_file in json_files['infos']:
+        # Extraire l'identifiant de la course du nom de fichier
+        # Ex: 2025-01-02_R1_C1_infos.json → 2025-01-02_R1_C1
+        course_id = infos_file.stem.replace('_infos', '').replace('.json', '')
+        
+        courses[course_id] = {
+            'infos': infos_file,
+            'participants': None,
+            'orts': None,
+            'rapports': None
+        }
+    
+    # Associer les autres fichiers
+    for participants_file in json_files['participants']:
+        course_id = participants_file.stem.replace('_participants', '').replace('_cipants', '').replace('.json', '')
+        if course_id in courses:
+            courses[course_id]['participants'] = participants_file
+    
+    for orts_file in json_files['orts']:
+        course_id = orts_file.stem.replace('_orts', '').replace('.json', '')
+        if course_id in courses:
+            courses[course_id]['orts'] = orts_file
+    
+    for rapports_file in json_files['rapports']:
+        course_id = rapports_file.stem.replace('_rapports', '').replace('_rapp', '').replace('.json', '')
+        if course_id in courses:
+            courses[course_id]['rapports'] = rapports_file
+    
+    return courses
+
+def race_date(course_id):
+    """Date de la course d'après son identifiant (2025-01-02_R1_C1), None si absente"""
+    try:
+        return datetime.strptime(course_id[:10], '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+def race_sort_key(course_id):
+    """Clé de tri naturel des identifiants (2025-01-02_R2_C1 avant 2025-01-02_R10_C1)"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', course_id)]
+
+def filter_since(courses, since):
+    """
+    Ne garde que les courses datées à partir de `since` (conversion incrémentale).
+    Les courses dont l'identifiant ne porte pas de date sont conservées.
+    """
+    since_date = datetime.strptime(since, '%Y-%m-%d').date()
+    return {
+        course_id: files for course_id, files in courses.items()
+        if race_date(course_id) is None or race_date(course_id) >= since_date
+    }
+
+def convert_race(course_id, files):
+    """Traite une course dans un processus du pool → (course_id, lignes, erreur)"""
+    try:
+        rows = process_race(
+            files['infos'],
+            files['participants'],
+            files['orts'],
+            files['rapports']
+        )
+        return course_id, rows, None
+    except Exception as e:
+        return course_id, [], str(e)
+
+def iter_converted_races(courses, workers):
+    """
+    Convertit les courses dans un pool de processus et les restitue dans
+    l'ordre naturel des identifiants (date, réunion, course), avec une
+    fenêtre bornée de courses en vol pour limiter la mémoire
+    
+    Yields:
+        Tuple (course_id, lignes, erreur)
+    """
+    items = iter(sorted(courses.items(), key=lambda item: race_sort_key(item[0])))
+    
+    if workers <= 1:
+        for course_id, files in items:
+            yield convert_race(course_id, files)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        en_vol = deque()
+        
+        for course_id, files in items:
+            en_vol.append(executor.submit(convert_race, course_id, files))
+            if len(en_vol) >= workers * 4:
+                break
+        
+        while en_vol:
+            result = en_vol.popleft().result()
+            
+            suivant = next(items, None)
+            if suivant is not None:
+                en_vol.append(executor.submit(convert_race, *suivant))
+            
+            yield result
+
+class BatchWriter:
+    """
+    Écrit les lignes par lots dans le fichier de sortie (CSV ou Parquet)
+    avec un jeu de colonnes fixe (OUTPUT_COLUMNS)
+    
+    Contrairement à l'ancienne écriture en un bloc, l'ordre des colonnes
+    ne dépend plus des données : une colonne absente de toutes les courses
+    est présente et vide, une colonne hors OUTPUT_COLUMNS est ignorée
+    """
+    
+    def __init__(self, output_path, output_format='csv'):
+        if output_format == 'parquet' and not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow requis pour la sortie parquet (pip install pyarrow)")
+        
+        self.output_path = Path(output_path)
+        self.output_format = output_format
+        self.rows_written = 0
+        self._parquet_writer = None
+        self._header_written = False
+    
+    def write(self, rows):
+        """Écrit un lot de lignes"""
+        if not rows:
+            return
+        
+        df = pd.DataFrame(rows).reindex(columns=OUTPUT_COLUMNS)
+        
+        if self.output_format == 'parquet':
+            # Colonnes en texte : types hétérogènes selon les courses
+            df = df.astype('string')
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(
+                self.output_path,
+                mode='a' if self._header_written else 'w',
+                header=not self._header_written,
+                index=False, sep=';', encoding='utf-8-sig'
+            )
+            self._header_written = True
+        
+        self.rows_written += len(df)
+    
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+def convert_races(courses, output_path, workers=1, output_format='csv', batch_size=BATCH_SIZE):
+    """
+    Convertit les courses et écrit les lignes au fil de l'eau
+    
+    Args:
+        courses: Dict {course_id: fichiers} (voir group_race_files)
+        output_path: Fichier de sortie
+        workers: Nombre de processus (1 = série)
+        output_format: 'csv' ou 'parquet'
+        batch_size: Nombre de lignes accumulées avant écriture
+    
+    Returns:
+        Dict avec stats de conversion
+    """
+    stats = {'courses': 0, 'lignes': 0, 'errors': 0}
+    writer = BatchWriter(output_path, output_format)
+    pending = []
+    
+    try:
+        for course_id, rows, error in iter_converted_races(courses, workers):
+            if error:
+                print(f"   ⚠️  Erreur course {course_id}: {error}")
+                stats['errors'] += 1
+                continue
+            
+            pending.extend(rows)
+            stats['courses'] += 1
+            
+            if len(pending) >= batch_size:
+                writer.write(pending)
+                pending = []
+            
+            if stats['courses'] % 50 == 0:
+                print(f"   ✓ {stats['courses']}/{len(courses)} courses traitées...")
+        
+        writer.write(pending)
+    finally:
+        writer.close()
+    
+    stats['lignes'] = writer.rows_written
+    return stats
+
+def parse_args(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Conversion JSON → CSV des données Turf")
+    parser.add_argument('source', nargs='?', help="Dossier contenant les JSON (défaut: demandé)")
+    parser.add_argument('--output', help="Fichier de sortie (défaut: ~/bordasAnalyse/historique_turf_YYYYMMDD.csv)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Nombre de processus de conversion (défaut: nombre de CPU)")
+    parser.add_argument('--format', dest='output_format', choices=['csv', 'parquet'], default='csv',
+                        help="Format de sortie (parquet nécessite pyarrow)")
+    parser.add_argument('--since', help="Ne convertir que les courses à partir de cette date (YYYY-MM-DD)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f"Lignes écrites par lot (défaut: {BATCH_SIZE})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
     print("=" * 60)
     print("🏇 Conversion JSON → CSV - Données Turf")
     print("=" * 60)
     print()
     
     # Demander le dossier source si non configuré
-    if str(SOURCE_DIR) == str(Path.home() / "path/to/json/folder"):
+    if args.source:
+        source_dir = Path(args.source)
+    elif str(SOURCE_DIR) == str(Path.home() / "path/to/json/folder"):
         print("📁 Où sont vos fichiers JSON ?")
         source_input = input("Chemin complet du dossier (ou appuyez sur Entrée pour le dossier actuel): ").strip()
         
@@ -275,11 +549,21 @@ def main():
         return
     
     print(f"📂 Dossier source: {source_dir}")
-    print(f"📂 Dossier destination: {DESTINATION_DIR}")
+    if args.output:
+        output_path = Path(args.output)
+    else:
+        output_name = OUTPUT_FILENAME
+        if args.since:
+            output_name = output_name.replace('.csv', f"_depuis_{args.since.replace('-', '')}.csv")
+        if args.output_format == 'parquet':
+            output_name = output_name.replace('.csv', '.parquet')
+        output_path = DESTINATION_DIR / output_name
+    
+    print(f"📂 Fichier destination: {output_path}")
     print()
     
     # Créer le dossier de destination si nécessaire
-    DESTINATION_DIR.mkdir(parents=True, exist_ok=True)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
     
     # Trouver tous les fichiers JSON
     print("🔍 Recherche des fichiers JSON...")
@@ -298,97 +582,38 @@ def main():
         return
     
     # Grouper les fichiers par course
-    print("🔄 Traitement des courses...")
-    courses = {}
-    
-    # Utiliser les fichiers infos comme référence
-    for infos_file in json_files['infos']:
-        # Extraire l'identifiant de la course du nom de fichier
-        # Ex: 2025-01-02_R1_C1_infos.json → 2025-01-02_R1_C1
-        course_id = infos_file.stem.replace('_infos', '').replace('.json', '')
-        
-        courses[course_id] = {
-            'infos': infos_file,
-            'participants': None,
-            'orts': None,
-            'rapports': None
-        }
-    
-    # Associer les autres fichiers
-    for participants_file in json_files['participants']:
-        course_id = participants_file.stem.replace('_participants', '').replace('_cipants', '').replace('.json', '')
-        if course_id in courses:
-            courses[course_id]['participants'] = participants_file
+    courses = group_race_files(json_files)
+    print(f"📊 {len(courses)} courses identifiées")
     
-    for orts_file in json_files['orts']:
-        course_id = orts_file.stem.replace('_orts', '').replace('.json', '')
-        if course_id in courses:
-            courses[course_id]['orts'] = orts_file
+    if args.since:
+        courses = filter_since(courses, args.since)
+        print(f"📅 {len(courses)} courses à partir du {args.since}")
+    print()
     
-    for rapports_file in json_files['rapports']:
-        course_id = rapports_file.stem.replace('_rapp', '').replace('_rapports', '').replace('.json', '')
-        if course_id in courses:
-            courses[course_id]['rapports'] = rapports_file
+    if not courses:
+        print("✅ Aucune nouvelle course à convertir")
+        return
     
-    print(f"📊 {len(courses)} courses identifiées")
-    print()
+    # Traiter les courses (en parallèle si workers > 1) et écrire par lots
+    print(f"🔄 Traitement des courses ({args.workers} processus)...")
+    stats = convert_races(courses, output_path, args.workers,
+                          args.output_format, args.batch_size)
     
-    # Traiter chaque course
-    all_rows = []
-    processed = 0
-    errors = 0
-    
-    for course_id, files in courses.items():
-        try:
-            rows = process_race(
-                files['infos'],
-                files['participants'],
-                files['orts'],
-                files['rapports']
-            )
-            all_rows.extend(rows)
-            processed += 1
-            
-            if processed % 50 == 0:
-                print(f"   ✓ {processed}/{len(courses)} courses traitées...")
-        except Exception as e:
-            print(f"   ⚠️  Erreur course {course_id}: {e}")
-            errors += 1
-    
-    print(f"✅ {processed} courses traitées avec succès")
-    if errors > 0:
-        print(f"⚠️  {errors} erreurs")
+    print(f"✅ {stats['courses']} courses traitées avec succès")
+    if stats['errors'] > 0:
+        print(f"⚠️  {stats['errors']} erreurs")
     print()
     
-    # Créer le DataFrame et sauvegarder
-    if all_rows:
-        print("💾 Création du fichier CSV...")
-        df = pd.DataFrame(all_rows)
-        
-        # Réorganiser les colonnes
-        priority_cols = ['date', 'heure', 'hippodrome', 'course_id', 'numero_reunion', 'numero_course',
-                        'discipline', 'distance', 'numero', 'cheval', 'driver', 'entraineur', 
-                        'ordre_arrivee', 'cote_direct', 'cote_reference', 'favoris', 'age', 'sexe',
-                        'nombre_courses', 'nombre_victoires', 'musique']
-        other_cols = [col for col in df.columns if col not in priority_cols]
-        
-        # Ne garder que les colonnes qui existent réellement
-        final_cols = [col for col in priority_cols if col in df.columns] + other_cols
-        df = df[final_cols]
-        
-        # Sauvegarder
-        output_path = DESTINATION_DIR / OUTPUT_FILENAME
-        df.to_csv(output_path, index=False, sep=';', encoding='utf-8-sig')
-        
+    if stats['lignes']:
         print(f"✅ Fichier créé: {output_path}")
-        print(f"📊 {len(df)} lignes (chevaux)")
-        print(f"📊 {len(df['numero_course'].unique())} courses uniques")
+        print(f"📊 {stats['lignes']} lignes (chevaux)")
+        print(f"📊 {stats['courses']} courses")
         print()
         print("=" * 60)
         print("🎉 Conversion terminée avec succès!")
         print("=" * 60)
         print()
-        print(f"👉 Vous pouvez maintenant charger {OUTPUT_FILENAME}")
+        print(f"👉 Vous pouvez maintenant charger {output_path.name}")
         print(f"   dans votre dashboard Streamlit!")
     else:
         print("❌ Aucune donnée extraite!")
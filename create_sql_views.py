@@ -3,6 +3,327 @@
 Requêtes pré-calculées pour performance maximale
 """
 
+import time
+
+
+# ==================== AGRÉGATS MATÉRIALISÉS ====================
+
+# Tables de synthèse des vues agrégées :
+# (table, colonnes, type d'id rafraîchi, clé dans la table, colonne filtrée, requête)
+# La requête n'est relancée que pour les ids touchés ({filtre}), groupe par
+# groupe complet : le résultat est identique à un recalcul total.
+MATERIALIZED_AGGREGATES = (
+    ('mv_perf_chevaux', """
+        cheval_id INTEGER PRIMARY KEY,
+        nb_courses INTEGER NOT NULL,
+        nb_victoires INTEGER NOT NULL,
+        nb_places INTEGER NOT NULL,
+        cote_moyenne REAL
+    """, 'cheval', 'cheval_id', 'p.cheval_id', """
+        SELECT 
+            p.cheval_id,
+            COUNT(p.id),
+            COUNT(CASE WHEN p.rang_arrivee = 1 THEN 1 END),
+            COUNT(CASE WHEN p.rang_arrivee <= 3 AND p.rang_arrivee > 0 THEN 1 END),
+            AVG(p.cote_pmu)
+        FROM partants p
+        WHERE {filtre}
+        GROUP BY p.cheval_id
+    """),
+    
+    ('mv_perf_drivers', """
+        driver_id INTEGER PRIMARY KEY,
+        nb_courses INTEGER NOT NULL,
+        nb_victoires INTEGER NOT NULL,
+        nb_places INTEGER NOT NULL
+    """, 'driver', 'driver_id', 'p.driver_id', """
+        SELECT 
+            p.driver_id,
+            COUNT(p.id),
+            COUNT(CASE WHEN p.rang_arrivee = 1 THEN 1 END),
+            COUNT(CASE WHEN p.rang_arrivee <= 3 AND p.rang_arrivee > 0 THEN 1 END)
+        FROM partants p
+        WHERE p.driver_id IS NOT NULL AND {filtre}
+        GROUP BY p.driver_id
+    """),
+    
+    ('mv_stats_hippodromes', """
+        hippodrome_id INTEGER PRIMARY KEY,
+        nb_reunions INTEGER NOT NULL,
+        nb_courses INTEGER NOT NULL,
+        nb_partants INTEGER NOT NULL,
+        nb_jours INTEGER NOT NULL,
+        allocation_totale REAL,
+        partants_moyen REAL,
+        premiere_course DATE,
+        derniere_course DATE
+    """, 'hippodrome', 'hippodrome_id', 'h.id', """
+        SELECT 
+            h.id,
+            COUNT(DISTINCT r.id),
+            COUNT(DISTINCT c.id),
+            COUNT(p.id),
+            COUNT(DISTINCT CASE WHEN c.id IS NOT NULL THEN r.date END),
+            SUM(c.allocation),
+            AVG(c.nombre_partants),
+            MIN(r.date),
+            MAX(r.date)
+        FROM hippodromes h
+        LEFT JOIN reunions r ON h.id = r.hippodrome_id
+        LEFT JOIN courses c ON r.id = c.reunion_id
+        LEFT JOIN partants p ON c.id = p.course_id
+        WHERE {filtre}
+        GROUP BY h.id
+    """),
+    
+    ('mv_synergies_cheval_driver', """
+        cheval_id INTEGER NOT NULL,
+        driver_id INTEGER NOT NULL,
+        nb_courses INTEGER NOT NULL,
+        victoires INTEGER NOT NULL,
+        places INTEGER NOT NULL,
+        cote_moyenne REAL,
+        PRIMARY KEY (cheval_id, driver_id)
+    """, 'cheval', 'cheval_id', 'p.cheval_id', """
+        SELECT 
+            p.cheval_id,
+            p.driver_id,
+            COUNT(*),
+            SUM(CASE WHEN p.rang_arrivee = 1 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN p.rang_arrivee <= 3 THEN 1 ELSE 0 END),
+            AVG(p.cote_pmu)
+        FROM partants p
+        WHERE p.rang_arrivee IS NOT NULL AND p.driver_id IS NOT NULL AND {filtre}
+        GROUP BY p.cheval_id, p.driver_id
+    """),
+    
+    ('mv_top_chevaux_hippodrome', """
+        hippodrome_id INTEGER NOT NULL,
+        cheval_id INTEGER NOT NULL,
+        nb_courses INTEGER NOT NULL,
+        victoires INTEGER NOT NULL,
+        cote_moyenne REAL,
+        PRIMARY KEY (hippodrome_id, cheval_id)
+    """, 'cheval', 'cheval_id', 'p.cheval_id', """
+        SELECT 
+            r.hippodrome_id,
+            p.cheval_id,
+            COUNT(*),
+            SUM(CASE WHEN p.rang_arrivee = 1 THEN 1 ELSE 0 END),
+            AVG(p.cote_pmu)
+        FROM partants p
+        JOIN courses c ON p.course_id = c.id
+        JOIN reunions r ON c.reunion_id = r.id
+        WHERE p.rang_arrivee IS NOT NULL AND {filtre}
+        GROUP BY r.hippodrome_id, p.cheval_id
+    """),
+)
+
+# Ids touchés par les dates à rafraîchir, par type de clé
+AFFECTED_IDS = {
+    'cheval': """
+        SELECT DISTINCT p.cheval_id FROM partants p
+        JOIN courses c ON p.course_id = c.id
+        JOIN reunions r ON c.reunion_id = r.id
+        WHERE r.date IN (SELECT date FROM temp._mv_dates)
+    """,
+    'driver': """
+        SELECT DISTINCT p.driver_id FROM partants p
+        JOIN courses c ON p.course_id = c.id
+        JOIN reunions r ON c.reunion_id = r.id
+        WHERE r.date IN (SELECT date FROM temp._mv_dates) AND p.driver_id IS NOT NULL
+    """,
+    'hippodrome': """
+        SELECT DISTINCT r.hippodrome_id FROM reunions r
+        WHERE r.date IN (SELECT date FROM temp._mv_dates)
+    """,
+}
+
+# Tables dont les écritures rendent une date obsolète (date retrouvée par la course / réunion)
+DIRTY_DATE_SOURCES = {
+    'partants': "SELECT r.date FROM courses c JOIN reunions r ON c.reunion_id = r.id WHERE c.id = {ligne}.course_id",
+    'courses': "SELECT r.date FROM reunions r WHERE r.id = {ligne}.reunion_id",
+    'reunions': "SELECT {ligne}.date",
+}
+
+# Ids d'une ligne modifiée ou supprimée : ils peuvent ne plus apparaître à
+# la date concernée, on les note directement
+DIRTY_ID_SOURCES = {
+    'partants': (('cheval', 'cheval_id'), ('driver', 'driver_id')),
+    'reunions': (('hippodrome', 'hippodrome_id'),),
+}
+
+# Vues servies par les tables ci-dessus
+MATERIALIZED_VIEWS = (
+    'v_perf_chevaux', 'v_perf_drivers', 'v_stats_hippodromes',
+    'v_synergies_cheval_driver', 'v_top_chevaux_hippodrome',
+)
+
+# Bases dont les agrégats ont été créés dans ce processus
+_materialized_ready = set()
+
+
+def create_materialized_aggregates(db) -> bool:
+    """
+    Crée les tables de synthèse, le journal de rafraîchissement et les
+    triggers qui marquent les dates modifiées (idempotent)
+    
+    Returns:
+        True si les tables viennent d'être créées (remplissage complet fait)
+    """
+    
+    with db.connections.write() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'mv_refresh_log'")
+        nouvelles = cursor.fetchone() is None
+        
+        for table, colonnes, _, _, _, _ in MATERIALIZED_AGGREGATES:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ({colonnes})")
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS mv_refresh_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dates TEXT,
+                nb_chevaux INTEGER,
+                nb_drivers INTEGER,
+                nb_hippodromes INTEGER,
+                duree_sec REAL,
+                refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Dates et ids dont les agrégats sont obsolètes (alimentées par triggers)
+        cursor.execute("CREATE TABLE IF NOT EXISTS mv_dirty_dates (date DATE PRIMARY KEY)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS mv_dirty_ids (
+                type TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                PRIMARY KEY (type, id)
+            )
+        """)
+        
+        for table, source in DIRTY_DATE_SOURCES.items():
+            for evenement, lignes in (('insert', ('NEW',)), ('update', ('NEW', 'OLD')), ('delete', ('OLD',))):
+                corps = [
+                    f"INSERT OR IGNORE INTO mv_dirty_dates (date) {source.format(ligne=ligne)};"
+                    for ligne in lignes
+                ]
+                if 'OLD' in lignes:
+                    corps += [
+                        f"INSERT OR IGNORE INTO mv_dirty_ids (type, id) "
+                        f"SELECT '{type_cle}', OLD.{colonne} WHERE OLD.{colonne} IS NOT NULL;"
+                        for type_cle, colonne in DIRTY_ID_SOURCES.get(table, ())
+                    ]
+                corps = "\n".join(corps)
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_mv_{table}_{evenement}
+                    AFTER {evenement.upper()} ON {table}
+                    BEGIN
+                        {corps}
+                    END
+                """)
+    
+    if nouvelles:
+        refresh_materialized_aggregates(db, complet=True)
+    
+    _materialized_ready.add(db.db_path)
+    return nouvelles
+
+
+def stale_aggregate_dates(db) -> list:
+    """Dates modifiées depuis le dernier rafraîchissement des agrégats"""
+    
+    with db.connections.read() as cursor:
+        cursor.execute("SELECT date FROM mv_dirty_dates ORDER BY date")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def refresh_materialized_aggregates(db, dates: list = None, complet: bool = False) -> dict:
+    """
+    Rafraîchit les agrégats matérialisés
+    
+    Les ids (chevaux, drivers, hippodromes) présents aux dates données sont
+    recalculés, et seulement eux, en une transaction : les pages continuent
+    de lire l'état précédent jusqu'au commit.
+    
+    Args:
+        dates: Dates importées (défaut: dates marquées obsolètes)
+        complet: Tout recalculer
+    
+    Returns:
+        Dict avec stats de rafraîchissement
+    """
+    
+    debut = time.perf_counter()
+    stats = {'dates': [], 'nb_chevaux': 0, 'nb_drivers': 0, 'nb_hippodromes': 0}
+    
+    with db.connections.write() as cursor:
+        if not complet:
+            if dates is None:
+                cursor.execute("SELECT date FROM mv_dirty_dates ORDER BY date")
+                dates = [row[0] for row in cursor.fetchall()]
+            dates = [str(d) for d in dates]
+            cursor.execute("SELECT COUNT(*) FROM mv_dirty_ids")
+            if not dates and not cursor.fetchone()[0]:
+                return stats
+            
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _mv_dates (date DATE PRIMARY KEY)")
+            cursor.execute("DELETE FROM temp._mv_dates")
+            cursor.executemany("INSERT OR IGNORE INTO temp._mv_dates (date) VALUES (?)", [(d,) for d in dates])
+            
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _mv_ids (type TEXT, id INTEGER, PRIMARY KEY (type, id))")
+            cursor.execute("DELETE FROM temp._mv_ids")
+            for type_cle, requete in AFFECTED_IDS.items():
+                cursor.execute(f"INSERT INTO temp._mv_ids (type, id) SELECT '{type_cle}', * FROM ({requete})")
+            cursor.execute("INSERT OR IGNORE INTO temp._mv_ids (type, id) SELECT type, id FROM mv_dirty_ids")
+            
+            cursor.execute("SELECT type, COUNT(*) FROM temp._mv_ids GROUP BY type")
+            comptes = dict(cursor.fetchall())
+            stats['nb_chevaux'] = comptes.get('cheval', 0)
+            stats['nb_drivers'] = comptes.get('driver', 0)
+            stats['nb_hippodromes'] = comptes.get('hippodrome', 0)
+        
+        for table, _, type_cle, cle, colonne, requete in MATERIALIZED_AGGREGATES:
+            if complet:
+                cursor.execute(f"DELETE FROM {table}")
+                cursor.execute(f"INSERT INTO {table} {requete.format(filtre='1 = 1')}")
+            else:
+                ids = f"(SELECT id FROM temp._mv_ids WHERE type = '{type_cle}')"
+                cursor.execute(f"DELETE FROM {table} WHERE {cle} IN {ids}")
+                cursor.execute(f"INSERT INTO {table} {requete.format(filtre=f'{colonne} IN {ids}')}")
+        
+        if complet:
+            cursor.execute("DELETE FROM mv_dirty_dates")
+        else:
+            cursor.execute("DELETE FROM mv_dirty_dates WHERE date IN (SELECT date FROM temp._mv_dates)")
+        cursor.execute("DELETE FROM mv_dirty_ids")
+        
+        stats['dates'] = dates or []
+        stats['duree_sec'] = round(time.perf_counter() - debut, 3)
+        
+        cursor.execute("""
+            INSERT INTO mv_refresh_log (dates, nb_chevaux, nb_drivers, nb_hippodromes, duree_sec)
+            VALUES (?, ?, ?, ?, ?)
+        """, (None if complet else ','.join(dates), stats['nb_chevaux'], stats['nb_drivers'],
+              stats['nb_hippodromes'], stats['duree_sec']))
+    
+    return stats
+
+
+def ensure_fresh_aggregates(db) -> dict:
+    """
+    À appeler avant de lire les agrégats : crée les tables au premier appel,
+    puis rafraîchit les dates obsolètes (une lecture de mv_dirty_dates si rien n'a changé)
+    """
+    
+    if db.db_path not in _materialized_ready:
+        create_materialized_aggregates(db)
+    
+    if not stale_aggregate_dates(db):
+        return {'dates': []}
+    
+    return refresh_materialized_aggregates(db)
+
+
 def create_optimized_views(db):
     """
     Crée des vues SQL optimisées pour les requêtes fréquentes
@@ -94,15 +415,15 @@ def create_optimized_views(db):
             ch.id as cheval_id,
             ch.nom as cheval,
             ch.elo,
-            ch.nb_courses,
-            ch.nb_victoires,
-            ch.nb_places,
+            mv.nb_courses,
+            mv.nb_victoires,
+            mv.nb_places,
             ch.gains_total,
-            ROUND(ch.nb_victoires * 100.0 / NULLIF(ch.nb_courses, 0), 2) as taux_victoire,
-            ROUND(ch.nb_places * 100.0 / NULLIF(ch.nb_courses, 0), 2) as taux_place,
-            ROUND(ch.gains_total / NULLIF(ch.nb_courses, 0), 0) as gain_moyen_course
-        FROM chevaux ch
-        WHERE ch.nb_courses > 0
+            ROUND(mv.nb_victoires * 100.0 / mv.nb_courses, 2) as taux_victoire,
+            ROUND(mv.nb_places * 100.0 / mv.nb_courses, 2) as taux_place,
+            ROUND(ch.gains_total / mv.nb_courses, 0) as gain_moyen_course
+        FROM mv_perf_chevaux mv
+        JOIN chevaux ch ON mv.cheval_id = ch.id
     """)
     
     # ==================== VUE : PERFORMANCES DRIVERS ====================
@@ -113,13 +434,13 @@ def create_optimized_views(db):
             d.id as driver_id,
             d.nom as driver,
             d.elo,
-            d.nb_courses,
-            d.nb_victoires,
+            mv.nb_courses,
+            mv.nb_victoires,
             d.taux_victoire,
             d.taux_place,
-            ROUND(d.nb_victoires * 100.0 / NULLIF(d.nb_courses, 0), 2) as taux_victoire_calcule
-        FROM drivers d
-        WHERE d.nb_courses > 0
+            ROUND(mv.nb_victoires * 100.0 / mv.nb_courses, 2) as taux_victoire_calcule
+        FROM mv_perf_drivers mv
+        JOIN drivers d ON mv.driver_id = d.id
     """)
     
     # ==================== VUE : ROI PARIS ====================
@@ -174,18 +495,14 @@ def create_optimized_views(db):
         SELECT 
             h.nom as hippodrome,
             ch.nom as cheval,
-            COUNT(*) as nb_courses,
-            SUM(CASE WHEN p.rang_arrivee = 1 THEN 1 ELSE 0 END) as victoires,
-            AVG(p.cote_pmu) as cote_moyenne,
-            ROUND(SUM(CASE WHEN p.rang_arrivee = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) as taux_victoire
-        FROM partants p
-        JOIN courses c ON p.course_id = c.id
-        JOIN reunions r ON c.reunion_id = r.id
-        JOIN hippodromes h ON r.hippodrome_id = h.id
-        JOIN chevaux ch ON p.cheval_id = ch.id
-        WHERE p.rang_arrivee IS NOT NULL
-        GROUP BY h.id, ch.id
-        HAVING nb_courses >= 3
+            mv.nb_courses,
+            mv.victoires,
+            mv.cote_moyenne,
+            ROUND(mv.victoires * 100.0 / mv.nb_courses, 2) as taux_victoire
+        FROM mv_top_chevaux_hippodrome mv
+        JOIN hippodromes h ON mv.hippodrome_id = h.id
+        JOIN chevaux ch ON mv.cheval_id = ch.id
+        WHERE mv.nb_courses >= 3
     """)
     
     # ==================== VUE : SYNERGIES CHEVAL/DRIVER ====================
@@ -195,18 +512,16 @@ def create_optimized_views(db):
         SELECT 
             ch.nom as cheval,
             d.nom as driver,
-            COUNT(*) as nb_courses,
-            SUM(CASE WHEN p.rang_arrivee = 1 THEN 1 ELSE 0 END) as victoires,
-            SUM(CASE WHEN p.rang_arrivee <= 3 THEN 1 ELSE 0 END) as places,
-            ROUND(SUM(CASE WHEN p.rang_arrivee = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) as taux_victoire,
-            ROUND(SUM(CASE WHEN p.rang_arrivee <= 3 THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) as taux_place,
-            AVG(p.cote_pmu) as cote_moyenne
-        FROM partants p
-        JOIN chevaux ch ON p.cheval_id = ch.id
-        JOIN drivers d ON p.driver_id = d.id
-        WHERE p.rang_arrivee IS NOT NULL
-        GROUP BY ch.id, d.id
-        HAVING nb_courses >= 2
+            mv.nb_courses,
+            mv.victoires,
+            mv.places,
+            ROUND(mv.victoires * 100.0 / mv.nb_courses, 2) as taux_victoire,
+            ROUND(mv.places * 100.0 / mv.nb_courses, 2) as taux_place,
+            mv.cote_moyenne
+        FROM mv_synergies_cheval_driver mv
+        JOIN chevaux ch ON mv.cheval_id = ch.id
+        JOIN drivers d ON mv.driver_id = d.id
+        WHERE mv.nb_courses >= 2
     """)
     
     # ==================== VUE : STATS PAR HIPPODROME ====================
@@ -215,29 +530,32 @@ def create_optimized_views(db):
         CREATE VIEW IF NOT EXISTS v_stats_hippodromes AS
         SELECT 
             h.nom as hippodrome,
-            COUNT(DISTINCT r.id) as nb_reunions,
-            COUNT(DISTINCT c.id) as nb_courses,
-            COUNT(p.id) as nb_partants,
-            SUM(c.allocation) as allocation_totale,
-            AVG(c.nombre_partants) as partants_moyen,
-            MIN(r.date) as premiere_course,
-            MAX(r.date) as derniere_course
-        FROM hippodromes h
-        LEFT JOIN reunions r ON h.id = r.hippodrome_id
-        LEFT JOIN courses c ON r.id = c.reunion_id
-        LEFT JOIN partants p ON c.id = p.course_id
-        GROUP BY h.id
+            mv.nb_reunions,
+            mv.nb_courses,
+            mv.nb_partants,
+            mv.allocation_totale,
+            mv.partants_moyen,
+            mv.premiere_course,
+            mv.derniere_course
+        FROM mv_stats_hippodromes mv
+        JOIN hippodromes h ON mv.hippodrome_id = h.id
     """)
     
-    # Créer toutes les vues
-    for view_sql in views:
-        try:
-            db.cursor.execute(view_sql)
-            print(f"✅ Vue créée")
-        except Exception as e:
-            print(f"⚠️ Erreur création vue: {e}")
+    # Les vues agrégées lisent les tables matérialisées : on remplace les
+    # anciennes définitions (agrégation à la volée) si elles existent
+    create_materialized_aggregates(db)
+    with db.connections.write() as cursor:
+        for view in MATERIALIZED_VIEWS:
+            cursor.execute(f"DROP VIEW IF EXISTS {view}")
+        
+        # Créer toutes les vues
+        for view_sql in views:
+            try:
+                cursor.execute(view_sql)
+                print(f"✅ Vue créée")
+            except Exception as e:
+                print(f"⚠️ Erreur création vue: {e}")
     
-    db.conn.commit()
     print(f"\n✅ {len(views)} vues SQL créées!")
 
 
@@ -264,15 +582,20 @@ def create_performance_indexes(db):
         # Index pour les statistiques
         "CREATE INDEX IF NOT EXISTS idx_paris_statut_type ON paris(statut, type_pari)",
         "CREATE INDEX IF NOT EXISTS idx_borda_scores_config ON borda_scores(config_id, score_total DESC)",
+        
+        # Classements des pages d'analyse (agrégats matérialisés, cf. query_advisor)
+        "CREATE INDEX IF NOT EXISTS idx_mv_perf_chevaux_nb_courses ON mv_perf_chevaux(nb_courses DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_mv_perf_drivers_nb_courses ON mv_perf_drivers(nb_courses DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_mv_stats_hippodromes_nb_courses ON mv_stats_hippodromes(nb_courses DESC)",
     ]
     
-    for index_sql in indexes:
-        try:
-            db.cursor.execute(index_sql)
-        except:
-            pass
+    with db.connections.write() as cursor:
+        for index_sql in indexes:
+            try:
+                cursor.execute(index_sql)
+            except:
+                pass
     
-    db.conn.commit()
     print(f"✅ Index de performance créés!")
 
 
@@ -285,4 +608,9 @@ if __name__ == "__main__":
     create_optimized_views(db)
     create_performance_indexes(db)
     
+    stats = refresh_materialized_aggregates(db)
+    if stats['dates']:
+        print(f"🔄 Agrégats rafraîchis: {len(stats['dates'])} dates, {stats['nb_chevaux']} chevaux, "
+              f"{stats['nb_drivers']} drivers, {stats['nb_hippodromes']} hippodromes")
+    
     print("\n✅ Optimisation terminée!")
@@ -106,8 +106,7 @@ try:
             traceback.print_exc()
             break
     
-    importer.db.conn.commit()
-    print(f"\n✅ Commit réussi")
+    print(f"\n✅ Partants enregistrés (une transaction par écriture)")
     
     # Vérifier
     importer.db.cursor.execute("""
@@ -10,6 +10,9 @@ from pathlib import Path
 import json
 from datetime import datetime
 
+from borda_routing import field_size_bucket
+import scoring_kernel
+
 
 class ForeignRaceImporter:
     """Importateur de courses étrangères"""
@@ -195,19 +198,8 @@ class AutoBordaGenerator:
         Args:
             nb_partants: Nombre exact de partants (sera converti en range)
         """
-        # Déterminer la tranche de partants
-        if nb_partants < 8:
-            range_str = "0-8"
-        elif nb_partants < 10:
-            range_str = "8-10"
-        elif nb_partants < 12:
-            range_str = "10-12"
-        elif nb_partants < 14:
-            range_str = "12-14"
-        elif nb_partants < 16:
-            range_str = "14-16"
-        else:
-            range_str = "16+"
+        # Déterminer la tranche de partants (mêmes tranches que le routage Borda)
+        range_str = field_size_bucket(nb_partants)
         
         system_key = self.generate_borda_key(hippodrome, discipline, range_str)
         
@@ -222,6 +214,39 @@ class AutoBordaGenerator:
         
         return system_key, weights, True
     
+    @staticmethod
+    def scoring_spec(weights):
+        """Critères du score Borda pour scoring_kernel.score (poids par critère)"""
+        return (
+            ('Borda', 'somme', (
+                # 1. Popularité (inversé: 1 = meilleur)
+                {'colonne': 'Popularite', 'transform': 'popularite_borda',
+                 'facteurs': (100, weights.get('popularite', 0.2))},
+                # 2. Cote (optimal 3-15)
+                {'colonne': 'Cote', 'transform': 'cote', 'valeurs': (100, 70, 50),
+                 'facteurs': (weights.get('cote', 0.2),)},
+                # 3. Gains historiques (normalisés sur 100000€)
+                {'colonne': 'Gains Totaux', 'transform': 'gains',
+                 'facteurs': (100, weights.get('gains', 0.2))},
+                # 4. Place à la corde (numéro bas = avantage)
+                {'colonne': 'Numero', 'transform': 'corde',
+                 'facteurs': (weights.get('corde', 0.15),)},
+                # 5. Forme récente (bonnes places dans la musique)
+                {'colonne': 'Musique', 'transform': 'forme',
+                 'facteurs': (weights.get('forme', 0.25),)},
+            )),
+        )
+    
+    def calculate_borda_scores(self, df, weights):
+        """
+        Score Borda de tous les chevaux d'un DataFrame en une passe
+        
+        Returns:
+            Array des scores (max 300)
+        """
+        result = scoring_kernel.score(df, self.scoring_spec(weights), engine='auto_borda')
+        return np.minimum(result['total'], 300)  # Score Borda max = 300
+    
     def calculate_borda_score(self, horse_data, weights):
         """
         Calcule le score Borda pour un cheval selon les poids
@@ -230,45 +255,8 @@ class AutoBordaGenerator:
             horse_data: Series avec les données du cheval
             weights: Dict avec les poids par critère
         """
-        score = 0
-        
-        # 1. Popularité (inversé: 1 = meilleur)
-        if 'Popularite' in horse_data.index and pd.notna(horse_data['Popularite']):
-            pop_score = (20 - min(horse_data['Popularite'], 20)) / 20 * 100
-            score += pop_score * weights.get('popularite', 0.2)
-        
-        # 2. Cote (optimal 3-15)
-        if 'Cote' in horse_data.index and pd.notna(horse_data['Cote']):
-            cote = horse_data['Cote']
-            if 3 <= cote <= 15:
-                cote_score = 100
-            elif cote < 3:
-                cote_score = 70
-            else:
-                cote_score = 50
-            score += cote_score * weights.get('cote', 0.2)
-        
-        # 3. Gains historiques
-        if 'Gains Totaux' in horse_data.index and pd.notna(horse_data['Gains Totaux']):
-            # Normaliser sur 100000€
-            gains_score = min(horse_data['Gains Totaux'] / 100000, 1) * 100
-            score += gains_score * weights.get('gains', 0.2)
-        
-        # 4. Place à la corde (numéro bas = avantage)
-        if 'Numero' in horse_data.index and pd.notna(horse_data['Numero']):
-            corde_score = max(0, 100 - (horse_data['Numero'] * 5))
-            score += corde_score * weights.get('corde', 0.15)
-        
-        # 5. Forme récente (musique)
-        if 'Musique' in horse_data.index and pd.notna(horse_data['Musique']):
-            musique = str(horse_data['Musique'])
-            # Compter les bonnes places (1, 2, 3) dans les 5 dernières courses
-            recent = musique[:10]  # 5 dernières courses environ
-            bonnes_places = sum(1 for c in recent if c in ['1', '2', '3'])
-            forme_score = (bonnes_places / 5) * 100 if len(recent) >= 5 else 50
-            score += forme_score * weights.get('forme', 0.25)
-        
-        return min(score, 300)  # Score Borda max = 300
+        result = scoring_kernel.score(horse_data, self.scoring_spec(weights), engine='auto_borda')
+        return min(float(result['total'][0]), 300)  # Score Borda max = 300
 
 
 def display_foreign_races_manager():
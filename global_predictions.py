@@ -11,6 +11,9 @@ from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 
+from borda_routing import compile_borda_router
+import scoring_kernel
+
 
 class GlobalPredictionEngine:
     """Moteur de pronostique pour toutes les courses"""
@@ -31,50 +34,43 @@ class GlobalPredictionEngine:
     
     def select_best_borda(self, row, hippodrome, discipline, nb_partants):
         """Sélectionne le meilleur système Borda pour cette course"""
-        borda_cols = [col for col in row.index if 'Borda' in col]
-        
-        # Logique de sélection intelligente
-        selected = None
-        
-        hippo_lower = hippodrome.lower() if pd.notna(hippodrome) else ''
-        
-        if 'vincennes' in hippo_lower or 'vincenne' in hippo_lower:
-            if 8 <= nb_partants < 10:
-                selected = 'Borda - trot 8-10 chevaux  vincenne'
-            elif 10 <= nb_partants < 12:
-                selected = 'Borda - trot 10-12 chevaux  vincenne'
-            elif 12 <= nb_partants < 14:
-                selected = 'Borda - trot 12-14 chevaux  vincenne'
-            elif 14 <= nb_partants < 16:
-                selected = 'Borda - trot 14-16 chevaux  vincenne'
-            elif nb_partants >= 12:
-                selected = 'Borda - monté 12-16 chevaux  vincenne'
-        
-        elif 'pau' in hippo_lower:
-            if discipline == 'A':
-                selected = 'Borda - Pau attelé'
-            elif discipline == 'M':
-                selected = 'Borda - Pau monté'
-            else:
-                selected = 'Borda - Pau plat'
-        
-        elif 'cagne' in hippo_lower:
-            if discipline == 'A':
-                selected = 'Borda - cagne sur mer attelé'
-            else:
-                selected = 'Borda - cagne sur mer monté'
-        
-        elif 'deauville' in hippo_lower:
-            selected = 'Borda - Deauville galot pcf'
-        
-        elif 'bousc' in hippo_lower:
-            selected = 'Borda - le boucast'
-        
-        # Fallback
-        if not selected or selected not in row.index:
-            selected = 'Borda - Borda par Défaut'
-        
-        return row.get(selected, 0) if selected in row.index else 0
+        selected = self.select_borda_column(row.index, hippodrome, discipline, nb_partants)
+        return row.get(selected, 0) if selected is not None else 0
+    
+    def select_borda_column(self, columns, hippodrome, discipline, nb_partants):
+        """
+        Nom de la colonne Borda à utiliser pour une course
+        (None si ni la colonne choisie ni le Borda par défaut n'existent)
+        """
+        return compile_borda_router(columns).resolve(hippodrome, discipline, nb_partants)
+    
+    # Composantes du score (voir scoring_kernel.score), sur 100 au total
+    SCORING_SPEC = (
+        ('Borda', 'somme', (                     # 40%
+            {'colonne': 'borda', 'transform': 'borda', 'facteurs': (40,), 'positif': True},
+        )),
+        ('ELO', 'somme', (                       # 23%
+            {'colonne': 'ELO_Cheval', 'transform': 'elo', 'facteurs': (10,)},
+            {'colonne': 'ELO_Jockey', 'transform': 'elo', 'facteurs': (8,)},
+            {'colonne': 'ELO_Entraineur', 'transform': 'elo', 'facteurs': (5,)},
+        )),
+        ('IA', 'somme', (                        # 9%
+            {'colonne': 'IA_Gagnant', 'transform': 'brut', 'facteurs': (6,)},
+            {'colonne': 'IA_Couple', 'transform': 'brut', 'facteurs': (3,)},
+        )),
+        ('TP', 'somme', (                        # 4%
+            {'colonne': 'Turf Points', 'transform': 'turf_points', 'facteurs': (4,)},
+        )),
+        ('TxVict', 'somme', (                    # 3%
+            {'colonne': 'Taux Victoire', 'transform': 'brut', 'facteurs': (3,), 'virgule': True},
+        )),
+        ('Pop', 'somme', (                       # 6% : popularité & cote (BZH sinon PMU)
+            {'colonne': 'Popularite', 'transform': 'popularite', 'plafond': True, 'facteurs': (3,)},
+            {'colonne': 'cote', 'transform': 'cote', 'valeurs': (3, 2, 1)},
+        )),
+    )
+    
+    COTE_BZH_COLUMNS = ['Cote BZH', 'cote_bzh', 'CoteBZH', 'Cote_BZH']
     
     def calculate_horse_score(self, row, hippodrome, discipline, nb_partants, forced_borda=None):
         """
@@ -83,267 +79,248 @@ class GlobalPredictionEngine:
         Args:
             forced_borda: Nom du système Borda à forcer (sans le préfixe "Borda - ")
         """
-        score = 0
-        components = {}
-        
-        # 1. Score Borda (40%)
+        # Score Borda : forcé ou sélection automatique
         if forced_borda:
-            # Utiliser le Borda forcé
             borda_col = f"Borda - {forced_borda}"
             borda_raw = row.get(borda_col, 0) if borda_col in row.index else 0
         else:
-            # Utiliser la sélection automatique
             borda_raw = self.select_best_borda(row, hippodrome, discipline, nb_partants)
         try:
             borda_raw = float(borda_raw) if pd.notna(borda_raw) else 0
         except:
             borda_raw = 0
         
-        borda_normalized = (borda_raw / 300) * 40 if borda_raw > 0 else 0
-        score += borda_normalized
-        components['Borda'] = round(borda_normalized, 2)
-        
-        # 2. ELO Combiné (23%)
-        elo_score = 0
-        if 'ELO_Cheval' in row.index and pd.notna(row['ELO_Cheval']):
-            try:
-                elo_cheval = float(row['ELO_Cheval'])
-                elo_score += ((elo_cheval - 1200) / 600) * 10
-            except:
-                pass
-        
-        if 'ELO_Jockey' in row.index and pd.notna(row['ELO_Jockey']):
-            try:
-                elo_jockey = float(row['ELO_Jockey'])
-                elo_score += ((elo_jockey - 1200) / 600) * 8
-            except:
-                pass
-        
-        if 'ELO_Entraineur' in row.index and pd.notna(row['ELO_Entraineur']):
-            try:
-                elo_entraineur = float(row['ELO_Entraineur'])
-                elo_score += ((elo_entraineur - 1200) / 600) * 5
-            except:
-                pass
-        
-        score += elo_score
-        components['ELO'] = round(elo_score, 2)
+        result, source = self._score_kernel(row, np.array([borda_raw]))
         
-        # 3. IA Prédictions (9%)
-        ia_score = 0
-        if 'IA_Gagnant' in row.index and pd.notna(row['IA_Gagnant']):
-            try:
-                ia_gagnant = float(row['IA_Gagnant'])
-                ia_score += ia_gagnant * 6
-            except:
-                pass
-        
-        if 'IA_Couple' in row.index and pd.notna(row['IA_Couple']):
-            try:
-                ia_couple = float(row['IA_Couple'])
-                ia_score += ia_couple * 3
-            except:
-                pass
+        components = {nom: self._rounded(result['components'][nom])[0]
+                      for nom, _, _ in self.SCORING_SPEC}
+        if source[0]:
+            components['Cote_Source'] = source[0]
         
-        score += ia_score
-        components['IA'] = round(ia_score, 2)
+        # Score final sur 100
+        return min(float(result['total'][0]), 100), components
+    
+    # ==================== MOTEUR COLONNAIRE ====================
+    
+    def _score_kernel(self, df, borda_values):
+        """
+        Composantes de tous les chevaux (ou d'un seul, df étant alors sa
+        Series) via le noyau de scoring
         
-        # 4. Turf Points (4%)
-        tp_score = 0
-        if 'Turf Points' in row.index and pd.notna(row['Turf Points']):
-            try:
-                turf_points = float(row['Turf Points'])
-                tp_score = (turf_points / 2000) * 4
-            except:
-                pass
+        Returns:
+            (résultat de scoring_kernel.score, source de la cote par ligne)
+        """
+        # Cote BZH en priorité (plusieurs noms possibles), sinon Cote PMU
+        cote, index = scoring_kernel.coalesce_columns(df, self.COTE_BZH_COLUMNS + ['Cote'], virgule=True)
+        noms = ['BZH'] * len(self.COTE_BZH_COLUMNS) + ['PMU']
+        source = [noms[i] if i >= 0 else None for i in index.tolist()]
+        
+        result = scoring_kernel.score(df, self.SCORING_SPEC,
+                                      inputs={'borda': borda_values, 'cote': cote},
+                                      engine='global')
+        return result, source
+    
+    @staticmethod
+    def _rounded(values, ndigits=2):
+        """Valeurs arrondies (floats, 0.0 pour une composante sans donnée)"""
+        return np.round(values, ndigits).tolist()
+    
+    def score_columns(self, df, borda_values):
+        """
+        Calcule les composantes et le score de tous les chevaux en une fois
         
-        score += tp_score
-        components['TP'] = round(tp_score, 2)
+        Args:
+            df: Partants (une ligne par cheval)
+            borda_values: Valeur Borda brute de chaque ligne (NaN si absente)
         
-        # 5. Taux de victoire (3%)
-        tv_score = 0
-        if 'Taux Victoire' in row.index and pd.notna(row['Taux Victoire']):
-            try:
-                taux_victoire = float(str(row['Taux Victoire']).replace(',', '.'))
-                tv_score = taux_victoire * 3
-            except:
-                pass
+        Returns:
+            Dict {composante: liste}, dans l'ordre de SCORING_SPEC,
+            plus 'Score' et 'Cote_Source' (None si aucune cote)
+        """
         
-        score += tv_score
-        components['TxVict'] = round(tv_score, 2)
+        result, source = self._score_kernel(df, borda_values)
         
-        # 6. Popularité & Cote BZH (6%)
-        pop_score = 0
-        if 'Popularite' in row.index and pd.notna(row['Popularite']):
-            try:
-                popularite = float(row['Popularite'])
-                pop_normalized = 1 - (min(popularite, 20) / 20)
-                pop_score += pop_normalized * 3
-            except:
-                pass
-        
-        # UTILISER COTE BZH en priorité, sinon fallback sur Cote PMU
-        cote_used = None
-        cote_source = None
-        
-        # Essayer plusieurs variantes de nom pour Cote BZH
-        for col_name in ['Cote BZH', 'cote_bzh', 'CoteBZH', 'Cote_BZH']:
-            if col_name in row.index and pd.notna(row[col_name]):
-                try:
-                    cote_used = float(str(row[col_name]).replace(',', '.'))
-                    cote_source = 'BZH'
-                    break
-                except:
-                    pass
+        # Score final sur 100
+        score = result['total']
+        score = np.where(score > 100, 100, score)
+        
+        columns = {'Score': self._rounded(score)}
+        for nom, _, _ in self.SCORING_SPEC:
+            columns[nom] = self._rounded(result['components'][nom])
+        columns['Cote_Source'] = source
+        return columns
+    
+    @staticmethod
+    def confidence_column(components):
+        """
+        Confiance de chaque cheval : 100 - 20 × écart-type des composantes
+        strictement positives (50 s'il y en a 2 ou moins), bornée à [30, 100]
+        """
         
-        # Fallback sur Cote PMU si pas de Cote BZH
-        if cote_used is None and 'Cote' in row.index and pd.notna(row['Cote']):
-            try:
-                cote_used = float(str(row['Cote']).replace(',', '.'))
-                cote_source = 'PMU'
-            except:
-                pass
-        
-        # Calculer le score basé sur la cote (BZH ou PMU)
-        if cote_used is not None:
-            if 3 <= cote_used <= 15:
-                pop_score += 3
-            elif cote_used < 3:
-                pop_score += 2
+        R = np.column_stack([np.asarray(c, dtype=float) for c in components])
+        M = R > 0
+        k = M.sum(axis=1)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moyenne = np.where(M, R, 0.0).sum(axis=1) / k
+            ecarts = R - moyenne[:, None]
+            std = np.sqrt(np.where(M, ecarts * ecarts, 0.0).sum(axis=1) / k)
+        confiance = 100 - (std * 20)
+        
+        result = []
+        for c, n in zip(confiance.tolist(), k.tolist()):
+            if n <= 2:
+                result.append(50)
+            elif c >= 100:
+                result.append(100)
+            elif c <= 30:
+                result.append(30)
             else:
-                pop_score += 1
-        
-        score += pop_score
-        components['Pop'] = round(pop_score, 2)
-        if cote_source:
-            components['Cote_Source'] = cote_source
-        
-        # Score final sur 100
-        return min(score, 100), components
+                result.append(round(c, 1))
+        return result
     
     def generate_all_predictions(self, df, race_config=None):
         """
         Génère les pronostiques pour toutes les courses
         
+        Toutes les conversions sont faites une fois pour le jour entier et
+        les scores calculés sur des colonnes (score_columns) ; seuls les
+        choix propres à chaque course (Borda, résumé) bouclent par course.
+        
         Args:
             df: DataFrame avec les données
             race_config: Dict optionnel avec la config manuelle par course
                         Format: {course_id: {'discipline': 'A', 'borda': 'trot 10-12...'}}
         """
         
-        # Grouper par course
-        courses = df['Course'].unique()
-        
-        all_predictions = []
-        course_summaries = []
-        
-        for course in courses:
-            course_df = df[df['Course'] == course].copy()
-            
-            # DÉDUPLICATION IMMÉDIATE : Garder UNE SEULE ligne par cheval
-            # En cas de doublons, garder la première occurrence
-            if 'Numero' in course_df.columns:
-                nb_avant_dedup = len(course_df)
-                course_df = course_df.drop_duplicates(subset=['Numero'], keep='first').reset_index(drop=True)
-                nb_apres_dedup = len(course_df)
-                
-                if nb_avant_dedup != nb_apres_dedup:
-                    print(f"⚠️ {course}: {nb_avant_dedup - nb_apres_dedup} doublons retirés ({nb_avant_dedup} → {nb_apres_dedup})")
-            
-            # Infos de la course
-            hippodrome = course_df['hippodrome'].iloc[0]
-            heure = course_df['heure'].iloc[0] if 'heure' in course_df.columns else 'N/A'
-            distance = course_df['distance'].iloc[0] if 'distance' in course_df.columns else 'N/A'
-            nb_partants = len(course_df)  # Maintenant c'est le BON nombre
+        # Courses dans l'ordre d'apparition, lignes dans l'ordre du fichier
+        codes, courses = pd.factorize(df['Course'])
+        garder = codes >= 0
+        
+        # DÉDUPLICATION IMMÉDIATE : Garder UNE SEULE ligne par cheval
+        # En cas de doublons, garder la première occurrence
+        if 'Numero' in df.columns:
+            doublons = df.duplicated(subset=['Course', 'Numero'], keep='first').to_numpy() & garder
+            if doublons.any():
+                nb_avant = np.bincount(codes[garder], minlength=len(courses))
+                nb_retires = np.bincount(codes[doublons], minlength=len(courses))
+                for i in np.flatnonzero(nb_retires):
+                    print(f"⚠️ {courses[i]}: {nb_retires[i]} doublons retirés ({nb_avant[i]} → {nb_avant[i] - nb_retires[i]})")
+            garder &= ~doublons
+        
+        positions = np.flatnonzero(garder)
+        positions = positions[np.argsort(codes[positions], kind='stable')]
+        if len(positions) == 0:
+            return pd.DataFrame(), pd.DataFrame()
+        
+        jour = df.iloc[positions].reset_index(drop=True)
+        course_codes = codes[positions]
+        debuts = np.r_[0, np.flatnonzero(np.diff(course_codes)) + 1]
+        fins = np.r_[debuts[1:], len(jour)]
+        
+        # Colonnes Borda converties une fois, routage compilé une fois
+        router = compile_borda_router(jour.columns)
+        borda_matrix = np.column_stack(
+            [scoring_kernel.column_values(jour, col) for col in router.columns] or [np.full(len(jour), np.nan)]
+        )
+        
+        def premiere(col, debut, defaut='N/A'):
+            return jour[col].iat[debut] if col in jour.columns else defaut
+        
+        # Infos par course et valeur Borda de chaque ligne
+        infos = []
+        borda_values = np.full(len(jour), np.nan)
+        
+        for debut, fin in zip(debuts.tolist(), fins.tolist()):
+            course = courses[course_codes[debut]]
+            hippodrome = jour['hippodrome'].iat[debut]
+            nb_partants = fin - debut
             
             # Utiliser la config manuelle si disponible
             if race_config and course in race_config:
                 discipline = race_config[course]['discipline']
                 forced_borda = race_config[course]['borda']
-            else:
-                discipline = course_df['discipline'].iloc[0]
-                forced_borda = None
-            
-            # Déterminer quel Borda sera utilisé (pour info)
-            if forced_borda:
+                borda_col = f"Borda - {forced_borda}"
+                borda_index = router.columns.index(borda_col) if borda_col in router.columns else None
                 borda_name = forced_borda
             else:
-                sample_row = course_df.iloc[0]
-                test_borda = self.select_best_borda(sample_row, hippodrome, discipline, nb_partants)
-                
-                # Trouver le nom du système utilisé
-                borda_name = "Borda par Défaut"
-                for col in sample_row.index:
-                    if 'Borda' in col:
-                        try:
-                            if float(sample_row[col]) == float(test_borda):
-                                borda_name = col.replace('Borda - ', '')
-                                break
-                        except:
-                            pass
-            
-            # Calculer les scores pour chaque cheval
-            predictions = []
-            
-            for idx, row in course_df.iterrows():
-                score, components = self.calculate_horse_score(
-                    row, hippodrome, discipline, nb_partants, forced_borda
-                )
-                
-                # Calculer la confiance (basée sur la variance des composantes)
-                # Filtrer uniquement les valeurs numériques
-                comp_values = []
-                for v in components.values():
-                    try:
-                        if isinstance(v, (int, float)) and v > 0:
-                            comp_values.append(float(v))
-                    except:
-                        pass
-                
-                confidence = 100 - (np.std(comp_values) * 20) if len(comp_values) > 2 else 50
-                confidence = max(30, min(100, confidence))
-                
-                predictions.append({
-                    'Course': course,
-                    'Hippodrome': hippodrome,
-                    'Heure': heure,
-                    'Distance': distance,
-                    'Discipline': discipline,
-                    'Numero': row.get('Numero', ''),
-                    'Cheval': row.get('Cheval', ''),
-                    'Driver': row.get('Driver', ''),
-                    'Entraineur': row.get('Entraineur', ''),
-                    'Cote': row.get('Cote', 'N/A'),
-                    'Score': round(score, 2),
-                    'Confiance': round(confidence, 1),
-                    **components
-                })
-            
-            # Trier par score
-            pred_df = pd.DataFrame(predictions)
-            pred_df = pred_df.sort_values('Score', ascending=False).reset_index(drop=True)
-            pred_df['Rang'] = range(1, len(pred_df) + 1)
+                discipline = jour['discipline'].iat[debut]
+                borda_index = router.column_index(hippodrome, discipline, nb_partants)
+                borda_name = (router.columns[borda_index].replace('Borda - ', '')
+                              if borda_index is not None else "Borda par Défaut")
             
-            all_predictions.extend(predictions)
+            if borda_index is not None:
+                borda_values[debut:fin] = borda_matrix[debut:fin, borda_index]
             
-            # Résumé de la course
-            top3 = pred_df.head(3)
-            course_summaries.append({
+            infos.append({
                 'Course': course,
                 'Hippodrome': hippodrome,
-                'Heure': heure,
-                'Distance': f"{distance}m" if distance != 'N/A' else 'N/A',
+                'Heure': premiere('heure', debut),
+                'Distance': premiere('distance', debut),
                 'Discipline': discipline,
                 'Nb_Partants': nb_partants,
                 'Borda_Utilisé': borda_name,
-                'Top1': f"N°{int(top3.iloc[0]['Numero'])} {top3.iloc[0]['Cheval']}",
-                'Score_Top1': top3.iloc[0]['Score'],
-                'Top2': f"N°{int(top3.iloc[1]['Numero'])} {top3.iloc[1]['Cheval']}",
-                'Top3': f"N°{int(top3.iloc[2]['Numero'])} {top3.iloc[2]['Cheval']}",
-                'Confiance_Moy': pred_df['Confiance'].mean()
             })
         
-        return pd.DataFrame(all_predictions), pd.DataFrame(course_summaries)
+        # Calculer les scores de tous les chevaux du jour
+        components = self.score_columns(jour, borda_values)
+        cote_source = components.pop('Cote_Source')
+        scores = components.pop('Score')
+        confiance = self.confidence_column(components.values())
+        
+        repeter = lambda cle: [info[cle] for info, debut, fin in zip(infos, debuts, fins)
+                               for _ in range(fin - debut)]
+        colonne = lambda col, defaut: jour[col].tolist() if col in jour.columns else [defaut] * len(jour)
+        
+        predictions = {
+            'Course': repeter('Course'),
+            'Hippodrome': repeter('Hippodrome'),
+            'Heure': repeter('Heure'),
+            'Distance': repeter('Distance'),
+            'Discipline': repeter('Discipline'),
+            'Numero': colonne('Numero', ''),
+            'Cheval': colonne('Cheval', ''),
+            'Driver': colonne('Driver', ''),
+            'Entraineur': colonne('Entraineur', ''),
+            'Cote': colonne('Cote', 'N/A'),
+            'Score': scores,
+            'Confiance': confiance,
+            **components
+        }
+        if any(s is not None for s in cote_source):
+            predictions['Cote_Source'] = [np.nan if s is None else s for s in cote_source]
+        
+        all_predictions = pd.DataFrame(predictions)
+        
+        # Résumé de chaque course : classement par Score décroissant, à
+        # score égal par Numero croissant (même règle que l'affichage)
+        score_arr = all_predictions['Score'].to_numpy()
+        numeros = predictions['Numero']
+        numeros_arr = np.asarray(numeros, dtype=float)
+        chevaux = predictions['Cheval']
+        
+        course_summaries = []
+        for info, debut, fin in zip(infos, debuts.tolist(), fins.tolist()):
+            ordre = debut + np.lexsort((numeros_arr[debut:fin], -score_arr[debut:fin]))
+            top3 = ordre[:3].tolist()
+            distance = info['Distance']
+            
+            course_summaries.append({
+                'Course': info['Course'],
+                'Hippodrome': info['Hippodrome'],
+                'Heure': info['Heure'],
+                'Distance': f"{distance}m" if distance != 'N/A' else 'N/A',
+                'Discipline': info['Discipline'],
+                'Nb_Partants': info['Nb_Partants'],
+                'Borda_Utilisé': info['Borda_Utilisé'],
+                'Top1': f"N°{int(numeros[top3[0]])} {chevaux[top3[0]]}",
+                'Score_Top1': score_arr[top3[0]],
+                'Top2': f"N°{int(numeros[top3[1]])} {chevaux[top3[1]]}",
+                'Top3': f"N°{int(numeros[top3[2]])} {chevaux[top3[2]]}",
+                'Confiance_Moy': np.asarray(confiance[debut:fin], dtype=float).mean()
+            })
+        
+        return all_predictions, pd.DataFrame(course_summaries)
 
 
 def display_global_predictions():
@@ -679,11 +656,11 @@ def display_global_predictions():
             # DÉDUPLICATION : S'assurer qu'il n'y a pas de doublons
             nb_avant = len(course_data)
             if 'Numero' in course_data.columns and 'Cheval' in course_data.columns:
-                course_data = course_data.sort_values('Score', ascending=False).drop_duplicates(
+                course_data = course_data.sort_values(['Score', 'Numero'], ascending=[False, True]).drop_duplicates(
                     subset=['Numero', 'Cheval'], keep='first'
                 ).reset_index(drop=True)
             else:
-                course_data = course_data.sort_values('Score', ascending=False).drop_duplicates(
+                course_data = course_data.sort_values(['Score', 'Numero'], ascending=[False, True]).drop_duplicates(
                     subset=['Numero'], keep='first'
                 ).reset_index(drop=True)
             
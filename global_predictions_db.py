@@ -33,11 +33,13 @@ def display_global_predictions():
         st.write("")
         if st.button("🔄 Recalculer tous les scores", type="primary"):
             with st.spinner("Calcul en cours..."):
-                stats = calculator.calculate_all_today(target_date)
+                stats = calculator.calculate_all_today(target_date, incremental=True)
                 
                 if stats['courses_calculees'] > 0:
                     st.success(f"✅ {stats['courses_calculees']} courses calculées!")
-                    st.info(f"📊 {stats['partants_analyses']} partants analysés")
+                    st.info(f"📊 {stats['partants_analyses']} partants analysés - "
+                            f"{stats['courses_recalculees']} courses recalculées, "
+                            f"{stats['scores_reecrits']} scores réécrits")
                 else:
                     st.warning("Aucune course trouvée pour cette date")
                 
@@ -96,6 +98,9 @@ def display_global_predictions():
         show_top = st.slider("Nombre de chevaux par course", 3, 10, 5)
         show_details = st.checkbox("Afficher les détails", value=False)
     
+    # Classements de toutes les courses (cache des pronostics, une lecture)
+    predictions = calculator.get_day_predictions(target_date, courses_df['course_code'].tolist())
+    
     # Afficher chaque course
     for idx, course in courses_df.iterrows():
         with st.container():
@@ -112,7 +117,7 @@ def display_global_predictions():
                 st.metric("👥 Partants", course['nombre_partants'])
             
             # Récupérer les scores Borda
-            scores_df = calculator.get_borda_scores_for_course(course['course_code'], 'default', target_date)
+            scores_df = predictions.get(course['course_code'], pd.DataFrame())
             
             if scores_df.empty:
                 st.warning("⚠️ Scores Borda non calculés pour cette course")
@@ -258,7 +263,7 @@ def display_global_predictions():
         all_pronos = []
         
         for _, course in courses_df.iterrows():
-            scores_df = calculator.get_borda_scores_for_course(course['course_code'], 'default', target_date)
+            scores_df = predictions.get(course['course_code'], pd.DataFrame())
             if not scores_df.empty:
                 top_5 = scores_df.head(5)
                 prono = "-".join(map(str, top_5['numero'].tolist()))
@@ -0,0 +1,217 @@
+"""
+📥 IMPORT DIRECT DES JSON PMU
+Alimente la base (courses, partants, arrivées) sans passer par le CSV
+intermédiaire du convertisseur
+"""
+
+from conversion.json_to_csv_converter import (
+    find_json_files, group_race_files, filter_since, iter_converted_races
+)
+from turf_database_complete import TurfDatabase, get_turf_database, merge_import_stats
+from pathlib import Path
+from typing import Dict, List
+
+# Colonnes d'un partant fournies par les JSON PMU : seules colonnes mises à
+# jour sur un partant déjà en base (ex: importé depuis l'export Turf BZH)
+COLONNES_MISES_A_JOUR = ('cote_pmu', 'rang_arrivee', 'rapport_simple_gagnant', 'rapport_simple_place')
+
+
+def _valeur(value):
+    """Les extracteurs JSON renvoient '' pour une donnée absente"""
+    return None if value == '' else value
+
+
+def _entier(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _reel(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _dividendes_simples(rows, type_pari: str) -> Dict[int, float]:
+    """Rapport pour 1 € de chaque numéro payé sur un pari simple (gagnant / placé)"""
+    dividendes = {}
+    for combinaison, rapport in rows[0].get('dividendes', {}).get(type_pari, []):
+        if rapport is None:
+            continue
+        for numero in combinaison if isinstance(combinaison, list) else [combinaison]:
+            if _entier(numero) is not None:
+                dividendes[_entier(numero)] = rapport
+    return dividendes
+
+
+def _premier_dividende(rows, type_pari: str):
+    """Rapport pour 1 € de la première combinaison d'un pari (couplé, trio...)"""
+    for _, rapport in rows[0].get('dividendes', {}).get(type_pari, []):
+        if rapport is not None:
+            return rapport
+    return None
+
+
+def build_json_batch(races: List) -> Dict:
+    """
+    Construit un lot pour TurfDatabase.write_import_batch à partir des
+    lignes de process_race (une liste de lignes par course, même date)
+
+    Returns:
+        Dict {'courses': [...], 'partants': {colonne: [...]}, 'arrivees': [...],
+              'mise_a_jour': COLONNES_MISES_A_JOUR}
+    """
+
+    courses = []
+    arrivees = []
+    colonnes = ('course_code', 'cheval', 'age', 'sexe', 'driver', 'entraineur', 'numero',
+                'cote_pmu', 'cote_bzh', 'musique', 'ia_gagnant', 'ia_couple', 'ia_trio',
+                'note_ia', 'turf_points', 'tpch_90', 'tpj_365', 'rang_arrivee',
+                'rapport_simple_gagnant', 'rapport_simple_place')
+    partants = {col: [] for col in colonnes}
+
+    for rows in races:
+        rows = [r for r in rows if _entier(r.get('numero')) is not None and _valeur(r.get('cheval'))]
+        if not rows:
+            continue
+
+        first = rows[0]
+        course_code = first['course_id']
+        gagnant = _dividendes_simples(rows, 'E_SIMPLE_GAGNANT')
+        place = _dividendes_simples(rows, 'E_SIMPLE_PLACE')
+        courses.append({
+            'course_code': course_code,
+            'date': first['date'],
+            'hippodrome': first['hippodrome'],
+            'reunion_code': f"R{first['numero_reunion']}",
+            'numero_course': _entier(first['numero_course']),
+            'heure': _valeur(first.get('heure')),
+            'discipline': _valeur(first.get('discipline')),
+            'distance': _entier(first.get('distance')),
+            'allocation': _reel(first.get('montant_prix')),
+            'nombre_partants': _entier(first.get('nombre_partants')) or len(rows),
+        })
+
+        for r in rows:
+            partants['course_code'].append(course_code)
+            partants['cheval'].append(r['cheval'])
+            partants['age'].append(_entier(r.get('age')))
+            partants['sexe'].append(_valeur(r.get('sexe')))
+            partants['driver'].append(_valeur(r.get('driver')))
+            partants['entraineur'].append(_valeur(r.get('entraineur')))
+            partants['numero'].append(int(r['numero']))
+            partants['cote_pmu'].append(_reel(r.get('cote_direct')))
+            partants['musique'].append(_valeur(r.get('musique')))
+            partants['rang_arrivee'].append(_entier(r.get('ordre_arrivee')))
+            partants['rapport_simple_gagnant'].append(gagnant.get(int(r['numero'])))
+            partants['rapport_simple_place'].append(place.get(int(r['numero'])))
+            for col in ('cote_bzh', 'ia_gagnant', 'ia_couple', 'ia_trio',
+                        'note_ia', 'turf_points', 'tpch_90', 'tpj_365'):
+                partants[col].append(None)
+
+        # Arrivée : numéros triés par rang
+        classes = sorted(
+            (_entier(r.get('ordre_arrivee')), int(r['numero'])) for r in rows
+            if _entier(r.get('ordre_arrivee')) is not None
+        )
+        # Rapports pour 1 € du premier classé (NULL si non publiés)
+        if classes:
+            premier = classes[0][1]
+            arrivees.append({
+                'course_code': course_code,
+                'ordre_arrivee': '-'.join(str(numero) for _, numero in classes),
+                'rapport_simple_gagnant': gagnant.get(premier),
+                'rapport_simple_place': place.get(premier),
+                'rapport_couple_gagnant': _premier_dividende(rows, 'E_COUPLE_GAGNANT'),
+                'rapport_trio': _premier_dividende(rows, 'E_TRIO'),
+            })
+
+    return {'courses': courses, 'partants': partants, 'arrivees': arrivees,
+            'mise_a_jour': COLONNES_MISES_A_JOUR}
+
+
+def import_json_directory(source_dir: str, since: str = None, workers: int = 1,
+                          db: TurfDatabase = None) -> Dict:
+    """
+    Importe tous les JSON d'un dossier directement dans la base
+
+    Les courses sont extraites (en parallèle si workers > 1) puis écrites
+    date par date, une transaction par date.
+
+    Args:
+        source_dir: Dossier contenant les *_infos / *_participants / *_rapports.json
+        since: Ne traiter que les courses à partir de cette date (YYYY-MM-DD)
+        workers: Nombre de processus d'extraction (1 = série)
+        db: Base cible (défaut: base globale)
+
+    Returns:
+        Dict avec stats d'import
+    """
+
+    if db is None:
+        db = get_turf_database()
+
+    courses = group_race_files(find_json_files(Path(source_dir)))
+    if since:
+        courses = filter_since(courses, since)
+
+    print(f"📥 Import JSON: {source_dir} ({len(courses)} courses)")
+
+    stats = {'courses': 0, 'partants': 0, 'chevaux': 0, 'arrivees': 0, 'errors': []}
+    date_courante = None
+    races = []
+
+    def ecrire():
+        if races:
+            merge_import_stats(stats, db.write_import_batch(build_json_batch(races)))
+            print(f"   ✅ {date_courante}: {len(races)} courses")
+
+    # Les courses arrivent triées par identifiant (préfixe date) :
+    # on écrit un lot à chaque changement de date
+    for course_id, rows, error in iter_converted_races(courses, workers):
+        if error:
+            stats['errors'].append(f"{course_id}: {error}")
+            continue
+        if not rows:
+            continue
+        # Fichier infos illisible : ni date ni code de course
+        if not rows[0].get('date') or not rows[0].get('course_id'):
+            stats['errors'].append(f"{course_id}: informations de course absentes ou illisibles")
+            continue
+
+        if rows[0]['date'] != date_courante:
+            ecrire()
+            date_courante = rows[0]['date']
+            races = []
+        races.append(rows)
+
+    ecrire()
+
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import direct des JSON PMU dans la base")
+    parser.add_argument('source', help="Dossier contenant les JSON")
+    parser.add_argument('--db', dest='db_path', help="Chemin de la base (optionnel)")
+    parser.add_argument('--since', help="Ne traiter que les courses à partir de cette date (YYYY-MM-DD)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Nombre de processus d'extraction (défaut: 1 = série)")
+    args = parser.parse_args()
+
+    db = TurfDatabase(args.db_path) if args.db_path else None
+    stats = import_json_directory(args.source, args.since, args.workers, db)
+
+    print("\n" + "="*60)
+    print("📊 RÉSULTAT DE L'IMPORT")
+    print("="*60)
+    print(f"✅ Courses importées: {stats['courses']}")
+    print(f"✅ Partants ajoutés: {stats['partants']}")
+    print(f"✅ Arrivées enregistrées: {stats['arrivees']}")
+    if stats['errors']:
+        print(f"⚠️  {len(stats['errors'])} erreurs")
@@ -5,10 +5,13 @@ Import automatique de tous les exports historiques
 
 import glob
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import pandas as pd
-from turf_database_complete import get_turf_database
+from turf_database_complete import TurfDatabase, get_turf_database, prepare_import_batch
 
 
 def extract_date_from_filename(filename: str):
@@ -21,13 +24,63 @@ def extract_date_from_filename(filename: str):
         return None
 
 
-def migrate_csv_to_database(csv_directory: str = None, db_path: str = None):
+def parse_csv_file(csv_file: str, date_reunion):
+    """
+    Lit et normalise un export en lot de staging (exécuté dans un worker)
+    
+    Returns:
+        Tuple (lot, durée de parsing en secondes, erreur ou None)
+    """
+    debut = time.perf_counter()
+    try:
+        df = pd.read_csv(csv_file, sep=';', encoding='utf-8-sig', decimal=',')
+        batch = prepare_import_batch(df, date_reunion)
+        return batch, time.perf_counter() - debut, None
+    except Exception as e:
+        return None, time.perf_counter() - debut, str(e)
+
+
+def iter_parsed_files(files, workers: int):
+    """
+    Parse les fichiers dans un pool de processus et les restitue dans
+    l'ordre d'entrée (ordre chronologique), avec une fenêtre bornée de
+    fichiers en vol pour limiter la mémoire
+    
+    Yields:
+        Tuple (csv_file, date_reunion, lot, durée parsing, erreur)
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        en_vol = deque()
+        files = iter(files)
+        
+        for csv_file, date_reunion in files:
+            en_vol.append((csv_file, date_reunion,
+                           executor.submit(parse_csv_file, csv_file, date_reunion)))
+            if len(en_vol) >= workers * 2:
+                break
+        
+        while en_vol:
+            csv_file, date_reunion, future = en_vol.popleft()
+            batch, parse_time, error = future.result()
+            
+            suivant = next(files, None)
+            if suivant is not None:
+                en_vol.append((suivant[0], suivant[1],
+                               executor.submit(parse_csv_file, *suivant)))
+            
+            yield csv_file, date_reunion, batch, parse_time, error
+
+
+def migrate_csv_to_database(csv_directory: str = None, db_path: str = None, workers: int = 1):
     """
     Migre tous les CSV vers la base de données
     
     Args:
         csv_directory: Dossier contenant les CSV (défaut: dossier courant)
         db_path: Chemin de la DB (défaut: ~/bordasAnalyse/turf_complete.db)
+        workers: Nombre de processus de parsing (1 = import série classique).
+                 Au-delà de 1, les fichiers sont parsés en parallèle et un
+                 seul écrivain les insère dans l'ordre chronologique.
     """
     
     if csv_directory is None:
@@ -57,23 +110,56 @@ def migrate_csv_to_database(csv_directory: str = None, db_path: str = None):
         'total_courses': 0,
         'total_partants': 0,
         'total_chevaux': 0,
-        'errors': []
+        'errors': [],
+        'timings': []
     }
     
-    for idx, csv_file in enumerate(csv_files, 1):
+    # Fichiers datés, triés par date (ordre d'écriture)
+    dated_files = []
+    for csv_file in csv_files:
         filename = os.path.basename(csv_file)
         date_reunion = extract_date_from_filename(filename)
         
         if date_reunion is None:
-            print(f"⚠️  [{idx}/{len(csv_files)}] {filename} - Format date invalide")
+            print(f"⚠️  {filename} - Format date invalide")
             total_stats['files_error'] += 1
             continue
         
-        print(f"📥 [{idx}/{len(csv_files)}] {filename} ({date_reunion})")
+        dated_files.append((csv_file, date_reunion))
+    
+    dated_files.sort(key=lambda f: (f[1], f[0]))
+    
+    if workers > 1:
+        print(f"⚙️  Mode parallèle : {workers} workers de parsing, 1 écrivain\n")
+        parsed = iter_parsed_files(dated_files, workers)
+    else:
+        parsed = ((csv_file, date_reunion, None, 0.0, None) for csv_file, date_reunion in dated_files)
+    
+    migration_start = time.perf_counter()
+    
+    for idx, (csv_file, date_reunion, batch, parse_time, parse_error) in enumerate(parsed, 1):
+        filename = os.path.basename(csv_file)
+        print(f"📥 [{idx}/{len(dated_files)}] {filename} ({date_reunion})")
+        
+        write_start = time.perf_counter()
         
         try:
+            if parse_error:
+                raise ValueError(parse_error)
+            
             # Import du fichier
-            stats = db.import_from_csv(csv_file, date_reunion)
+            if batch is not None:
+                stats = db.write_import_batch(batch)
+            else:
+                stats = db.import_from_csv(csv_file, date_reunion)
+            
+            write_time = time.perf_counter() - write_start
+            total_stats['timings'].append({
+                'fichier': filename,
+                'parsing_sec': round(parse_time, 3),
+                'ecriture_sec': round(write_time, 3),
+                'partants': stats['partants']
+            })
             
             # Affichage des stats
             print(f"   ✅ {stats['courses']} courses")
@@ -109,6 +195,15 @@ def migrate_csv_to_database(csv_directory: str = None, db_path: str = None):
     print(f"🐴 Total partants importés    : {total_stats['total_partants']}")
     print(f"🏇 Chevaux créés/mis à jour   : {total_stats['total_chevaux']}")
     
+    total_time = time.perf_counter() - migration_start
+    print(f"⏱️  Durée totale               : {total_time:.2f} s")
+    
+    if total_stats['timings']:
+        print(f"\n⏱️  Temps par fichier (parsing / écriture):")
+        for timing in total_stats['timings']:
+            print(f"   {timing['fichier']:40} {timing['parsing_sec']:>7.3f} s / "
+                  f"{timing['ecriture_sec']:>7.3f} s  ({timing['partants']} partants)")
+    
     if total_stats['errors']:
         print(f"\n⚠️  Erreurs détectées:")
         for error in total_stats['errors'][:10]:  # Max 10 erreurs
@@ -202,17 +297,25 @@ def migrate_single_csv(csv_file: str, db_path: str = None):
 
 
 if __name__ == "__main__":
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Migration des exports CSV vers la base")
+    parser.add_argument('csv_file', nargs='?', help="Fichier CSV unique à importer")
+    parser.add_argument('db_path', nargs='?', help="Chemin de la base (optionnel)")
+    parser.add_argument('--dir', dest='csv_dir', help="Dossier contenant les export_*.csv")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Nombre de processus de parsing (défaut: 1 = série)")
+    args = parser.parse_args()
     
-    if len(sys.argv) > 1:
+    if args.csv_file:
         # Mode fichier unique
-        csv_file = sys.argv[1]
-        db_path = sys.argv[2] if len(sys.argv) > 2 else None
-        migrate_single_csv(csv_file, db_path)
+        migrate_single_csv(args.csv_file, args.db_path)
     else:
         # Mode migration complète
-        csv_dir = input("Dossier contenant les CSV (Enter = dossier courant): ").strip()
+        csv_dir = args.csv_dir
+        if csv_dir is None:
+            csv_dir = input("Dossier contenant les CSV (Enter = dossier courant): ").strip()
         if not csv_dir:
             csv_dir = os.getcwd()
         
-        migrate_csv_to_database(csv_dir)
+        migrate_csv_to_database(csv_dir, workers=args.workers)
@@ -9,6 +9,9 @@ from typing import Dict, List, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
+from borda_routing import compile_borda_router, borda_value
+import scoring_kernel
+
 
 class TurfPredictionEngine:
     """Moteur de prédiction intelligent pour courses hippiques"""
@@ -16,6 +19,10 @@ class TurfPredictionEngine:
     def __init__(self):
         self.weights = self._initialize_weights()
         self.min_confidence_threshold = 30  # Seuil de confiance minimum (%)
+        
+        # Spécification par composante, refaite quand self.weights change
+        self._spec_poids = None
+        self._specs = {}
     
     def _initialize_weights(self) -> Dict[str, float]:
         """
@@ -63,160 +70,107 @@ class TurfPredictionEngine:
                               nombre_partants: int) -> float:
         """
         Calcule le score Borda en choisissant le système le plus adapté
+        (table de routage compilée une fois pour les colonnes borda_cols)
+        """
+        router = compile_borda_router(borda_cols)
+        return borda_value(row, router, hippodrome, discipline, nombre_partants)
+    
+    # ==================== COMPOSANTES DU SCORE ====================
+    
+    def scoring_spec(self):
+        """
+        Composantes du score pour scoring_kernel.score (poids de self.weights)
+        
+        ELO et IA sont des moyennes pondérées des indicateurs renseignés ; la
+        stratégie normalise popularité et corde sur le maximum de la course.
         """
-        # Logique de sélection du meilleur système Borda
-        selected_borda = None
-        
-        # 1. Prioriser les Borda spécifiques à l'hippodrome
-        if 'vincenne' in hippodrome.lower():
-            # Sélectionner selon le nombre de partants
-            if 8 <= nombre_partants < 10:
-                selected_borda = 'Borda - trot 8-10 chevaux  vincenne'
-            elif 10 <= nombre_partants < 12:
-                selected_borda = 'Borda - trot 10-12 chevaux  vincenne'
-            elif 12 <= nombre_partants < 14:
-                selected_borda = 'Borda - trot 12-14 chevaux  vincenne'
-            elif 14 <= nombre_partants < 16:
-                selected_borda = 'Borda - trot 14-16 chevaux  vincenne'
-            elif nombre_partants >= 12:
-                selected_borda = 'Borda - monté 12-16 chevaux  vincenne'
-        
-        elif 'pau' in hippodrome.lower():
-            if discipline == 'A':  # Attelé
-                selected_borda = 'Borda - Pau attelé'
-            elif discipline == 'M':  # Monté
-                selected_borda = 'Borda - Pau monté'
-            else:  # Plat
-                selected_borda = 'Borda - Pau plat'
-        
-        elif 'cagne' in hippodrome.lower() or 'cagnes' in hippodrome.lower():
-            if discipline == 'A':
-                selected_borda = 'Borda - cagne sur mer attelé'
-            else:
-                selected_borda = 'Borda - cagne sur mer monté'
-        
-        elif 'deauville' in hippodrome.lower():
-            selected_borda = 'Borda - Deauville galot pcf'
-        
-        elif 'bousc' in hippodrome.lower():
-            selected_borda = 'Borda - le boucast'
-        
-        # Fallback: Borda par défaut
-        if not selected_borda:
-            selected_borda = 'Borda - Borda par Défaut'
-        
-        # Récupérer le score du système sélectionné
-        if selected_borda in row.index:
-            return row[selected_borda] if not pd.isna(row[selected_borda]) else 0
-        
-        # Si le système n'existe pas, utiliser Borda par défaut
-        if 'Borda - Borda par Défaut' in row.index:
-            return row['Borda - Borda par Défaut'] if not pd.isna(row['Borda - Borda par Défaut']) else 0
-        
-        return 0
+        w = self.weights
+        return (
+            ('Borda', 'somme', (
+                {'colonne': 'borda', 'transform': 'borda', 'facteurs': (w['borda_score'],)},
+            )),
+            ('ELO', 'moyenne', (
+                {'colonne': 'ELO_Cheval', 'transform': 'elo', 'facteurs': (w['elo_cheval'],)},
+                {'colonne': 'ELO_Jockey', 'transform': 'elo', 'facteurs': (w['elo_jockey'],)},
+                {'colonne': 'ELO_Entraineur', 'transform': 'elo', 'facteurs': (w['elo_entraineur'],)},
+                {'colonne': 'ELO_Proprio', 'transform': 'elo', 'facteurs': (w['elo_proprio'],)},
+                {'colonne': 'ELO_Eleveur', 'transform': 'elo', 'facteurs': (w['elo_eleveur'],)},
+            )),
+            ('IA', 'moyenne', (
+                {'colonne': 'IA_Gagnant', 'transform': 'brut', 'facteurs': (w['ia_gagnant'],)},
+                {'colonne': 'IA_Couple', 'transform': 'brut', 'facteurs': (w['ia_couple'],)},
+                {'colonne': 'IA_Trio', 'transform': 'brut', 'facteurs': (w['ia_trio'],)},
+                {'colonne': 'IA_Multi', 'transform': 'brut', 'facteurs': (w['ia_multi'],)},
+                {'colonne': 'IA_Quinte', 'transform': 'brut', 'facteurs': (w['ia_quinte'],)},
+            )),
+            ('Perf', 'somme', (
+                {'colonne': 'Turf Points', 'transform': 'turf_points', 'facteurs': (w['turf_points'],)},
+                {'colonne': 'Taux Victoire', 'transform': 'brut', 'facteurs': (w['taux_victoire'],)},
+                {'colonne': 'Taux Place', 'transform': 'brut', 'facteurs': (w['taux_place'],)},
+            )),
+            ('Strat', 'somme', (
+                {'colonne': 'Popularite', 'transform': 'rang_course', 'maximum': 'pop_max',
+                 'facteurs': (w['popularite'],)},
+                {'colonne': 'Cote', 'transform': 'cote', 'valeurs': (0.8, 0.6, 0.4),
+                 'facteurs': (w['cote'],)},
+                {'colonne': 'Place_Corde', 'transform': 'rang_course', 'maximum': 'corde_max',
+                 'facteurs': (w['place_corde'],)},
+                {'colonne': 'Repos', 'transform': 'repos', 'facteurs': (w['repos'],)},
+            )),
+        )
+    
+    def _component_spec(self, name: str):
+        """Spécification d'une seule composante (mise en cache par poids)"""
+        poids = tuple(self.weights.items())
+        if poids != self._spec_poids:
+            self._specs = {composante[0]: (composante,) for composante in self.scoring_spec()}
+            self._spec_poids = poids
+        return self._specs[name]
+    
+    def _component_score(self, row: pd.Series, name: str, inputs: Dict = None) -> float:
+        """Une composante du score pour un seul cheval (0.0 si aucune donnée)"""
+        result = scoring_kernel.score(row, self._component_spec(name), inputs, engine='turf')
+        return float(result['components'][name][0])
     
     def calculate_elo_score(self, row: pd.Series) -> float:
         """Calcule le score ELO combiné (normalisé)"""
-        elo_cols = {
-            'ELO_Cheval': self.weights['elo_cheval'],
-            'ELO_Jockey': self.weights['elo_jockey'],
-            'ELO_Entraineur': self.weights['elo_entraineur'],
-            'ELO_Proprio': self.weights['elo_proprio'],
-            'ELO_Eleveur': self.weights['elo_eleveur']
-        }
-        
-        total_score = 0
-        total_weight = 0
-        
-        for col, weight in elo_cols.items():
-            if col in row.index and not pd.isna(row[col]):
-                # Normaliser ELO (typiquement entre 1200 et 1800)
-                normalized = self.normalize_score(row[col], 1200, 1800)
-                total_score += normalized * weight
-                total_weight += weight
-        
-        return total_score / total_weight if total_weight > 0 else 0
+        return self._component_score(row, 'ELO')
     
     def calculate_ia_score(self, row: pd.Series) -> float:
         """Calcule le score IA combiné"""
-        ia_cols = {
-            'IA_Gagnant': self.weights['ia_gagnant'],
-            'IA_Couple': self.weights['ia_couple'],
-            'IA_Trio': self.weights['ia_trio'],
-            'IA_Multi': self.weights['ia_multi'],
-            'IA_Quinte': self.weights['ia_quinte']
-        }
-        
-        total_score = 0
-        total_weight = 0
-        
-        for col, weight in ia_cols.items():
-            if col in row.index and not pd.isna(row[col]):
-                # Les scores IA sont déjà entre 0 et 1
-                total_score += row[col] * weight
-                total_weight += weight
-        
-        return total_score / total_weight if total_weight > 0 else 0
+        return self._component_score(row, 'IA')
     
     def calculate_performance_score(self, row: pd.Series) -> float:
         """Calcule le score de performance historique"""
-        score = 0
-        
-        # Turf Points (normalisé)
-        if 'Turf Points' in row.index and not pd.isna(row['Turf Points']):
-            tp_normalized = self.normalize_score(row['Turf Points'], 0, 2000)
-            score += tp_normalized * self.weights['turf_points']
-        
-        # Taux de victoire
-        if 'Taux Victoire' in row.index and not pd.isna(row['Taux Victoire']):
-            score += row['Taux Victoire'] * self.weights['taux_victoire']
+        return self._component_score(row, 'Perf')
+    
+    @staticmethod
+    def course_aggregates(df: pd.DataFrame) -> Dict:
+        """
+        Statistiques de la course calculées une seule fois
+        (maxima utilisés par le score stratégique, taille du champ)
+        """
+        return {
+            'pop_max': df['Popularite'].max() if 'Popularite' in df.columns else np.nan,
+            'corde_max': df['Place_Corde'].max() if 'Place_Corde' in df.columns else np.nan,
+            'nombre_partants': len(df),
+        }
+    
+    def calculate_strategic_score(self, row: pd.Series, course_stats) -> float:
+        """
+        Calcule les facteurs stratégiques (corde, cote, etc.)
         
-        # Taux de place
-        if 'Taux Place' in row.index and not pd.isna(row['Taux Place']):
-            score += row['Taux Place'] * self.weights['taux_place']
+        Args:
+            course_stats: Agrégats de course_aggregates (ou le DataFrame de
+                          la course, agrégé à la volée)
+        """
+        if isinstance(course_stats, pd.DataFrame):
+            course_stats = self.course_aggregates(course_stats)
         
-        return score
-    
-    def calculate_strategic_score(self, row: pd.Series, df: pd.DataFrame) -> float:
-        """Calcule les facteurs stratégiques (corde, cote, etc.)"""
-        score = 0
-        
-        # Popularité (inverse car 1 = meilleur)
-        if 'Popularite' in row.index and not pd.isna(row['Popularite']):
-            pop_max = df['Popularite'].max()
-            pop_normalized = 1 - self.normalize_score(row['Popularite'], 1, pop_max)
-            score += pop_normalized * self.weights['popularite']
-        
-        # Cote (valeur inverse - cote élevée = moins favori mais potentiel gain)
-        if 'Cote' in row.index and not pd.isna(row['Cote']):
-            # Favoriser les cotes moyennes (3-15)
-            cote_score = 0
-            if 3 <= row['Cote'] <= 15:
-                cote_score = 0.8
-            elif row['Cote'] < 3:
-                cote_score = 0.6  # Trop favori
-            else:
-                cote_score = 0.4  # Trop outsider
-            score += cote_score * self.weights['cote']
-        
-        # Place à la corde (1 = meilleur)
-        if 'Place_Corde' in row.index and not pd.isna(row['Place_Corde']):
-            corde_max = df['Place_Corde'].max()
-            corde_normalized = 1 - self.normalize_score(row['Place_Corde'], 1, corde_max)
-            score += corde_normalized * self.weights['place_corde']
-        
-        # Repos (optimal entre 14-28 jours)
-        if 'Repos' in row.index and not pd.isna(row['Repos']):
-            repos_score = 0
-            if 14 <= row['Repos'] <= 28:
-                repos_score = 1.0
-            elif 7 <= row['Repos'] < 14 or 28 < row['Repos'] <= 42:
-                repos_score = 0.7
-            else:
-                repos_score = 0.4
-            score += repos_score * self.weights['repos']
-        
-        return score
+        return self._component_score(row, 'Strat', {
+            'pop_max': np.array([course_stats['pop_max']], dtype=float),
+            'corde_max': np.array([course_stats['corde_max']], dtype=float),
+        })
     
     def generate_prediction(self, df: pd.DataFrame, race_info: Dict = None) -> pd.DataFrame:
         """
@@ -232,59 +186,152 @@ class TurfPredictionEngine:
         if race_info is None:
             race_info = {}
         
-        # Identifier les colonnes Borda
-        borda_cols = [col for col in df.columns if 'Borda' in col]
+        if df.empty:
+            return pd.DataFrame()
+        
+        result_df = self._score_frame(df, np.zeros(len(df), dtype=int), [race_info])
+        # À score égal, ordre d'apparition dans df (même règle que generate_predictions_for_day)
+        result_df = result_df.sort_values('Score_Final', ascending=False, kind='stable').reset_index(drop=True)
+        result_df['Rang_Prono'] = range(1, len(result_df) + 1)
         
-        hippodrome = race_info.get('hippodrome', '')
-        discipline = race_info.get('discipline', '')
-        nombre_partants = len(df)
+        return result_df
+    
+    # ==================== PRONOSTICS D'UN JOUR ====================
+    
+    @staticmethod
+    def _round2(values: np.ndarray) -> List:
+        """Arrondi à 2 décimales (np.round) des scores affichés et exportés"""
+        return np.round(values, 2).tolist()
+    
+    def _score_frame(self, df: pd.DataFrame, codes: np.ndarray, race_infos: List[Dict]) -> pd.DataFrame:
+        """
+        Scores de plusieurs courses en une passe (lignes dans l'ordre de df)
         
-        predictions = []
+        Args:
+            df: Partants
+            codes: Index de course de chaque ligne (0..k-1)
+            race_infos: Infos de chaque course (hippodrome, discipline)
         
-        for idx, row in df.iterrows():
-            # Calculer chaque composante du score
-            borda_score = self.calculate_borda_score(row, borda_cols, hippodrome, 
-                                                     discipline, nombre_partants)
-            elo_score = self.calculate_elo_score(row)
-            ia_score = self.calculate_ia_score(row)
-            perf_score = self.calculate_performance_score(row)
-            strat_score = self.calculate_strategic_score(row, df)
-            
-            # Normaliser le score Borda (typiquement entre 0 et 300)
-            borda_normalized = self.normalize_score(borda_score, 0, 300) * self.weights['borda_score']
-            
-            # Score final (sur 100)
-            final_score = (borda_normalized + elo_score + ia_score + 
-                          perf_score + strat_score) * 100
-            
-            # Niveau de confiance basé sur la convergence des indicateurs
-            confidence = self._calculate_confidence(borda_normalized, elo_score, 
-                                                    ia_score, perf_score, strat_score)
-            
-            # Déterminer le classement suggéré
-            classification = self._classify_horse(final_score, confidence)
-            
-            predictions.append({
-                'Numero': row.get('Numero', idx + 1),
-                'Cheval': row.get('Cheval', 'N/A'),
-                'Score_Final': round(final_score, 2),
-                'Confiance': round(confidence, 2),
-                'Score_Borda': round(borda_normalized * 100, 2),
-                'Score_ELO': round(elo_score * 100, 2),
-                'Score_IA': round(ia_score * 100, 2),
-                'Score_Perf': round(perf_score * 100, 2),
-                'Score_Strat': round(strat_score * 100, 2),
-                'Classification': classification,
-                'Cote': row.get('Cote', 'N/A'),
-                'Driver': row.get('Driver', 'N/A'),
-                'Classement_Actuel': row.get('classement', 'N/A')
+        Returns:
+            DataFrame des colonnes de generate_prediction, sans tri ni rang
+        """
+        n = len(df)
+        nb_partants = np.bincount(codes)[codes]
+        
+        # 1. Borda : une colonne par course
+        router = compile_borda_router(df.columns)
+        borda_matrix = np.column_stack(
+            [scoring_kernel.column_values(df, col) for col in router.columns] or [np.full(n, np.nan)]
+        )
+        borda_raw = np.zeros(n)
+        premieres = np.flatnonzero(~pd.Series(codes).duplicated().to_numpy())
+        for i in premieres:
+            info = race_infos[codes[i]]
+            col = router.column_index(info.get('hippodrome', ''), info.get('discipline', ''), nb_partants[i])
+            if col is not None:
+                lignes = codes == codes[i]
+                borda_raw[lignes] = borda_matrix[lignes, col]
+        
+        # 2 à 5. ELO, IA, performance et stratégie (maxima de course)
+        pop = scoring_kernel.column_values(df, 'Popularite')
+        corde = scoring_kernel.column_values(df, 'Place_Corde')
+        pop_max = scoring_kernel.group_max(pop, codes)
+        corde_max = scoring_kernel.group_max(corde, codes)
+        
+        result = scoring_kernel.score(df, self.scoring_spec(), inputs={
+            'borda': np.nan_to_num(borda_raw, nan=0.0),
+            'pop_max': pop_max,
+            'corde_max': corde_max,
+        }, engine='turf')
+        c = result['components']
+        borda, elo, ia, perf, strat = c['Borda'], c['ELO'], c['IA'], c['Perf'], c['Strat']
+        
+        final_score = result['total'] * 100
+        
+        # Confiance : écart-type des composantes strictement positives
+        R = np.column_stack([borda, elo, ia, perf, strat])
+        M = R > 0
+        k = M.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moyenne = np.where(M, R, 0.0).sum(axis=1) / k
+            ecarts = R - moyenne[:, None]
+            std = np.sqrt(np.where(M, ecarts * ecarts, 0.0).sum(axis=1) / k)
+        confiance = np.where(k < 2, 50, np.clip(100 - (std * 200), 20, 100))
+        
+        classification = np.select(
+            [(final_score >= 70) & (confiance >= 60), final_score >= 60,
+             final_score >= 50, final_score >= 40],
+            ["⭐ FAVORI FORT", "✅ FAVORI", "🎯 POSSIBLE", "💎 OUTSIDER VALEUR"],
+            default="⚠️ OUTSIDER"
+        )
+        
+        colonne = lambda col, defaut: df[col].tolist() if col in df.columns else [defaut] * n
+        
+        return pd.DataFrame({
+            'Numero': df['Numero'].tolist() if 'Numero' in df.columns
+                      else [idx + 1 for idx in df.index],
+            'Cheval': colonne('Cheval', 'N/A'),
+            'Score_Final': self._round2(final_score),
+            'Confiance': self._round2(confiance),
+            'Score_Borda': self._round2(borda * 100),
+            'Score_ELO': self._round2(elo * 100),
+            'Score_IA': self._round2(ia * 100),
+            'Score_Perf': self._round2(perf * 100),
+            'Score_Strat': self._round2(strat * 100),
+            'Classification': classification.tolist(),
+            'Cote': colonne('Cote', 'N/A'),
+            'Driver': colonne('Driver', 'N/A'),
+            'Classement_Actuel': colonne('classement', 'N/A'),
+        })
+    
+    def generate_predictions_for_day(self, df: pd.DataFrame, race_infos: Dict = None) -> pd.DataFrame:
+        """
+        Génère les prédictions de toutes les courses d'un jour en une passe
+        
+        Mêmes calculs que generate_prediction ; les agrégats par course
+        (maxima, taille du champ) sont obtenus par groupe et le Borda est
+        routé une fois par course.
+        
+        Args:
+            df: Partants du jour (colonne 'Course')
+            race_infos: Dict optionnel {course: {'hippodrome', 'discipline'}}
+                        (défaut: colonnes hippodrome / discipline)
+        
+        Returns:
+            DataFrame 'Course' + colonnes de generate_prediction, trié par
+            course (ordre d'apparition) puis Rang_Prono (à score égal, ordre
+            d'apparition des partants)
+        """
+        if race_infos is None:
+            race_infos = {}
+        
+        df = df[df['Course'].notna()]
+        if df.empty:
+            return pd.DataFrame()
+        
+        codes, courses = pd.factorize(df['Course'])
+        premieres = np.flatnonzero(~pd.Series(codes).duplicated().to_numpy())
+        
+        infos = []
+        for i in premieres:
+            info = race_infos.get(courses[codes[i]], {})
+            infos.append({
+                'hippodrome': info.get('hippodrome', df['hippodrome'].iat[i] if 'hippodrome' in df.columns else ''),
+                'discipline': info.get('discipline', df['discipline'].iat[i] if 'discipline' in df.columns else ''),
             })
         
-        result_df = pd.DataFrame(predictions)
-        result_df = result_df.sort_values('Score_Final', ascending=False).reset_index(drop=True)
-        result_df['Rang_Prono'] = range(1, len(result_df) + 1)
+        result = self._score_frame(df, codes, infos)
+        result.insert(0, 'Course', df['Course'].tolist())
         
-        return result_df
+        # Classement par course : Score_Final décroissant ; à score égal,
+        # ordre d'apparition dans df (lexsort est stable)
+        scores = result['Score_Final'].to_numpy(dtype=float)
+        ordre = np.lexsort((-scores, codes))
+        
+        result = result.iloc[ordre].reset_index(drop=True)
+        result['Rang_Prono'] = result.groupby('Course', sort=False).cumcount() + 1
+        
+        return result
     
     def _calculate_confidence(self, borda: float, elo: float, ia: float, 
                              perf: float, strat: float) -> float:
@@ -58,27 +58,33 @@ def display_prediction_module(df):
     
     st.markdown("---")
     
+    # Pronostics de toutes les courses du fichier en une passe : changer de
+    # course relit le résultat sans recalcul (invalidé si les données changent)
+    source = (len(df), tuple(sorted(map(str, courses_disponibles))))
+    if st.session_state.get('predictions_source') != source:
+        st.session_state.pop('predictions_jour', None)
+    
     # Générer les prédictions
     if st.button("🚀 GÉNÉRER LES PRONOSTIQUES", type="primary"):
-        with st.spinner("🔄 Analyse en cours..."):
-            # Préparer les informations de la course
-            race_info = {
-                'hippodrome': hippodrome,
-                'discipline': discipline,
-                'distance': distance,
-                'nombre_partants': nb_partants
+        with st.spinner("🔄 Analyse de toutes les courses en cours..."):
+            # Préparer les informations de chaque course
+            race_infos = {
+                course: {
+                    'hippodrome': groupe['hippodrome'].iloc[0] if 'hippodrome' in groupe.columns else 'N/A',
+                    'discipline': groupe['discipline'].iloc[0] if 'discipline' in groupe.columns else 'N/A',
+                }
+                for course, groupe in df.groupby('Course', sort=False)
             }
             
-            # Générer les prédictions
-            predictions = engine.generate_prediction(course_df, race_info)
-            
             # Stocker dans session state
-            st.session_state['predictions'] = predictions
-            st.session_state['race_info'] = race_info
+            st.session_state['predictions_jour'] = engine.generate_predictions_for_day(df, race_infos)
+            st.session_state['predictions_source'] = source
     
-    # Afficher les résultats si disponibles
-    if 'predictions' in st.session_state:
-        predictions = st.session_state['predictions']
+    # Afficher les résultats de la course sélectionnée si disponibles
+    predictions_jour = st.session_state.get('predictions_jour')
+    if predictions_jour is not None and not predictions_jour.empty:
+        predictions = predictions_jour[predictions_jour['Course'] == selected_course]
+        predictions = predictions.drop(columns='Course').reset_index(drop=True)
         
         st.success("✅ Analyse terminée !")
         
@@ -0,0 +1,601 @@
+"""
+🔎 AUDIT DES PLANS DE REQUÊTES ET CONSEILLER D'INDEX
+Rejoue le catalogue des requêtes réelles de l'application via
+EXPLAIN QUERY PLAN, signale les parcours complets et les B-trees
+temporaires, essaie des index couvrants candidats et mesure chaque
+requête avant / après
+"""
+
+import re
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+
+from turf_database_complete import TurfDatabase, get_turf_database
+
+
+# ==================== CATALOGUE DES REQUÊTES ====================
+
+# Requêtes reprises telles qu'exécutées par l'application (paramètres nommés,
+# valeurs tirées de la base par sample_parameters) :
+# (nom, origine, requête, index candidats)
+QUERY_CATALOG = (
+    ('borda_partants_course', 'borda_calculator_db.calculate_borda_for_course', """
+        SELECT
+            course_id,
+            partant_id,
+            numero,
+            cheval,
+            driver,
+            cote_pmu,
+            cote_bzh,
+            ia_gagnant,
+            ia_couple,
+            ia_trio,
+            elo_cheval,
+            elo_jockey,
+            turf_points,
+            tpch_90
+        FROM faits_partants
+        WHERE date = :date
+        AND course_code = :course_code
+        AND non_partant = 0
+        ORDER BY numero
+    """, ()),
+
+    ('borda_date_recente', 'borda_calculator_db.get_borda_scores_for_course', """
+        SELECT MAX(r.date) FROM courses c
+        JOIN reunions r ON c.reunion_id = r.id
+        WHERE c.course_code = :course_code
+    """, ()),
+
+    ('borda_scores_course', 'borda_calculator_db.get_borda_scores_for_course', """
+        SELECT
+            numero,
+            cheval,
+            driver,
+            borda_score as score_total,
+            borda_rang as rang,
+            borda_details as details,
+            cote_pmu,
+            cote_bzh
+        FROM faits_partants
+        WHERE date = :date
+        AND course_code = :course_code
+        AND borda_score IS NOT NULL
+        ORDER BY borda_rang
+    """, ()),
+
+    ('borda_scores_course_config', 'borda_calculator_db.get_borda_scores_for_course', """
+        SELECT
+            p.numero,
+            ch.nom as cheval,
+            d.nom as driver,
+            bs.score_total,
+            bs.rang,
+            bs.details,
+            p.cote_pmu,
+            p.cote_bzh
+        FROM borda_scores bs
+        JOIN partants p ON bs.partant_id = p.id
+        JOIN courses c ON p.course_id = c.id
+        JOIN reunions r ON c.reunion_id = r.id
+        JOIN chevaux ch ON p.cheval_id = ch.id
+        LEFT JOIN drivers d ON p.driver_id = d.id
+        WHERE c.course_code = :course_code
+        AND bs.config_id = :config_db_id
+        AND r.date = :date
+        ORDER BY bs.rang
+    """, ('idx_courses_reunion_code',)),
+
+    ('borda_scores_jour', 'borda_calculator_db._load_day_scores', """
+        SELECT
+            c.course_code,
+            c.id as course_id,
+            p.numero,
+            ch.nom as cheval,
+            d.nom as driver,
+            bs.score_total,
+            bs.rang,
+            bs.details,
+            p.cote_pmu,
+            p.cote_bzh
+        FROM borda_scores bs
+        JOIN partants p ON bs.partant_id = p.id
+        JOIN courses c ON p.course_id = c.id
+        JOIN reunions r ON c.reunion_id = r.id
+        JOIN chevaux ch ON p.cheval_id = ch.id
+        LEFT JOIN drivers d ON p.driver_id = d.id
+        WHERE bs.config_id = :config_db_id
+        AND r.date = :date
+        ORDER BY c.course_code, bs.rang
+    """, ()),
+
+    ('courses_du_jour', 'turf_database_complete.get_courses_by_date', """
+        SELECT c.*, r.reunion_code, h.nom as hippodrome
+        FROM courses c
+        JOIN reunions r ON c.reunion_id = r.id
+        JOIN hippodromes h ON r.hippodrome_id = h.id
+        WHERE r.date = :date
+        ORDER BY c.numero_course
+    """, ()),
+
+    ('partants_course', 'turf_database_complete.get_partants_by_course', """
+        SELECT
+            p.*,
+            ch.nom as cheval_nom,
+            d.nom as driver_nom,
+            e.nom as entraineur_nom
+        FROM partants p
+        JOIN courses c ON p.course_id = c.id
+        JOIN chevaux ch ON p.cheval_id = ch.id
+        LEFT JOIN drivers d ON p.driver_id = d.id
+        LEFT JOIN entraineurs e ON p.entraineur_id = e.id
+        WHERE c.course_code = :course_code
+        ORDER BY p.numero
+    """, ('idx_partants_course_numero',)),
+
+    ('pari_course', 'betting_interface_db.save_pari', """
+        SELECT c.id FROM courses c
+        JOIN reunions r ON c.reunion_id = r.id
+        WHERE c.course_code = :course_code AND r.date = :date
+    """, ('idx_courses_reunion_code',)),
+
+    ('paris_du_jour', 'betting_interface_db.get_paris_for_date', """
+        SELECT
+            c.course_code,
+            c.heure,
+            h.nom as hippodrome,
+            p.type_pari,
+            p.numeros,
+            p.mise,
+            p.option,
+            p.statut,
+            p.gain
+        FROM paris p
+        JOIN courses c ON p.course_id = c.id
+        JOIN reunions r ON c.reunion_id = r.id
+        JOIN hippodromes h ON r.hippodrome_id = h.id
+        WHERE r.date = :date
+        ORDER BY c.course_code, p.type_pari
+    """, ()),
+
+    ('cache_pronostics', 'turf_database_complete.get_cached_predictions', """
+        SELECT course_code, predictions FROM prediction_cache
+        WHERE date = :date AND engine_version = 'borda-db-1' AND weights_hash = ''
+    """, ()),
+
+    ('recherche_cheval', 'app_turf_dashboard.display_cheval_analysis', """
+        SELECT
+            ch.nom,
+            ch.age,
+            ch.sexe,
+            ch.elo,
+            COALESCE(mv.nb_courses, 0) as nb_courses,
+            COALESCE(mv.nb_victoires, 0) as nb_victoires,
+            COALESCE(mv.nb_places, 0) as nb_places,
+            ROUND(mv.cote_moyenne, 2) as cote_moyenne
+        FROM chevaux_fts
+        JOIN chevaux ch ON ch.id = chevaux_fts.rowid
+        LEFT JOIN mv_perf_chevaux mv ON ch.id = mv.cheval_id
+        WHERE chevaux_fts MATCH :nom_cheval
+        ORDER BY chevaux_fts.rank, nb_courses DESC
+        LIMIT 10
+    """, ()),
+
+    ('top_chevaux', 'app_turf_dashboard.display_cheval_analysis', """
+        SELECT
+            ch.nom,
+            ch.elo,
+            mv.nb_courses,
+            mv.nb_victoires as victoires,
+            mv.nb_places as places
+        FROM mv_perf_chevaux mv
+        JOIN chevaux ch ON mv.cheval_id = ch.id
+        ORDER BY mv.nb_courses DESC
+        LIMIT 20
+    """, ('idx_mv_perf_chevaux_nb_courses',)),
+
+    ('recherche_driver', 'app_turf_dashboard.display_driver_analysis', """
+        SELECT
+            d.nom,
+            d.elo,
+            COALESCE(mv.nb_courses, 0) as nb_courses,
+            COALESCE(mv.nb_victoires, 0) as nb_victoires,
+            COALESCE(mv.nb_places, 0) as nb_places,
+            ROUND(mv.nb_victoires * 100.0 / mv.nb_courses, 2) as taux_victoire
+        FROM drivers_fts
+        JOIN drivers d ON d.id = drivers_fts.rowid
+        LEFT JOIN mv_perf_drivers mv ON d.id = mv.driver_id
+        WHERE drivers_fts MATCH :nom_driver
+        ORDER BY drivers_fts.rank, nb_courses DESC
+        LIMIT 10
+    """, ()),
+
+    ('top_drivers', 'app_turf_dashboard.display_driver_analysis', """
+        SELECT
+            d.nom,
+            d.elo,
+            mv.nb_courses,
+            mv.nb_victoires as victoires,
+            ROUND(mv.nb_victoires * 100.0 / mv.nb_courses, 2) as taux_victoire
+        FROM mv_perf_drivers mv
+        JOIN drivers d ON mv.driver_id = d.id
+        ORDER BY mv.nb_courses DESC
+        LIMIT 20
+    """, ('idx_mv_perf_drivers_nb_courses',)),
+
+    ('top_hippodromes', 'app_turf_dashboard.display_overview', """
+        SELECT
+            h.nom,
+            mv.nb_courses,
+            mv.nb_jours
+        FROM mv_stats_hippodromes mv
+        JOIN hippodromes h ON mv.hippodrome_id = h.id
+        WHERE mv.nb_courses > 0
+        ORDER BY mv.nb_courses DESC
+        LIMIT 10
+    """, ('idx_mv_stats_hippodromes_nb_courses',)),
+
+    ('historique_backtest', 'borda_backtest._load_history_runners', """
+        SELECT
+            c.id as course_id,
+            c.course_code,
+            c.discipline,
+            c.nombre_partants,
+            r.date,
+            r.hippodrome_id,
+            h.nom as hippodrome,
+            p.id as partant_id,
+            p.numero,
+            p.cote_pmu,
+            p.cote_bzh,
+            p.ia_gagnant,
+            p.ia_couple,
+            p.ia_trio,
+            ch.elo as elo_cheval,
+            d.elo as elo_jockey,
+            p.turf_points,
+            p.tpch_90,
+            p.rang_arrivee,
+            COALESCE(p.rapport_simple_gagnant,
+                     CASE WHEN p.rang_arrivee = 1 THEN a.rapport_simple_gagnant END) as rapport_gagnant
+        FROM partants p
+        JOIN courses c ON p.course_id = c.id
+        JOIN reunions r ON c.reunion_id = r.id
+        JOIN hippodromes h ON r.hippodrome_id = h.id
+        JOIN chevaux ch ON p.cheval_id = ch.id
+        LEFT JOIN drivers d ON p.driver_id = d.id
+        LEFT JOIN arrivees a ON a.course_id = c.id
+        WHERE p.non_partant = 0
+        AND c.id IN (SELECT course_id FROM partants WHERE rang_arrivee = 1)
+        AND r.date >= :date_debut AND r.date <= :date_fin
+        ORDER BY c.id, p.numero
+    """, ('idx_partants_gagnants', 'idx_partants_course_numero')),
+)
+
+# Index candidats (nom -> CREATE INDEX), essayés sur les requêtes signalées
+CANDIDATE_INDEXES = {
+    # Partants d'une course déjà triés par numéro (plus de B-tree pour ORDER BY)
+    'idx_partants_course_numero':
+        "CREATE INDEX IF NOT EXISTS idx_partants_course_numero ON partants(course_id, numero)",
+    # Course d'une réunion par code : la recherche part de la date (réunions)
+    'idx_courses_reunion_code':
+        "CREATE INDEX IF NOT EXISTS idx_courses_reunion_code ON courses(reunion_id, course_code)",
+    # Courses gagnées : index partiel couvrant du sous-requête IN du backtest
+    'idx_partants_gagnants':
+        "CREATE INDEX IF NOT EXISTS idx_partants_gagnants ON partants(course_id) WHERE rang_arrivee = 1",
+    # Classements des pages d'analyse lus dans l'ordre de l'index
+    'idx_mv_perf_chevaux_nb_courses':
+        "CREATE INDEX IF NOT EXISTS idx_mv_perf_chevaux_nb_courses ON mv_perf_chevaux(nb_courses DESC)",
+    'idx_mv_perf_drivers_nb_courses':
+        "CREATE INDEX IF NOT EXISTS idx_mv_perf_drivers_nb_courses ON mv_perf_drivers(nb_courses DESC)",
+    'idx_mv_stats_hippodromes_nb_courses':
+        "CREATE INDEX IF NOT EXISTS idx_mv_stats_hippodromes_nb_courses ON mv_stats_hippodromes(nb_courses DESC)",
+}
+
+# Gain minimal (ms) pour retenir un changement : en deçà, c'est du bruit de mesure
+MIN_GAIN_MS = 0.01
+
+# Temps de mesure maximal par requête (ms)
+BENCHMARK_BUDGET_MS = 1000
+
+# Alertes relevées dans le détail des plans
+PLAN_ALERTS = (
+    # (une table FTS5 lue par MATCH, « VIRTUAL TABLE INDEX n:M », n'est pas un parcours)
+    ('parcours_complet', re.compile(r'^SCAN (?!CONSTANT ROW|\S+ VIRTUAL TABLE INDEX \d+:M)')),
+    ('btree_temporaire', re.compile(r'USE TEMP B-TREE')),
+    ('index_automatique', re.compile(r'AUTOMATIC .*INDEX')),
+)
+
+
+class QueryPlanAdvisor:
+    """
+    Audit des plans de requêtes du schéma turf
+
+    Chaque requête du catalogue est passée à EXPLAIN QUERY PLAN puis
+    chronométrée (médiane de N exécutions). Pour les requêtes signalées, les
+    statistiques du planificateur (ANALYZE) sont d'abord collectées si elles
+    manquent, puis chaque index candidat est créé, mesuré, et conservé
+    seulement s'il fait gagner du temps ou disparaître une alerte.
+    """
+
+    def __init__(self, db: TurfDatabase = None, repetitions: int = 10):
+        self.db = db or get_turf_database()
+        self.repetitions = repetitions
+        self._parametres = None
+
+    # ==================== PARAMÈTRES ====================
+
+    def sample_parameters(self) -> dict:
+        """Valeurs réelles pour les paramètres du catalogue (date la plus récente)"""
+
+        if self._parametres is not None:
+            return self._parametres
+
+        parametres = {
+            'date': None, 'course_code': None, 'config_db_id': 1,
+            'nom_cheval': '"a"*', 'nom_driver': '"a"*',
+            'date_debut': '0000-00-00', 'date_fin': '9999-99-99',
+        }
+
+        with self.db.connections.read() as cursor:
+            cursor.execute("""
+                SELECT r.date, c.course_code FROM courses c
+                JOIN reunions r ON c.reunion_id = r.id
+                ORDER BY r.date DESC, c.id
+                LIMIT 1
+            """)
+            row = cursor.fetchone()
+            if row:
+                parametres['date'], parametres['course_code'] = row
+
+            cursor.execute("SELECT MIN(date), MAX(date) FROM reunions")
+            row = cursor.fetchone()
+            if row and row[0]:
+                parametres['date_debut'], parametres['date_fin'] = row
+
+            cursor.execute("SELECT id FROM borda_configs WHERE config_id = 'default'")
+            row = cursor.fetchone()
+            if row:
+                parametres['config_db_id'] = row[0]
+
+            # Recherche sur un début de nom (comme une saisie utilisateur)
+            for cle, table in (('nom_cheval', 'chevaux'), ('nom_driver', 'drivers')):
+                cursor.execute(f"SELECT nom FROM {table} ORDER BY id LIMIT 1")
+                row = cursor.fetchone()
+                if row and row[0]:
+                    parametres[cle] = self.db.search_match(row[0][:4]) or parametres[cle]
+
+        self._parametres = parametres
+        return parametres
+
+    # ==================== PLANS ET MESURES ====================
+
+    def explain(self, query: str, cursor: sqlite3.Cursor) -> list:
+        """Détail du plan (une ligne par étape)"""
+        # Un EXPLAIN en cache n'est pas recompilé quand le schéma change
+        # (nouvel index) : la version du schéma fait partie du texte
+        version = cursor.execute("PRAGMA schema_version").fetchone()[0]
+        cursor.execute(f"EXPLAIN QUERY PLAN {query} -- schema {version}", self.sample_parameters())
+        return [row[3] for row in cursor.fetchall()]
+
+    @staticmethod
+    def plan_alerts(plan: list) -> list:
+        """Alertes du plan : (type, détail de l'étape)"""
+        return [(nom, etape) for etape in plan
+                for nom, motif in PLAN_ALERTS if motif.search(etape)]
+
+    def benchmark(self, query: str, cursor: sqlite3.Cursor) -> float:
+        """Meilleure durée d'exécution (ms) sur N essais, résultat entièrement lu"""
+        parametres = self.sample_parameters()
+        cursor.execute(query, parametres).fetchall()  # Échauffement
+
+        # Requêtes lourdes (historique complet) : on s'arrête au budget, 3 essais minimum
+        durees = []
+        while len(durees) < self.repetitions and (len(durees) < 3 or sum(durees) < BENCHMARK_BUDGET_MS):
+            debut = time.perf_counter()
+            cursor.execute(query, parametres).fetchall()
+            durees.append((time.perf_counter() - debut) * 1000)
+
+        return min(durees)
+
+    def measure(self, query: str, cursor: sqlite3.Cursor) -> dict:
+        """Plan, alertes et durée d'une requête"""
+        plan = self.explain(query, cursor)
+        return {
+            'plan': plan,
+            'alertes': self.plan_alerts(plan),
+            'ms': self.benchmark(query, cursor),
+        }
+
+    # ==================== AUDIT ====================
+
+    def audit(self) -> pd.DataFrame:
+        """
+        Mesure tout le catalogue (connexion en lecture seule)
+
+        Returns:
+            DataFrame (requete, origine, alertes, ms, plan) ; les requêtes sur
+            des tables absentes sont ignorées (colonne erreur)
+        """
+
+        self.sample_parameters()
+        lignes = []
+
+        with self.db.connections.read() as cursor:
+            for nom, origine, query, _ in QUERY_CATALOG:
+                ligne = {'requete': nom, 'origine': origine}
+                try:
+                    mesure = self.measure(query, cursor)
+                    ligne.update({
+                        'alertes': ', '.join(sorted({alerte for alerte, _ in mesure['alertes']})),
+                        'ms': round(mesure['ms'], 3),
+                        'plan': ' | '.join(mesure['plan']),
+                    })
+                except sqlite3.OperationalError as e:
+                    ligne['erreur'] = str(e)
+                lignes.append(ligne)
+
+        return pd.DataFrame(lignes)
+
+    # ==================== CONSEILLER D'INDEX ====================
+
+    @staticmethod
+    def _has_statistics(cursor: sqlite3.Cursor) -> bool:
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        if not cursor.fetchone()[0]:
+            return False
+        cursor.execute("SELECT COUNT(*) FROM sqlite_stat1")
+        return cursor.fetchone()[0] > 0
+
+    @staticmethod
+    def _helps(avant: dict, apres: dict, seuil: float) -> bool:
+        """Un changement est retenu s'il fait gagner du temps, ou retire une alerte sans ralentir"""
+        gain = avant['ms'] - apres['ms']
+        if gain >= max(avant['ms'] * seuil, MIN_GAIN_MS):
+            return True
+        return len(apres['alertes']) < len(avant['alertes']) and -gain <= max(avant['ms'] * seuil, MIN_GAIN_MS)
+
+    def advise(self, appliquer: bool = False, seuil: float = 0.1) -> pd.DataFrame:
+        """
+        Propose (et applique si demandé) les index des requêtes signalées
+
+        Tout se passe dans un savepoint de l'écrivain : les statistiques
+        ANALYZE (si absentes) puis chaque index candidat d'une requête
+        signalée sont créés et mesurés ; un index qui n'aide pas est
+        supprimé aussitôt. Sans appliquer=True, le savepoint est annulé à la
+        fin : la base reste telle quelle.
+
+        Args:
+            appliquer: Conserver les statistiques et les index retenus
+            seuil: Gain de temps relatif minimal pour retenir un changement
+
+        Returns:
+            DataFrame (requete, alertes_avant, ms_avant, propositions,
+            alertes_apres, ms_apres, gain_pct)
+        """
+
+        self.sample_parameters()
+        lignes = []
+
+        with self.db.connections.write() as cursor:
+            cursor.execute("SAVEPOINT conseil_index")
+            try:
+                avant = {}
+                for nom, _, query, _ in QUERY_CATALOG:
+                    try:
+                        avant[nom] = self.measure(query, cursor)
+                    except sqlite3.OperationalError:
+                        continue
+
+                propositions = {nom: [] for nom in avant}
+                requetes = {nom: query for nom, _, query, _ in QUERY_CATALOG if nom in avant}
+
+                # Dernière mesure de chaque requête, oubliée dès que le schéma change
+                courantes = dict(avant)
+
+                def courante(nom):
+                    if nom not in courantes:
+                        courantes[nom] = self.measure(requetes[nom], cursor)
+                    return courantes[nom]
+
+                # Sans statistiques, le planificateur choisit ses index à l'aveugle
+                # (ex: borda_scores lu par config_id, la colonne la moins sélective)
+                if not self._has_statistics(cursor):
+                    cursor.execute("SAVEPOINT statistiques")
+                    cursor.execute("ANALYZE")
+                    apres = {nom: self.measure(query, cursor) for nom, query in requetes.items()}
+                    for nom in requetes:
+                        if self._helps(avant[nom], apres[nom], seuil):
+                            propositions[nom].append('ANALYZE')
+                    if any(propositions.values()):
+                        courantes = apres
+                    else:
+                        cursor.execute("ROLLBACK TO statistiques")
+                    cursor.execute("RELEASE statistiques")
+                statistiques = self._has_statistics(cursor)
+
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+                existants = {row[0] for row in cursor.fetchall()}
+
+                for nom, _, _, candidats in QUERY_CATALOG:
+                    if nom not in avant:
+                        continue
+
+                    for index in candidats:
+                        if index in existants:
+                            continue
+
+                        reference = courante(nom)
+                        if not reference['alertes']:
+                            break
+
+                        cursor.execute(CANDIDATE_INDEXES[index])
+                        if statistiques:
+                            cursor.execute(f"ANALYZE {index}")
+
+                        mesure = self.measure(requetes[nom], cursor)
+                        if self._helps(reference, mesure, seuil):
+                            propositions[nom].append(index)
+                            existants.add(index)
+                            courantes = {nom: mesure}
+                        else:
+                            cursor.execute(f"DROP INDEX {index}")
+
+                for nom, mesure_avant in avant.items():
+                    mesure_apres = courante(nom)
+                    lignes.append({
+                        'requete': nom,
+                        'alertes_avant': len(mesure_avant['alertes']),
+                        'ms_avant': round(mesure_avant['ms'], 3),
+                        'propositions': ', '.join(propositions[nom]),
+                        'alertes_apres': len(mesure_apres['alertes']),
+                        'ms_apres': round(mesure_apres['ms'], 3),
+                        'gain_pct': round((1 - mesure_apres['ms'] / mesure_avant['ms']) * 100, 1)
+                                    if mesure_avant['ms'] else 0.0,
+                    })
+            except Exception:
+                cursor.execute("ROLLBACK TO conseil_index")
+                cursor.execute("RELEASE conseil_index")
+                raise
+
+            if not appliquer:
+                cursor.execute("ROLLBACK TO conseil_index")
+            cursor.execute("RELEASE conseil_index")
+
+        return pd.DataFrame(lignes)
+
+
+if __name__ == "__main__":
+    appliquer = '--appliquer' in sys.argv
+
+    print("🔎 AUDIT DES PLANS DE REQUÊTES")
+    print("="*60)
+
+    advisor = QueryPlanAdvisor()
+    audit = advisor.audit()
+
+    for _, ligne in audit.iterrows():
+        if isinstance(ligne.get('erreur'), str):
+            print(f"⏭️ {ligne['requete']}: ignorée ({ligne['erreur']})")
+            continue
+        icone = "⚠️" if ligne['alertes'] else "✅"
+        print(f"{icone} {ligne['requete']} ({ligne['origine']}): {ligne['ms']:.2f} ms"
+              + (f" - {ligne['alertes']}" if ligne['alertes'] else ""))
+        print(f"   {ligne['plan']}")
+
+    print()
+    print(f"🔧 Index candidats {'(appliqués)' if appliquer else '(proposition, --appliquer pour conserver)'}")
+    print("="*60)
+
+    conseils = advisor.advise(appliquer=appliquer)
+    for _, ligne in conseils[conseils['propositions'] != ''].iterrows():
+        print(f"📊 {ligne['requete']}: {ligne['propositions']} - "
+              f"{ligne['ms_avant']:.2f} ms → {ligne['ms_apres']:.2f} ms ({ligne['gain_pct']:+.1f}%) - "
+              f"alertes {ligne['alertes_avant']} → {ligne['alertes_apres']}")
+
+    if (conseils['propositions'] == '').all():
+        print("✅ Aucun index à ajouter")
@@ -0,0 +1,248 @@
+"""
+🧮 NOYAU DE SCORING
+Normalisations communes à tous les moteurs de pronostic (ELO, Borda, Turf
+Points, popularité, tranches de cote...), calculées sur des colonnes
+entières à partir d'une spécification déclarative des composantes
+"""
+
+import time
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# ==================== NORMALISATIONS ====================
+
+ELO_BASE = 1200            # ELO normalisé : (x - 1200) / 600
+ELO_ECHELLE = 600
+BORDA_MAX = 300            # Borda normalisé : x / 300
+TURF_POINTS_MAX = 2000     # Turf Points normalisés : x / 2000
+POPULARITE_MAX = 20        # Popularité : 1 - x / 20
+COTE_BANDE = (3, 15)       # Cotes "moyennes" favorisées (bornes incluses)
+GAINS_MAX = 100000         # Gains normalisés : min(x / 100000, 1)
+
+
+def _cote(v, term, inputs):
+    """Valeur de tranche : (dans la bande, en dessous, au-dessus)"""
+    bas, haut = COTE_BANDE
+    dans, dessous, dessus = term['valeurs']
+    return np.where((v >= bas) & (v <= haut), dans, np.where(v < bas, dessous, dessus))
+
+
+def _rang_course(v, term, inputs):
+    """1 - rang normalisé sur le maximum de la course (0.5 si max == 1)"""
+    maximum = inputs[term['maximum']]
+    return 1 - np.where(maximum == 1, 0.5, (v - 1) / (maximum - 1))
+
+
+def _repos(v, term, inputs):
+    """Repos optimal entre 14 et 28 jours"""
+    return np.where((v >= 14) & (v <= 28), 1.0,
+                    np.where(((v >= 7) & (v < 14)) | ((v > 28) & (v <= 42)), 0.7, 0.4))
+
+
+def _forme(v, term, inputs):
+    """Bonnes places (1, 2, 3) dans le début de la musique"""
+    recent = pd.Series(v, dtype=object).astype(str).str[:10]
+    bonnes_places = recent.str.count('[123]').to_numpy()
+    return np.where(recent.str.len().to_numpy() >= 5, (bonnes_places / 5) * 100, 50)
+
+
+# Transformations : valeur brute -> valeur normalisée (avant facteurs)
+TRANSFORMS = {
+    'brut': lambda v, term, inputs: v,
+    'elo': lambda v, term, inputs: (v - ELO_BASE) / ELO_ECHELLE,
+    'borda': lambda v, term, inputs: v / BORDA_MAX,
+    'turf_points': lambda v, term, inputs: v / TURF_POINTS_MAX,
+    'popularite': lambda v, term, inputs: (
+        1 - (np.minimum(v, POPULARITE_MAX) / POPULARITE_MAX) if term.get('plafond')
+        else 1 - (v / POPULARITE_MAX)
+    ),
+    'popularite_borda': lambda v, term, inputs:
+        (POPULARITE_MAX - np.minimum(v, POPULARITE_MAX)) / POPULARITE_MAX,
+    'gains': lambda v, term, inputs: np.minimum(v / GAINS_MAX, 1),
+    'corde': lambda v, term, inputs: np.maximum(0, 100 - (v * 5)),
+    'cote': _cote,
+    'rang_course': _rang_course,
+    'repos': _repos,
+    'forme': _forme,
+}
+
+# Transformations qui travaillent sur le texte brut de la colonne
+TEXT_TRANSFORMS = {'forme'}
+
+
+# ==================== COLONNES ====================
+
+def row_count(df) -> int:
+    """Nombre de chevaux : lignes d'un DataFrame, 1 pour une Series"""
+    return 1 if isinstance(df, pd.Series) else len(df)
+
+
+def column_values(df, col: str, virgule: bool = False) -> np.ndarray:
+    """
+    Convertit une colonne en float une seule fois
+    (NaN si la colonne, la valeur ou la conversion manque)
+
+    Args:
+        df: DataFrame, ou Series d'un seul cheval (tableau d'une valeur)
+    """
+    if isinstance(df, pd.Series):
+        values = [df.get(col)]
+    elif col not in df.columns:
+        return np.full(len(df), np.nan)
+    elif pd.api.types.is_numeric_dtype(df[col]):
+        return df[col].astype(float).to_numpy()
+    else:
+        values = df[col].tolist()
+
+    result = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        if pd.isna(value):
+            continue
+        try:
+            result[i] = float(str(value).replace(',', '.') if virgule else value)
+        except:
+            pass
+    return result
+
+
+def coalesce_columns(df: pd.DataFrame, columns: Sequence[str], virgule: bool = False):
+    """
+    Première valeur renseignée parmi plusieurs colonnes
+
+    Returns:
+        (valeurs, index de la colonne retenue ou -1)
+    """
+    values = np.full(row_count(df), np.nan)
+    source = np.full(row_count(df), -1)
+    for i, col in enumerate(columns):
+        v = column_values(df, col, virgule)
+        prendre = np.isnan(values) & ~np.isnan(v)
+        values[prendre] = v[prendre]
+        source[prendre] = i
+    return values, source
+
+
+def group_max(values: np.ndarray, groups) -> np.ndarray:
+    """Maximum (hors NaN) du groupe de chaque ligne"""
+    return pd.Series(values).groupby(np.asarray(groups)).transform('max').to_numpy()
+
+
+# ==================== NOYAU ====================
+
+_timings = {}
+
+
+def _record_timing(engine: str, component: str, rows: int, seconds: float):
+    stats = _timings.setdefault((engine, component), {'appels': 0, 'lignes': 0, 'secondes': 0.0})
+    stats['appels'] += 1
+    stats['lignes'] += rows
+    stats['secondes'] += seconds
+
+
+def timing_report() -> pd.DataFrame:
+    """Temps cumulés par moteur et par composante"""
+    rows = [
+        {'moteur': engine, 'composante': component, 'appels': s['appels'],
+         'lignes': s['lignes'], 'total_ms': s['secondes'] * 1000,
+         'us_par_ligne': s['secondes'] * 1e6 / s['lignes'] if s['lignes'] else 0.0}
+        for (engine, component), s in _timings.items()
+    ]
+    return pd.DataFrame(rows, columns=['moteur', 'composante', 'appels', 'lignes',
+                                       'total_ms', 'us_par_ligne'])
+
+
+def reset_timings():
+    """Remet les compteurs de temps à zéro"""
+    _timings.clear()
+
+
+def _text_values(df, col: str) -> np.ndarray:
+    """Colonne texte brute (None si absente)"""
+    if isinstance(df, pd.Series):
+        return np.array([df.get(col)], dtype=object)
+    if col in df.columns:
+        return df[col].to_numpy(dtype=object)
+    return np.full(len(df), None, dtype=object)
+
+
+def score(df, spec: Sequence, inputs: Dict = None, engine: str = '') -> Dict:
+    """
+    Calcule les composantes d'un moteur sur toutes les lignes en une passe
+
+    Args:
+        df: Une ligne par cheval (DataFrame), ou la Series d'un seul cheval
+            (calculs ligne à ligne, sans construire de DataFrame)
+        spec: Tuple de composantes (nom, agrégation, termes) :
+              - agrégation 'somme' : somme des contributions présentes
+              - agrégation 'moyenne' : moyenne pondérée des termes présents
+                (le facteur unique de chaque terme est son poids)
+              Chaque terme est un dict :
+              - 'colonne' : colonne de df ou clé de `inputs`
+              - 'transform' : clé de TRANSFORMS
+              - 'facteurs' : multiplicateurs appliqués dans l'ordre
+              - 'virgule' : décimale à virgule acceptée
+              - 'positif' : terme présent seulement si la valeur est > 0
+              - 'points' : points de confiance ajoutés si le terme est présent
+              (+ paramètres propres à la transformation : 'valeurs', 'plafond', 'maximum')
+        inputs: Colonnes précalculées par le moteur (Borda routé, maxima...)
+        engine: Nom du moteur pour les temps par composante
+
+    Returns:
+        Dict {
+            'components': {nom: valeurs float (0 sans aucun terme présent)},
+            'points': points de confiance,
+            'total': somme des composantes dans l'ordre de la spec
+        }
+    """
+    if inputs is None:
+        inputs = {}
+
+    n = row_count(df)
+    result = {'components': {}, 'points': np.zeros(n, dtype=int), 'total': np.zeros(n)}
+
+    for name, aggregate, terms in spec:
+        debut = time.perf_counter()
+
+        valeur = np.zeros(n)
+        poids = np.zeros(n)
+
+        with np.errstate(all='ignore'):
+            for term in terms:
+                col = term['colonne']
+                kind = term['transform']
+
+                if col in inputs:
+                    v = np.asarray(inputs[col])
+                elif kind in TEXT_TRANSFORMS:
+                    v = _text_values(df, col)
+                else:
+                    v = column_values(df, col, term.get('virgule', False))
+
+                if kind in TEXT_TRANSFORMS:
+                    ok = pd.notna(v)
+                else:
+                    ok = v > 0 if term.get('positif') else ~np.isnan(v)
+
+                contribution = TRANSFORMS[kind](v, term, inputs)
+                for facteur in term.get('facteurs', ()):
+                    contribution = contribution * facteur
+
+                valeur = np.where(ok, valeur + contribution, valeur)
+                if aggregate == 'moyenne':
+                    poids = np.where(ok, poids + term['facteurs'][0], poids)
+
+                if term.get('points'):
+                    result['points'] += np.where(ok, term['points'], 0)
+
+            if aggregate == 'moyenne':
+                valeur = np.where(poids > 0, valeur / poids, 0.0)
+
+        result['components'][name] = valeur
+        result['total'] = result['total'] + valeur
+
+        _record_timing(engine, name, n, time.perf_counter() - debut)
+
+    return result
@@ -10,14 +10,71 @@ from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+import scoring_kernel
+
 
 class SmartPredictionSystem:
     """Système qui combine fichier quotidien et export Borda"""
     
+    # Poids des composantes (communs au calcul ligne à ligne et par lot)
+    ELO_WEIGHTS = {
+        'CHEVAL': 0.10,
+        'JOCKEY': 0.08,
+        'COACH': 0.05,
+        'PROPRIO': 0.01,
+        'ÉLEVEUR': 0.01
+    }
+    IA_WEIGHTS = {
+        'Gagnant': 0.08,
+        'Couplé': 0.05,
+        'Trio': 0.04,
+        'Multi': 0.02,
+        'Quinté': 0.01
+    }
+    
     def __init__(self):
         self.export_file_path = None
         self.borda_data = None
     
+    @property
+    def borda_data(self):
+        """Export Borda courant"""
+        return self._borda_data
+    
+    @borda_data.setter
+    def borda_data(self, df):
+        """Affecte l'export et précalcule ses clés de matching normalisées"""
+        self._borda_data = df
+        self._borda_keys = self._build_borda_keys(df) if df is not None else None
+    
+    @staticmethod
+    def _upper(values: pd.Series) -> pd.Series:
+        """Noms en majuscules (NaN pour une valeur qui n'est pas du texte)"""
+        if not (values.dtype == object or pd.api.types.is_string_dtype(values)):
+            return pd.Series(pd.NA, index=values.index, dtype='string')
+        return values.str.upper()
+    
+    @classmethod
+    def _build_borda_keys(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Clés de matching de l'export (calculées une fois au chargement)
+        
+        date / hippodrome / course en minuscules pour le filtrage de la
+        course, nom en majuscules (tel quel, comme le comparait la
+        recherche ligne à ligne) et numéro pour la jointure des chevaux
+        """
+        def colonne(col):
+            return df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        
+        return pd.DataFrame({
+            'date': colonne('date'),
+            'hippodrome': colonne('hippodrome').astype('string').str.lower(),
+            'course': colonne('Course').astype('string').str.lower(),
+            'nom': cls._upper(colonne('Cheval')),
+            'numero': colonne('Numero'),
+            'position': np.arange(len(df)),
+        }, index=df.index)
+    
     def load_borda_export(self, file_path):
         """Charge le fichier export avec les scores Borda"""
         try:
@@ -32,10 +89,13 @@ class SmartPredictionSystem:
         """
         Associe les chevaux du fichier quotidien avec leurs scores Borda
         
-        Matching par:
-        1. Nom du cheval
-        2. Numéro de cheval
-        3. Date + hippodrome + course
+        Jointure par clés normalisées (précalculées au chargement de l'export):
+        1. Date + hippodrome + course (filtre de la course)
+        2. Nom du cheval en majuscules (première ligne de 'CHEVAL/MUSIQ.')
+        3. Numéro de cheval si le nom n'a pas été trouvé
+        
+        Les colonnes Borda des chevaux associés sont remplacées par celles
+        de l'export ; un cheval non associé garde les siennes.
         """
         if self.borda_data is None:
             return None, "❌ Fichier export Borda non chargé"
@@ -45,69 +105,55 @@ class SmartPredictionSystem:
         hippodrome = race_info.get('hippodrome', None)
         course_num = race_info.get('course', None)
         
-        # Filtrer les données Borda pour cette course
-        borda_filtered = self.borda_data.copy()
+        # Filtrer les clés Borda pour cette course
+        keys = self._borda_keys
+        mask = pd.Series(True, index=keys.index)
         
         if date:
-            borda_filtered = borda_filtered[borda_filtered['date'] == date]
+            mask &= keys['date'] == date
         
         if hippodrome:
             # Matching flexible sur l'hippodrome
-            borda_filtered = borda_filtered[
-                borda_filtered['hippodrome'].str.contains(hippodrome, case=False, na=False)
-            ]
+            mask &= keys['hippodrome'].str.contains(hippodrome.lower(), regex=False).fillna(False)
         
         if course_num:
-            borda_filtered = borda_filtered[
-                borda_filtered['Course'].str.contains(course_num, case=False, na=False)
-            ]
+            mask &= keys['course'].str.contains(course_num.lower(), regex=False).fillna(False)
         
-        # Fusionner les données
-        merged_data = []
+        keys = keys[mask.astype(bool)]
         
-        for idx, daily_row in daily_df.iterrows():
-            # Extraire le nom du cheval du fichier quotidien
-            cheval_name = daily_row.get('CHEVAL/MUSIQ.', '').split('\n')[0] if 'CHEVAL/MUSIQ.' in daily_row else ''
-            numero = daily_row.get('N°', '')
-            
-            # Chercher le cheval dans les données Borda
-            borda_match = None
-            
-            # Essayer par nom
-            if cheval_name:
-                potential_matches = borda_filtered[
-                    borda_filtered['Cheval'].str.upper() == cheval_name.upper()
-                ]
-                if len(potential_matches) > 0:
-                    borda_match = potential_matches.iloc[0]
-            
-            # Essayer par numéro si pas trouvé par nom
-            if borda_match is None and numero:
-                potential_matches = borda_filtered[
-                    borda_filtered['Numero'] == numero
-                ]
-                if len(potential_matches) > 0:
-                    borda_match = potential_matches.iloc[0]
-            
-            # Créer la ligne fusionnée
-            merged_row = daily_row.to_dict()
-            
-            if borda_match is not None:
-                # Ajouter tous les scores Borda
-                borda_cols = [col for col in borda_match.index if 'Borda' in col]
-                for col in borda_cols:
-                    merged_row[col] = borda_match[col]
-                
-                # Ajouter autres infos utiles
-                merged_row['_has_borda'] = True
-                merged_row['_match_quality'] = 'excellent'
-            else:
-                merged_row['_has_borda'] = False
-                merged_row['_match_quality'] = 'aucun'
-            
-            merged_data.append(merged_row)
+        # Tables de hachage clé -> position de la première ligne Borda correspondante
+        noms = keys.dropna(subset=['nom']).drop_duplicates('nom')
+        par_nom = pd.Series(noms['position'].to_numpy(), index=noms['nom'].to_numpy())
+        numeros = keys.dropna(subset=['numero']).drop_duplicates('numero')
+        par_numero = pd.Series(numeros['position'].to_numpy(), index=numeros['numero'].to_numpy())
+        
+        # Clés du fichier quotidien
+        result_df = daily_df.reset_index(drop=True)
+        if 'CHEVAL/MUSIQ.' in result_df.columns:
+            cheval_names = self._upper(result_df['CHEVAL/MUSIQ.']).str.split('\n').str[0]
+        else:
+            cheval_names = pd.Series(pd.NA, index=result_df.index, dtype='string')
+        numeros_jour = result_df['N°'] if 'N°' in result_df.columns else pd.Series(np.nan, index=result_df.index)
+        
+        # Par nom, puis par numéro (renseigné et non nul) si pas trouvé par nom
+        match = cheval_names.map(par_nom).where(cheval_names.fillna('') != '')
+        fallback = (match.isna() & numeros_jour.notna() & (numeros_jour.astype(str) != '')
+                    & (numeros_jour != 0))
+        match[fallback] = numeros_jour[fallback].map(par_numero)
+        
+        has_borda = match.notna()
         
-        result_df = pd.DataFrame(merged_data)
+        if has_borda.any():
+            # Ajouter tous les scores Borda en une seule jointure
+            borda_cols = [col for col in self.borda_data.columns if 'Borda' in col]
+            scores = self.borda_data.iloc[match[has_borda].to_numpy(dtype=int)][borda_cols]
+            scores.index = match.index[has_borda]
+            for col in [c for c in borda_cols if c in result_df.columns]:
+                result_df[col] = result_df[col].mask(has_borda, scores[col])
+            result_df = result_df.join(scores[[c for c in borda_cols if c not in result_df.columns]])
+        
+        result_df['_has_borda'] = has_borda.to_numpy()
+        result_df['_match_quality'] = np.where(has_borda, 'excellent', 'aucun')
         
         # Stats de matching
         matched = result_df['_has_borda'].sum()
@@ -116,96 +162,76 @@ class SmartPredictionSystem:
         
         return result_df, f"✅ {matched}/{total} chevaux associés ({match_rate:.0f}%)"
     
+    def scoring_spec(self):
+        """Composantes du score pour scoring_kernel.score (+ points de confiance)"""
+        return (
+            ('Borda', 'somme', (                 # 35% : meilleur Borda du cheval
+                {'colonne': 'borda', 'transform': 'borda', 'facteurs': (35,), 'points': 20},
+            )),
+            ('ELO', 'somme', tuple(              # 25%
+                {'colonne': col, 'transform': 'elo', 'facteurs': (weight, 100), 'points': 5}
+                for col, weight in self.ELO_WEIGHTS.items()
+            )),
+            ('IA', 'somme', tuple(               # 20%
+                {'colonne': col, 'transform': 'brut', 'facteurs': (weight, 100), 'points': 3}
+                for col, weight in self.IA_WEIGHTS.items()
+            )),
+            ('TurfPoints', 'somme', (            # 10%
+                {'colonne': 'TP', 'transform': 'turf_points', 'facteurs': (10,), 'points': 10},
+            )),
+            ('Popularité', 'somme', (            # 10% : popularité & cote
+                {'colonne': 'Popularité', 'transform': 'popularite', 'facteurs': (5,), 'points': 5},
+                {'colonne': 'COTE', 'transform': 'cote', 'valeurs': (5, 3, 2), 'points': 5},
+            )),
+        )
+    
+    def _score_kernel(self, merged_df):
+        """
+        Composantes de tous les chevaux (ou d'un seul, merged_df étant alors
+        sa Series) via le noyau de scoring
+        """
+        colonnes = merged_df.index if isinstance(merged_df, pd.Series) else merged_df.columns
+        
+        # Meilleur Borda renseigné des chevaux associés
+        borda = np.full(scoring_kernel.row_count(merged_df), np.nan)
+        borda_cols = [col for col in colonnes if 'Borda' in str(col)]
+        if borda_cols and '_has_borda' in colonnes:
+            valeurs = np.column_stack([scoring_kernel.column_values(merged_df, col) for col in borda_cols])
+            has_borda = scoring_kernel.column_values(merged_df, '_has_borda') > 0
+            borda = np.where(has_borda, np.fmax.reduce(valeurs, axis=1), np.nan)
+        
+        return scoring_kernel.score(merged_df, self.scoring_spec(),
+                                    inputs={'borda': borda}, engine='smart')
+    
     def calculate_smart_score(self, row, race_info):
         """
         Calcule un score intelligent en combinant TOUTES les données disponibles
         """
-        score = 0
-        confidence = 0
-        components = {}
-        
-        # 1. SCORES BORDA (35% si disponible)
-        borda_score = 0
-        if row.get('_has_borda', False):
-            # Sélectionner le meilleur Borda pour cette course
-            borda_cols = [col for col in row.index if 'Borda' in str(col)]
-            borda_values = [row[col] for col in borda_cols if not pd.isna(row[col])]
-            
-            if borda_values:
-                borda_score = max(borda_values) / 300 * 35  # Normaliser sur 35
-                confidence += 20
-        
-        components['Borda'] = borda_score
-        score += borda_score
-        
-        # 2. ELO COMBINÉ (25%)
-        elo_score = 0
-        elo_cols = {
-            'CHEVAL': 0.10,
-            'JOCKEY': 0.08,
-            'COACH': 0.05,
-            'PROPRIO': 0.01,
-            'ÉLEVEUR': 0.01
-        }
-        
-        for col_name, weight in elo_cols.items():
-            if col_name in row.index and not pd.isna(row[col_name]):
-                normalized = (row[col_name] - 1200) / 600  # Normaliser ELO
-                elo_score += normalized * weight * 100
-                confidence += 5
-        
-        components['ELO'] = elo_score
-        score += elo_score
-        
-        # 3. PRÉDICTIONS IA (20%)
-        ia_score = 0
-        ia_cols = ['Gagnant', 'Couplé', 'Trio', 'Multi', 'Quinté']
-        ia_weights = [0.08, 0.05, 0.04, 0.02, 0.01]
-        
-        for col_name, weight in zip(ia_cols, ia_weights):
-            if col_name in row.index and not pd.isna(row[col_name]):
-                ia_score += row[col_name] * weight * 100
-                confidence += 3
-        
-        components['IA'] = ia_score
-        score += ia_score
-        
-        # 4. TURF POINTS (10%)
-        tp_score = 0
-        if 'TP' in row.index and not pd.isna(row['TP']):
-            tp_normalized = row['TP'] / 2000  # Normaliser TP
-            tp_score = tp_normalized * 10
-            confidence += 10
-        
-        components['TurfPoints'] = tp_score
-        score += tp_score
-        
-        # 5. POPULARITÉ & COTE (10%)
-        pop_score = 0
-        if 'Popularité' in row.index and not pd.isna(row['Popularité']):
-            # Plus la popularité est basse (1 = meilleur), plus le score est élevé
-            pop_normalized = 1 - (row['Popularité'] / 20)  # Normaliser sur 20
-            pop_score = pop_normalized * 5
-            confidence += 5
-        
-        if 'COTE' in row.index and not pd.isna(row['COTE']):
-            # Favoriser cotes moyennes (3-15)
-            cote = row['COTE']
-            if 3 <= cote <= 15:
-                pop_score += 5
-            elif cote < 3:
-                pop_score += 3
-            else:
-                pop_score += 2
-            confidence += 5
-        
-        components['Popularité'] = pop_score
-        score += pop_score
+        result = self._score_kernel(row)
+        
+        components = {nom: float(valeurs[0]) for nom, valeurs in result['components'].items()}
+        score = float(result['total'][0])
         
         # Ajuster la confiance (max 100)
-        confidence = min(confidence, 100)
+        confidence = min(int(result['points'][0]), 100)
         
         return score, confidence, components
+    
+    def calculate_smart_scores(self, merged_df, race_info=None):
+        """
+        Version par lot de calculate_smart_score sur tout le DataFrame fusionné
+        
+        Returns:
+            DataFrame (même index que merged_df) avec Score, Confiance et les
+            composantes Borda, ELO, IA, TurfPoints, Popularité
+        """
+        result = self._score_kernel(merged_df)
+        
+        return pd.DataFrame({
+            'Score': result['total'],
+            'Confiance': np.minimum(result['points'], 100),
+            **result['components'],
+        }, index=merged_df.index)
 
 
 def display_smart_prediction(daily_file, export_file=None):
@@ -275,11 +301,13 @@ def display_smart_prediction(daily_file, export_file=None):
                 st.error("❌ Impossible de fusionner les données")
                 return
             
-            # Calculer les scores
+            # Calculer les scores (en une passe sur tout le DataFrame)
+            scores = system.calculate_smart_scores(merged_df, race_info)
             predictions = []
             
-            for idx, row in merged_df.iterrows():
-                score, confidence, components = system.calculate_smart_score(row, race_info)
+            for (idx, row), components in zip(merged_df.iterrows(), scores.to_dict('records')):
+                score = components['Score']
+                confidence = components['Confiance']
                 
                 cheval = row.get('CHEVAL/MUSIQ.', 'N/A').split('\n')[0] if 'CHEVAL/MUSIQ.' in row else 'N/A'
                 numero = row.get('N°', idx + 1)
@@ -47,79 +47,68 @@ class StreamlitDatabaseAdapter:
             ORDER BY r.date, c.numero_course
         """
         
-        return pd.read_sql_query(
-            query, 
-            self.db.conn, 
-            params=[date_debut, date_fin]
-        )
+        return self.db.read_sql(query, params=[date_debut, date_fin])
     
     def load_partants_for_predictions(self, date_debut: date, date_fin: date) -> pd.DataFrame:
         """
         Charge tous les partants avec leurs données pour les pronostics
         Format compatible avec l'ancien système CSV
+        
+        Lecture d'une plage de dates de la table de faits faits_partants
+        (jointure déjà matérialisée à l'import)
         """
         
         query = """
             SELECT 
-                c.course_code as Course,
-                r.date,
-                h.nom as hippodrome,
-                c.heure,
-                c.discipline,
-                c.distance,
-                c.allocation,
-                c.nombre_partants,
+                course_code as Course,
+                date,
+                hippodrome,
+                heure,
+                discipline,
+                distance,
+                allocation,
+                nombre_partants,
                 
-                p.numero as Numero,
-                ch.nom as Cheval,
-                ch.age,
-                ch.sexe as Sexe,
-                p.musique as Musique,
+                numero as Numero,
+                cheval as Cheval,
+                age,
+                sexe as Sexe,
+                musique as Musique,
                 
-                d.nom as Driver,
-                e.nom as Entraineur,
+                driver as Driver,
+                entraineur as Entraineur,
                 
-                p.cote_pmu as Cote,
-                p.cote_bzh as "Cote BZH",
+                cote_pmu as Cote,
+                cote_bzh as "Cote BZH",
                 
-                ch.elo as ELO_Cheval,
-                d.elo as ELO_Jockey,
-                e.elo as ELO_Entraineur,
+                elo_cheval as ELO_Cheval,
+                elo_jockey as ELO_Jockey,
+                elo_entraineur as ELO_Entraineur,
                 
-                p.ia_gagnant as IA_Gagnant,
-                p.ia_couple as IA_Couple,
-                p.ia_trio as IA_Trio,
-                p.ia_multi as IA_Multi,
-                p.note_ia as Note_IA_Decimale,
+                ia_gagnant as IA_Gagnant,
+                ia_couple as IA_Couple,
+                ia_trio as IA_Trio,
+                ia_multi as IA_Multi,
+                note_ia as Note_IA_Decimale,
                 
-                p.turf_points as "Turf Points",
-                p.tpch_90 as "TPch 90",
-                p.tpj_365 as "TPJ 365",
-                p.tpj_90 as "TPJ 90",
+                turf_points as "Turf Points",
+                tpch_90 as "TPch 90",
+                tpj_365 as "TPJ 365",
+                tpj_90 as "TPJ 90",
                 
-                p.rang_arrivee as Rang,
-                p.rapport_simple_gagnant as Rapport_SG,
-                p.rapport_simple_place as Rapport_SP
+                rang_arrivee as Rang,
+                rapport_simple_gagnant as Rapport_SG,
+                rapport_simple_place as Rapport_SP
                 
-            FROM partants p
-            JOIN courses c ON p.course_id = c.id
-            JOIN reunions r ON c.reunion_id = r.id
-            JOIN hippodromes h ON r.hippodrome_id = h.id
-            JOIN chevaux ch ON p.cheval_id = ch.id
-            LEFT JOIN drivers d ON p.driver_id = d.id
-            LEFT JOIN entraineurs e ON p.entraineur_id = e.id
+            FROM faits_partants
             
-            WHERE r.date BETWEEN ? AND ?
-            AND p.non_partant = 0
+            WHERE date BETWEEN ? AND ?
+            AND non_partant = 0
             
-            ORDER BY r.date, c.numero_course, p.numero
+            ORDER BY date, numero_course, numero
         """
         
-        df = pd.read_sql_query(
-            query,
-            self.db.conn,
-            params=[date_debut, date_fin]
-        )
+        df = self.db.read_sql(query, params=[date_debut, date_fin])
         
         # Conversion des types pour compatibilité
         if not df.empty:
@@ -135,33 +124,29 @@ class StreamlitDatabaseAdapter:
         
         query = """
             SELECT 
-                p.numero as Numero,
-                ch.nom as Cheval,
-                ch.age,
-                ch.sexe as Sexe,
-                p.musique as Musique,
-                d.nom as Driver,
-                e.nom as Entraineur,
-                p.cote_pmu as Cote,
-                p.cote_bzh as "Cote BZH",
-                ch.elo as ELO_Cheval,
-                d.elo as ELO_Jockey,
-                e.elo as ELO_Entraineur,
-                p.ia_gagnant as IA_Gagnant,
-                p.note_ia as Note_IA,
-                p.turf_points as "Turf Points",
-                p.rang_arrivee as Rang
-            FROM partants p
-            JOIN courses c ON p.course_id = c.id
-            JOIN chevaux ch ON p.cheval_id = ch.id
-            LEFT JOIN drivers d ON p.driver_id = d.id
-            LEFT JOIN entraineurs e ON p.entraineur_id = e.id
-            WHERE c.course_code = ?
-            AND p.non_partant = 0
-            ORDER BY p.numero
+                numero as Numero,
+                cheval as Cheval,
+                age,
+                sexe as Sexe,
+                musique as Musique,
+                driver as Driver,
+                entraineur as Entraineur,
+                cote_pmu as Cote,
+                cote_bzh as "Cote BZH",
+                elo_cheval as ELO_Cheval,
+                elo_jockey as ELO_Jockey,
+                elo_entraineur as ELO_Entraineur,
+                ia_gagnant as IA_Gagnant,
+                note_ia as Note_IA,
+                turf_points as "Turf Points",
+                rang_arrivee as Rang
+            FROM faits_partants
+            WHERE course_id IN (SELECT id FROM courses WHERE course_code = ?)
+            AND non_partant = 0
+            ORDER BY numero
         """
         
-        return pd.read_sql_query(query, self.db.conn, params=[course_code])
+        return self.db.read_sql(query, params=[course_code])
     
     # ==================== STATISTIQUES ====================
     
@@ -170,28 +155,30 @@ class StreamlitDatabaseAdapter:
         
         stats = {}
         
-        # Nombre de courses
-        self.db.cursor.execute("SELECT COUNT(*) FROM courses")
-        stats['total_courses'] = self.db.cursor.fetchone()[0]
-        
-        # Nombre de chevaux
-        self.db.cursor.execute("SELECT COUNT(*) FROM chevaux")
-        stats['total_chevaux'] = self.db.cursor.fetchone()[0]
-        
-        # Nombre de drivers
-        self.db.cursor.execute("SELECT COUNT(*) FROM drivers")
-        stats['total_drivers'] = self.db.cursor.fetchone()[0]
-        
-        # Nombre d'hippodromes
-        self.db.cursor.execute("SELECT COUNT(*) FROM hippodromes")
-        stats['total_hippodromes'] = self.db.cursor.fetchone()[0]
+        with self.db.connections.read() as cursor:
+            # Nombre de courses
+            cursor.execute("SELECT COUNT(*) FROM courses")
+            stats['total_courses'] = cursor.fetchone()[0]
+            
+            # Nombre de chevaux
+            cursor.execute("SELECT COUNT(*) FROM chevaux")
+            stats['total_chevaux'] = cursor.fetchone()[0]
+            
+            # Nombre de drivers
+            cursor.execute("SELECT COUNT(*) FROM drivers")
+            stats['total_drivers'] = cursor.fetchone()[0]
+            
+            # Nombre d'hippodromes
+            cursor.execute("SELECT COUNT(*) FROM hippodromes")
+            stats['total_hippodromes'] = cursor.fetchone()[0]
+            
+            # Période couverte
+            cursor.execute("""
+                SELECT MIN(date), MAX(date) 
+                FROM reunions
+            """)
+            min_date, max_date = cursor.fetchone()
         
-        # Période couverte
-        self.db.cursor.execute("""
-            SELECT MIN(date), MAX(date) 
-            FROM reunions
-        """)
-        min_date, max_date = self.db.cursor.fetchone()
         stats['date_debut'] = min_date
         stats['date_fin'] = max_date
         
@@ -214,7 +201,7 @@ class StreamlitDatabaseAdapter:
             ORDER BY Nb_Courses DESC
         """
         
-        return pd.read_sql_query(query, self.db.conn)
+        return self.db.read_sql(query)
     
     # ==================== FAVORIS ====================
     
@@ -236,17 +223,18 @@ class StreamlitDatabaseAdapter:
             ORDER BY fc.date_ajout DESC
         """
         
-        return pd.read_sql_query(query, self.db.conn)
+        return self.db.read_sql(query)
     
     def add_favorite_horse(self, nom_cheval: str, notes: str = None) -> bool:
         """Ajoute un cheval aux favoris"""
         
         # Trouver le cheval
-        self.db.cursor.execute(
-            "SELECT id FROM chevaux WHERE nom = ?",
-            (nom_cheval,)
-        )
-        row = self.db.cursor.fetchone()
+        with self.db.connections.read() as cursor:
+            cursor.execute(
+                "SELECT id FROM chevaux WHERE nom = ?",
+                (nom_cheval,)
+            )
+            row = cursor.fetchone()
         
         if not row:
             return False
@@ -254,11 +242,11 @@ class StreamlitDatabaseAdapter:
         cheval_id = row[0]
         
         try:
-            self.db.cursor.execute(
-                "INSERT INTO favoris_chevaux (cheval_id, notes) VALUES (?, ?)",
-                (cheval_id, notes)
-            )
-            self.db.conn.commit()
+            with self.db.connections.write() as cursor:
+                cursor.execute(
+                    "INSERT INTO favoris_chevaux (cheval_id, notes) VALUES (?, ?)",
+                    (cheval_id, notes)
+                )
             return True
         except:
             return False
@@ -273,9 +261,9 @@ class StreamlitDatabaseAdapter:
             )
         """
         
-        self.db.cursor.execute(query, (nom_cheval,))
-        self.db.conn.commit()
-        return self.db.cursor.rowcount > 0
+        with self.db.connections.write() as cursor:
+            cursor.execute(query, (nom_cheval,))
+            return cursor.rowcount > 0
     
     # ==================== HISTORIQUE CHEVAUX ====================
     
@@ -284,94 +272,97 @@ class StreamlitDatabaseAdapter:
         
         query = """
             SELECT 
-                r.date as Date,
-                c.course_code as Course,
-                h.nom as Hippodrome,
-                c.discipline as Discipline,
-                c.distance as Distance,
-                p.numero as "N°",
-                p.cote_pmu as Cote,
-                d.nom as Driver,
-                p.rang_arrivee as Rang,
+                date as Date,
+                course_code as Course,
+                hippodrome as Hippodrome,
+                discipline as Discipline,
+                distance as Distance,
+                numero as "N°",
+                cote_pmu as Cote,
+                driver as Driver,
+                rang_arrivee as Rang,
                 CASE 
-                    WHEN p.rang_arrivee = 1 THEN '🥇'
-                    WHEN p.rang_arrivee = 2 THEN '🥈'
-                    WHEN p.rang_arrivee = 3 THEN '🥉'
-                    WHEN p.rang_arrivee <= 5 THEN '✅'
+                    WHEN rang_arrivee = 1 THEN '🥇'
+                    WHEN rang_arrivee = 2 THEN '🥈'
+                    WHEN rang_arrivee = 3 THEN '🥉'
+                    WHEN rang_arrivee <= 5 THEN '✅'
                     ELSE ''
                 END as Resultat
-            FROM partants p
-            JOIN courses c ON p.course_id = c.id
-            JOIN reunions r ON c.reunion_id = r.id
-            JOIN hippodromes h ON r.hippodrome_id = h.id
-            JOIN chevaux ch ON p.cheval_id = ch.id
-            LEFT JOIN drivers d ON p.driver_id = d.id
-            WHERE ch.nom = ?
-            ORDER BY r.date DESC
+            FROM faits_partants
+            WHERE cheval = ?
+            ORDER BY date DESC
             LIMIT ?
         """
         
-        return pd.read_sql_query(query, self.db.conn, params=[nom_cheval, limit])
+        return self.db.read_sql(query, params=[nom_cheval, limit])
     
     # ==================== RECHERCHE ====================
     
     def search_horses(self, search_term: str, limit: int = 20) -> pd.DataFrame:
-        """Recherche de chevaux par nom"""
+        """Recherche de chevaux par nom (plein texte, préfixes, sans accents)"""
         
         query = """
             SELECT 
-                nom as Cheval,
-                age as Age,
-                sexe as Sexe,
-                elo as ELO,
-                nb_courses as "Nb Courses",
-                nb_victoires as Victoires,
-                ROUND(nb_victoires * 100.0 / NULLIF(nb_courses, 0), 1) as "Taux %"
-            FROM chevaux
-            WHERE nom LIKE ?
-            ORDER BY elo DESC
+                ch.nom as Cheval,
+                ch.age as Age,
+                ch.sexe as Sexe,
+                ch.elo as ELO,
+                ch.nb_courses as "Nb Courses",
+                ch.nb_victoires as Victoires,
+                ROUND(ch.nb_victoires * 100.0 / NULLIF(ch.nb_courses, 0), 1) as "Taux %"
+            FROM chevaux_fts
+            JOIN chevaux ch ON ch.id = chevaux_fts.rowid
+            WHERE chevaux_fts MATCH ?
+            ORDER BY chevaux_fts.rank, ch.elo DESC
             LIMIT ?
         """
         
-        return pd.read_sql_query(
-            query, 
-            self.db.conn, 
-            params=[f"%{search_term}%", limit]
-        )
+        match = self.db.search_match(search_term)
+        if match is None:
+            return pd.DataFrame(columns=['Cheval', 'Age', 'Sexe', 'ELO', 'Nb Courses', 'Victoires', 'Taux %'])
+        
+        return self.db.read_sql(query, params=[match, limit])
     
     def search_drivers(self, search_term: str, limit: int = 20) -> pd.DataFrame:
-        """Recherche de drivers par nom"""
+        """Recherche de drivers par nom (plein texte, préfixes, sans accents)"""
         
         query = """
             SELECT 
-                nom as Driver,
-                elo as ELO,
-                nb_courses as "Nb Courses",
-                nb_victoires as Victoires,
-                ROUND(taux_victoire, 1) as "Taux Victoire %",
-                ROUND(taux_place, 1) as "Taux Place %"
-            FROM drivers
-            WHERE nom LIKE ?
-            ORDER BY elo DESC
+                d.nom as Driver,
+                d.elo as ELO,
+                d.nb_courses as "Nb Courses",
+                d.nb_victoires as Victoires,
+                ROUND(d.taux_victoire, 1) as "Taux Victoire %",
+                ROUND(d.taux_place, 1) as "Taux Place %"
+            FROM drivers_fts
+            JOIN drivers d ON d.id = drivers_fts.rowid
+            WHERE drivers_fts MATCH ?
+            ORDER BY drivers_fts.rank, d.elo DESC
             LIMIT ?
         """
         
-        return pd.read_sql_query(
-            query,
-            self.db.conn,
-            params=[f"%{search_term}%", limit]
-        )
+        match = self.db.search_match(search_term)
+        if match is None:
+            return pd.DataFrame(columns=['Driver', 'ELO', 'Nb Courses', 'Victoires', 'Taux Victoire %', 'Taux Place %'])
+        
+        return self.db.read_sql(query, params=[match, limit])
     
     # ==================== IMPORT AUTOMATIQUE ====================
     
-    def import_csv_file(self, uploaded_file, date_reunion: date = None) -> dict:
+    def import_csv_file(self, uploaded_file, date_reunion: date = None,
+                        progress_callback=None) -> dict:
         """
         Import d'un fichier CSV uploadé dans Streamlit
-        Utilise l'importeur universel qui gère tous les formats
+        Utilise l'importeur universel qui gère tous les formats, en flux
+        (mémoire bornée, commit par groupe de courses complètes) et en mode
+        incrémental : un fichier déjà importé est ignoré, et seules les
+        courses dont les partants ont changé sont réécrites
         
         Args:
             uploaded_file: Fichier UploadedFile de Streamlit
             date_reunion: Date de la réunion (auto-détection si None)
+            progress_callback: Appelée avec (lignes lues, fraction du fichier),
+                               ex: pour alimenter un st.progress
         
         Returns:
             Dict avec statistiques d'import
@@ -385,7 +376,9 @@ class StreamlitDatabaseAdapter:
         
         # Utiliser l'importeur universel
         from universal_importer import import_any_csv
-        stats = import_any_csv(tmp_path, date_reunion)
+        stats = import_any_csv(tmp_path, date_reunion, stream=True,
+                               progress_callback=progress_callback,
+                               incremental=True, source_name=uploaded_file.name)
         
         # Nettoyer
         import os
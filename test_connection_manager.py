@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+🧪 TEST - CONNEXIONS WAL (ConnectionManager)
+Un écrivain sérialisé, des lecteurs par thread qui ne voient que l'état
+validé, rollback / savepoint des blocs connections.write()
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from turf_database_complete import TurfDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    base = TurfDatabase(str(tmp_path / 'turf.db'))
+    yield base
+    base.close()
+
+
+def compter(db: TurfDatabase, nom: str) -> int:
+    return db.cursor.execute("SELECT COUNT(*) FROM hippodromes WHERE nom = ?", (nom,)).fetchone()[0]
+
+
+class EcritureEnCours(threading.Thread):
+    """Ouvre une transaction d'écriture et la garde jusqu'à terminer()"""
+
+    def __init__(self, db: TurfDatabase, ecrire, echec: bool = False):
+        super().__init__()
+        self.db = db
+        self.ecrire = ecrire
+        self.echec = echec
+        self.ouverte = threading.Event()
+        self.fin = threading.Event()
+
+    def run(self):
+        try:
+            with self.db.connections.write() as cursor:
+                self.ecrire(cursor)
+                self.ouverte.set()
+                self.fin.wait(5)
+                if self.echec:
+                    raise RuntimeError("échec volontaire")
+        except RuntimeError:
+            pass
+
+    def __enter__(self):
+        self.start()
+        assert self.ouverte.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self.fin.set()
+        self.join(5)
+
+
+def test_conn_et_cursor_en_lecture_seule(db):
+    with pytest.raises(sqlite3.OperationalError):
+        db.cursor.execute("INSERT INTO hippodromes (nom) VALUES ('X')")
+    with pytest.raises(sqlite3.OperationalError):
+        db.conn.execute("INSERT INTO hippodromes (nom) VALUES ('X')")
+
+
+def test_lectures_ne_voient_pas_une_ecriture_en_cours(db):
+    def ecrire(cursor):
+        cursor.execute("INSERT INTO hippodromes (nom) VALUES ('A1')")
+        cursor.execute("""
+            INSERT INTO import_ledger (fichier, content_hash, nb_lignes, nb_courses, nb_partants)
+            VALUES ('export.csv', 'h1', 10, 1, 10)
+        """)
+
+    with EcritureEnCours(db, ecrire):
+        assert compter(db, 'A1') == 0
+        assert db.read_sql("SELECT * FROM hippodromes WHERE nom = 'A1'").empty
+        assert not db.is_file_imported('h1')
+        db.id_cache.clear()
+        db.warm_id_cache()
+        assert db.id_cache.get('hippodromes', 'A1') is None
+
+    assert compter(db, 'A1') == 1
+    assert db.is_file_imported('h1')
+
+
+def test_ecriture_concurrente_attend_la_transaction(db):
+    resultats = {}
+
+    def autre_thread():
+        resultats['id'] = db.get_or_create_hippodrome('B1')
+        resultats['ecrivain_libre'] = not db.connections.writer.in_transaction
+
+    ecriture = EcritureEnCours(db, lambda c: c.execute("INSERT INTO hippodromes (nom) VALUES ('A1')"), echec=True)
+    with ecriture:
+        thread = threading.Thread(target=autre_thread)
+        thread.start()
+        time.sleep(0.1)
+        # Bloqué par le verrou : ne peut ni valider ni mêler ses écritures à celles de A
+        assert thread.is_alive()
+    thread.join(5)
+
+    assert compter(db, 'A1') == 0
+    assert compter(db, 'B1') == 1
+    assert resultats['ecrivain_libre']
+
+
+def test_blocs_imbriques_annules_ensemble(db):
+    with pytest.raises(RuntimeError):
+        with db.connections.write():
+            db.get_or_create_hippodrome('N1')
+            db.get_or_create_driver('D1')
+            raise RuntimeError
+
+    assert compter(db, 'N1') == 0
+    assert db.id_cache.get('hippodromes', 'N1') is None
+    assert not db.connections.writer.in_transaction
+
+
+def test_savepoint_n_annule_que_le_lot(db):
+    with db.connections.write():
+        db.get_or_create_hippodrome('S1')
+        # Lot invalide (course incomplète) : seules ses écritures sont annulées
+        stats = db.write_import_batch({
+            'courses': [{'hippodrome': 'S2', 'reunion_code': 'R1', 'date': '2026-01-01', 'course_code': 'R1C1'}],
+            'partants': {},
+        })
+        assert stats['errors']
+
+    assert compter(db, 'S1') == 1
+    assert compter(db, 'S2') == 0
+    assert db.id_cache.get('hippodromes', 'S2') is None
+
+
+def test_base_en_memoire_lecture_sous_verrou():
+    db = TurfDatabase(':memory:')
+    try:
+        lu = {}
+        ecriture = EcritureEnCours(db, lambda c: c.execute("INSERT INTO hippodromes (nom) VALUES ('M1')"), echec=True)
+        with ecriture:
+            lecteur = threading.Thread(target=lambda: lu.update(n=compter(db, 'M1')))
+            lecteur.start()
+            time.sleep(0.1)
+            # Une seule connexion : la lecture attend la fin de la transaction
+            assert lecteur.is_alive()
+        lecteur.join(5)
+        assert lu['n'] == 0
+    finally:
+        db.close()
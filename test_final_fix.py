@@ -16,27 +16,27 @@ db = get_turf_database()
 print("\n1️⃣ Nettoyage complet...")
 
 # Supprimer les partants du 16/01 (qui n'existent pas encore normalement)
-db.cursor.execute('''
-    DELETE FROM partants WHERE course_id IN (
-        SELECT c.id FROM courses c
-        JOIN reunions r ON c.reunion_id = r.id
-        WHERE r.date = "2026-01-16"
-    )
-''')
+with db.connections.write() as cursor:
+    cursor.execute('''
+        DELETE FROM partants WHERE course_id IN (
+            SELECT c.id FROM courses c
+            JOIN reunions r ON c.reunion_id = r.id
+            WHERE r.date = "2026-01-16"
+        )
+    ''')
 
-# Supprimer les courses du 16/01
-db.cursor.execute('''
-    DELETE FROM courses WHERE id IN (
-        SELECT c.id FROM courses c
-        JOIN reunions r ON c.reunion_id = r.id
-        WHERE r.date = "2026-01-16"
-    )
-''')
+    # Supprimer les courses du 16/01
+    cursor.execute('''
+        DELETE FROM courses WHERE id IN (
+            SELECT c.id FROM courses c
+            JOIN reunions r ON c.reunion_id = r.id
+            WHERE r.date = "2026-01-16"
+        )
+    ''')
 
-# Supprimer les réunions du 16/01
-db.cursor.execute('DELETE FROM reunions WHERE date = "2026-01-16"')
+    # Supprimer les réunions du 16/01
+    cursor.execute('DELETE FROM reunions WHERE date = "2026-01-16"')
 
-db.conn.commit()
 print("   ✅ Nettoyage terminé")
 
 # 2. Import avec version corrigée
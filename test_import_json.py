@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+🧪 TEST - IMPORT JSON SUR UNE DATE DÉJÀ IMPORTÉE
+Les résultats PMU (JSON) importés après l'export Turf BZH ne touchent que
+les colonnes qu'ils fournissent : ids, IA et scores Borda sont conservés
+"""
+
+import pandas as pd
+import pytest
+from datetime import date
+from pathlib import Path
+
+import turf_database_complete
+from turf_database_complete import TurfDatabase, CSV_READ_OPTIONS
+from import_json import build_json_batch, COLONNES_MISES_A_JOUR
+
+EXPORT = Path(__file__).parent / 'export_turfbzh_20260116.csv'
+JOUR = date(2026, 1, 16)
+COTE_JSON = 7.5
+
+
+def races_json(df: pd.DataFrame) -> list:
+    """
+    Lignes process_race de chaque course de l'export, sans âge (comme les
+    JSON PMU) et avec une arrivée fictive dans l'ordre des numéros
+    """
+    # Les extracteurs JSON renvoient '' pour une donnée absente
+    df = df.astype(object).where(df.notna(), '')
+    races = []
+    for course_code, course in df.groupby('Course', sort=False):
+        reunion, numero_course = course_code[1:].split('C')
+        rows = []
+        for rang, (_, r) in enumerate(course.iterrows(), start=1):
+            rows.append({
+                'course_id': course_code,
+                'date': str(JOUR),
+                'hippodrome': r['hippodrome'],
+                'numero_reunion': reunion,
+                'numero_course': numero_course,
+                'heure': r['heure'],
+                'discipline': r['discipline'],
+                'distance': r['distance'],
+                'montant_prix': '',
+                'nombre_partants': len(course),
+                'numero': int(r['Numero']),
+                'cheval': r['Cheval'],
+                'age': '',
+                'sexe': r['Sexe'],
+                'driver': r['Driver'],
+                'entraineur': r['Entraineur'],
+                'musique': r['Musique'],
+                'cote_direct': COTE_JSON,
+                'ordre_arrivee': rang,
+            })
+        premier = rows[0]['numero']
+        rows[0]['dividendes'] = {
+            'E_SIMPLE_GAGNANT': [[premier, 3.2]],
+            'E_SIMPLE_PLACE': [[premier, 1.4]],
+        }
+        races.append(rows)
+    return races
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    base = TurfDatabase(str(tmp_path / 'turf.db'))
+    monkeypatch.setattr(turf_database_complete, '_db_instance', base)
+    yield base
+    base.close()
+
+
+def lire_partants(db: TurfDatabase) -> pd.DataFrame:
+    return db.read_sql("""
+        SELECT p.*, bs.score_total, bs.rang AS borda_rang
+        FROM partants p
+        LEFT JOIN borda_scores bs ON bs.partant_id = p.id
+        ORDER BY p.id
+    """)
+
+
+def test_json_apres_csv_conserve_les_partants(db):
+    from borda_calculator_db import BordaCalculator
+
+    assert not db.import_from_csv(str(EXPORT), JOUR)['errors']
+    BordaCalculator().calculate_all_today(JOUR)
+    avant = lire_partants(db)
+    nb_chevaux = db.read_sql("SELECT COUNT(*) AS n FROM chevaux")['n'][0]
+    assert avant['score_total'].notna().all()
+
+    df = pd.read_csv(EXPORT, **CSV_READ_OPTIONS)
+    stats = db.write_import_batch(build_json_batch(races_json(df)))
+    assert not stats['errors']
+    apres = lire_partants(db)
+
+    # Mêmes partants (ids), mêmes chevaux, données Turf BZH et Borda intactes
+    assert apres['id'].tolist() == avant['id'].tolist()
+    assert db.read_sql("SELECT COUNT(*) AS n FROM chevaux")['n'][0] == nb_chevaux
+    for col in ('cheval_id', 'driver_id', 'cote_bzh', 'ia_gagnant', 'ia_couple', 'ia_trio',
+                'note_ia', 'turf_points', 'tpch_90', 'tpj_365', 'score_total', 'borda_rang'):
+        pd.testing.assert_series_equal(apres[col], avant[col])
+
+    # Colonnes fournies par les JSON mises à jour
+    assert (apres['cote_pmu'] == COTE_JSON).all()
+    assert apres['rang_arrivee'].notna().all()
+    gagnants = apres[apres['rang_arrivee'] == 1]
+    assert (gagnants['rapport_simple_gagnant'] == 3.2).all()
+    assert apres.loc[apres['rang_arrivee'] > 1, 'rapport_simple_gagnant'].isna().all()
+
+    # La table de faits suit la mise à jour
+    faits = db.read_sql("SELECT partant_id, cote_pmu, cote_bzh, borda_score FROM faits_partants ORDER BY partant_id")
+    assert faits['partant_id'].tolist() == apres['id'].tolist()
+    assert (faits['cote_pmu'] == COTE_JSON).all()
+    assert faits['borda_score'].tolist() == apres['score_total'].tolist()
+
+
+def test_json_seul_cree_les_partants(db):
+    df = pd.read_csv(EXPORT, **CSV_READ_OPTIONS)
+    batch = build_json_batch(races_json(df))
+    assert batch['mise_a_jour'] == COLONNES_MISES_A_JOUR
+
+    stats = db.write_import_batch(batch)
+    assert not stats['errors']
+    partants = lire_partants(db)
+    assert len(partants) == len(df)
+    assert partants['cote_bzh'].isna().all()
+    assert (partants['cote_pmu'] == COTE_JSON).all()
+
+
+def test_lot_sans_modification_du_schema(db, tmp_path):
+    df = pd.read_csv(EXPORT, **CSV_READ_OPTIONS)
+    version = db.read_sql("PRAGMA schema_version").iloc[0, 0]
+
+    assert not db.import_from_csv(str(EXPORT), JOUR)['errors']
+    assert not db.write_import_batch(build_json_batch(races_json(df)))['errors']
+
+    # Triggers désactivés par le drapeau, jamais retirés ni recréés
+    assert db.read_sql("PRAGMA schema_version").iloc[0, 0] == version
+    assert db.read_sql(f"SELECT COUNT(*) AS n FROM {db.BULK_FLAG_TABLE}")['n'][0] == 0
+    faits = db.read_sql("SELECT * FROM faits_partants ORDER BY partant_id")
+    db.rebuild_runner_facts()
+    pd.testing.assert_frame_equal(db.read_sql("SELECT * FROM faits_partants ORDER BY partant_id"), faits)
+
+    # Base existante aux triggers sans clause WHEN : recréés à l'ouverture
+    chemin = str(tmp_path / 'turf.db')
+    with db.connections.write() as cursor:
+        cursor.execute("DROP TRIGGER trg_faits_partants_update")
+        cursor.execute("""
+            CREATE TRIGGER trg_faits_partants_update AFTER UPDATE ON partants
+            BEGIN DELETE FROM faits_partants WHERE partant_id = OLD.id; END
+        """)
+    db.close()
+    base = TurfDatabase(chemin)
+    try:
+        triggers = base.read_sql("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+        gates = triggers[triggers['name'].isin(base.BULK_GATED_TRIGGERS)]
+        assert len(gates) == len(base.BULK_GATED_TRIGGERS)
+        assert gates['sql'].str.contains(base.BULK_FLAG_TABLE).all()
+    finally:
+        base.close()
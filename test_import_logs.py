@@ -13,24 +13,24 @@ print("="*60)
 print("\n1️⃣ Nettoyage des données du 16/01...")
 db = get_turf_database()
 
-db.cursor.execute('''
-    DELETE FROM partants WHERE course_id IN (
-        SELECT c.id FROM courses c
-        JOIN reunions r ON c.reunion_id = r.id
-        WHERE r.date = "2026-01-16"
-    )
-''')
-
-db.cursor.execute('''
-    DELETE FROM courses WHERE id IN (
-        SELECT c.id FROM courses c
-        JOIN reunions r ON c.reunion_id = r.id
-        WHERE r.date = "2026-01-16"
-    )
-''')
-
-db.cursor.execute('DELETE FROM reunions WHERE date = "2026-01-16"')
-db.conn.commit()
+with db.connections.write() as cursor:
+    cursor.execute('''
+        DELETE FROM partants WHERE course_id IN (
+            SELECT c.id FROM courses c
+            JOIN reunions r ON c.reunion_id = r.id
+            WHERE r.date = "2026-01-16"
+        )
+    ''')
+
+    cursor.execute('''
+        DELETE FROM courses WHERE id IN (
+            SELECT c.id FROM courses c
+            JOIN reunions r ON c.reunion_id = r.id
+            WHERE r.date = "2026-01-16"
+        )
+    ''')
+
+    cursor.execute('DELETE FROM reunions WHERE date = "2026-01-16"')
 
 print("   ✅ Nettoyage terminé")
 
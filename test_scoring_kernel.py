@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+🧪 TEST - NOYAU DE SCORING
+Chaque transformation, les agrégations 'somme' / 'moyenne', et la parité
+entre le calcul d'un cheval (Series) et celui de tout un DataFrame
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+
+import scoring_kernel
+from scoring_kernel import score
+from prediction_engine import TurfPredictionEngine
+
+EXPORT = Path(__file__).parent / 'export_turfbzh_20260116.csv'
+CSV_READ_OPTIONS = {'sep': ';', 'encoding': 'utf-8-sig', 'decimal': ','}
+
+
+@pytest.fixture(scope='module')
+def export():
+    return pd.read_csv(EXPORT, **CSV_READ_OPTIONS)
+
+
+def transformer(kind, brutes, inputs=None, **params):
+    """Valeurs normalisées d'un terme seul, sans facteur"""
+    df = pd.DataFrame({'x': brutes})
+    spec = (('c', 'somme', ({'colonne': 'x', 'transform': kind, **params},)),)
+    return score(df, spec, inputs)['components']['c'].tolist()
+
+
+# ==================== TRANSFORMATIONS ====================
+
+def test_transformations_lineaires():
+    assert transformer('brut', [0.25, 3.0]) == [0.25, 3.0]
+    assert transformer('elo', [1200, 1500, 1800]) == [0.0, 0.5, 1.0]
+    assert transformer('borda', [150, 300]) == [0.5, 1.0]
+    assert transformer('turf_points', [500, 2000]) == [0.25, 1.0]
+    assert transformer('gains', [50000, 200000]) == [0.5, 1.0]
+    assert transformer('corde', [4, 30]) == [80.0, 0.0]
+
+
+def test_transformations_popularite():
+    assert transformer('popularite', [5, 30]) == [0.75, -0.5]
+    assert transformer('popularite', [5, 30], plafond=True) == [0.75, 0.0]
+    assert transformer('popularite_borda', [5, 25]) == [0.75, 0.0]
+
+
+def test_tranches_de_cote():
+    # Bande 3-15 bornes incluses, puis en dessous / au-dessus
+    assert transformer('cote', [3, 15, 2.9, 15.1], valeurs=(3, 2, 1)) == [3.0, 3.0, 2.0, 1.0]
+
+
+def test_rang_dans_la_course():
+    inputs = {'maximum': np.array([5.0, 5.0, 5.0, 1.0])}
+    assert transformer('rang_course', [1, 3, 5, 1], inputs, maximum='maximum') == [1.0, 0.5, 0.0, 0.5]
+
+
+def test_repos():
+    assert transformer('repos', [14, 28, 7, 42, 43, 3]) == [1.0, 1.0, 0.7, 0.7, 0.4, 0.4]
+
+
+def test_forme_depuis_la_musique():
+    # Bonnes places (1, 2, 3) parmi les 10 premiers caractères, 50 si trop court
+    assert transformer('forme', ['1a2a3a4a5a6a', '0a0a0a', '1a', None]) == [60.0, 0.0, 50.0, 0.0]
+
+
+# ==================== AGRÉGATIONS ====================
+
+def test_somme_des_termes_presents():
+    df = pd.DataFrame({'a': [1.0, np.nan, 2.0], 'b': ['12,5', '1', None], 'c': [0.0, 3.0, -1.0]})
+    spec = (('S', 'somme', (
+        {'colonne': 'a', 'transform': 'brut', 'facteurs': (2,), 'points': 5},
+        {'colonne': 'b', 'transform': 'brut', 'facteurs': (0.5, 2), 'virgule': True},
+        {'colonne': 'c', 'transform': 'brut', 'positif': True, 'points': 1},
+        {'colonne': 'absente', 'transform': 'brut', 'points': 100},
+    )),)
+    result = score(df, spec)
+    assert result['components']['S'].tolist() == [14.5, 4.0, 4.0]
+    assert result['points'].tolist() == [5, 1, 5]
+
+
+def test_moyenne_ponderee_des_termes_presents():
+    df = pd.DataFrame({'a': [1.0, np.nan, np.nan], 'b': [0.4, 0.4, np.nan]})
+    spec = (('M', 'moyenne', (
+        {'colonne': 'a', 'transform': 'brut', 'facteurs': (3,)},
+        {'colonne': 'b', 'transform': 'brut', 'facteurs': (1,)},
+    )),)
+    # (1×3 + 0.4×1) / 4, 0.4 seul, 0 sans aucun terme
+    assert score(df, spec)['components']['M'].tolist() == pytest.approx([0.85, 0.4, 0.0])
+
+
+def test_total_et_types():
+    df = pd.DataFrame({'a': [1.0, np.nan], 'cote': [5, np.nan]})
+    spec = (
+        ('A', 'somme', ({'colonne': 'a', 'transform': 'brut'},)),
+        ('C', 'somme', ({'colonne': 'cote', 'transform': 'cote', 'valeurs': (3, 2, 1)},)),
+    )
+    result = score(df, spec)
+    assert result['total'].tolist() == [4.0, 0.0]
+    for valeurs in result['components'].values():
+        assert valeurs.dtype == np.float64
+
+
+# ==================== PARITÉ LIGNE / LOT ====================
+
+def test_series_et_dataframe_identiques(export):
+    engine = TurfPredictionEngine()
+    spec = engine.scoring_spec()
+    inputs = {'borda': np.full(len(export), 120.0), 'pop_max': np.full(len(export), 18.0),
+              'corde_max': np.full(len(export), 16.0)}
+    lot = score(export, spec, inputs)
+    for i in range(0, len(export), 37):
+        ligne = score(export.iloc[i], spec, {k: v[i:i + 1] for k, v in inputs.items()})
+        for nom in lot['components']:
+            assert ligne['components'][nom][0] == lot['components'][nom][i]
+        assert ligne['points'][0] == lot['points'][i]
+
+
+def test_turf_prediction_engine(export):
+    engine = TurfPredictionEngine()
+    course = export[export['Course'] == 'R1C1']
+    stats = engine.course_aggregates(course)
+    n = len(course)
+    lot = score(course, engine.scoring_spec(), {
+        'borda': np.zeros(n),
+        'pop_max': np.full(n, stats['pop_max'], dtype=float),
+        'corde_max': np.full(n, stats['corde_max'], dtype=float),
+    })['components']
+
+    for i, (_, row) in enumerate(course.iterrows()):
+        assert engine.calculate_elo_score(row) == lot['ELO'][i]
+        assert engine.calculate_ia_score(row) == lot['IA'][i]
+        assert engine.calculate_performance_score(row) == lot['Perf'][i]
+        assert engine.calculate_strategic_score(row, stats) == lot['Strat'][i]
+        assert engine.calculate_strategic_score(row, course) == lot['Strat'][i]
+
+    # Sans aucune donnée : 0.0
+    assert engine.calculate_elo_score(pd.Series({'Cheval': 'X'})) == 0.0
+
+    # Poids modifiés : la spécification en cache suit
+    row = course.iloc[0]
+    avant = engine.calculate_ia_score(row)
+    engine.weights['ia_gagnant'] = 0.0
+    assert engine.calculate_ia_score(row) != avant
+
+
+def test_global_prediction_engine(export):
+    pytest.importorskip('streamlit')
+    from global_predictions import GlobalPredictionEngine
+
+    engine = GlobalPredictionEngine()
+    course = export[export['Course'] == 'R1C1']
+    borda = pd.to_numeric(course['Borda - Borda par Défaut'], errors='coerce').fillna(0).to_numpy()
+    lot = engine.score_columns(course, borda)
+
+    for i, (_, row) in enumerate(course.iterrows()):
+        total, components = engine.calculate_horse_score(row, 'Deauville', 'P', len(course),
+                                                         forced_borda='Borda par Défaut')
+        assert round(min(total, 100), 2) == lot['Score'][i]
+        for nom, _, _ in engine.SCORING_SPEC:
+            assert components[nom] == lot[nom][i]
+
+
+def test_smart_prediction_system(export):
+    pytest.importorskip('streamlit')
+    from smart_prediction_v2 import SmartPredictionSystem
+
+    system = SmartPredictionSystem()
+    merged = export.rename(columns={
+        'ELO_Cheval': 'CHEVAL', 'ELO_Jockey': 'JOCKEY', 'ELO_Entraineur': 'COACH',
+        'IA_Gagnant': 'Gagnant', 'Turf Points': 'TP', 'Popularite': 'Popularité', 'Cote': 'COTE',
+    }).head(40)
+    merged['_has_borda'] = [i % 3 != 0 for i in range(len(merged))]
+    lot = system.calculate_smart_scores(merged)
+
+    for i, (_, row) in enumerate(merged.iterrows()):
+        total, confiance, components = system.calculate_smart_score(row, {})
+        assert total == lot['Score'].iloc[i]
+        assert confiance == lot['Confiance'].iloc[i]
+        for nom, valeur in components.items():
+            assert valeur == lot[nom].iloc[i]
+
+
+def test_auto_borda_generator(export):
+    pytest.importorskip('streamlit')
+    from foreign_races_system import AutoBordaGenerator
+
+    generator = AutoBordaGenerator.__new__(AutoBordaGenerator)
+    weights = {'popularite': 0.3, 'cote': 1, 'gains': 0.2, 'corde': 0.1, 'forme': 0.4}
+    lot = generator.calculate_borda_scores(export.head(40), weights)
+
+    for i, (_, row) in enumerate(export.head(40).iterrows()):
+        assert generator.calculate_borda_score(row, weights) == lot[i]
+    # Cote seule avec un poids entier : score de tranche conservé, en float
+    assert generator.calculate_borda_score(pd.Series({'Cote': 5}), weights) == 100.0
+    assert generator.calculate_borda_score(pd.Series(dtype=float), weights) == 0.0
+
+
+def test_temps_par_composante():
+    scoring_kernel.reset_timings()
+    score(pd.DataFrame({'a': [1.0]}), (('A', 'somme', ({'colonne': 'a', 'transform': 'brut'},)),),
+          engine='test')
+    rapport = scoring_kernel.timing_report()
+    assert rapport[['moteur', 'composante', 'appels', 'lignes']].values.tolist() == [['test', 'A', 1, 1]]
+
+
+def test_classement_a_score_egal(export):
+    engine = TurfPredictionEngine()
+    course = export[export['Course'] == 'R1C1']
+    # Deux courses de partants identiques : tous à égalité dans leur course
+    jumeaux = pd.concat([course.iloc[[0] * 4], course.iloc[[1] * 3]]).assign(Course=['A'] * 4 + ['B'] * 3)
+    jumeaux['Numero'] = [4, 2, 9, 1, 7, 3, 5]
+
+    jour = engine.generate_predictions_for_day(jumeaux)
+    # Score décroissant puis ordre d'apparition, comme generate_prediction
+    assert jour['Numero'].tolist() == [4, 2, 9, 1, 7, 3, 5]
+    assert jour['Rang_Prono'].tolist() == [1, 2, 3, 4, 1, 2, 3]
+    seule = engine.generate_prediction(jumeaux[jumeaux['Course'] == 'A'])
+    assert seule['Numero'].tolist() == [4, 2, 9, 1]
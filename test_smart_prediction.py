@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+🧪 TEST - ASSOCIATION FICHIER QUOTIDIEN / EXPORT BORDA
+Par nom (première ligne de 'CHEVAL/MUSIQ.', en majuscules) puis par
+numéro ; un cheval non associé garde ses propres colonnes Borda
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('streamlit')
+from smart_prediction_v2 import SmartPredictionSystem
+
+
+@pytest.fixture
+def system():
+    system = SmartPredictionSystem()
+    system.borda_data = pd.DataFrame({
+        'date': ['2026-01-16'] * 4 + ['2026-01-17'],
+        'hippodrome': ['Deauville'] * 4 + ['Pau'],
+        'Course': ['R1C1'] * 4 + ['R1C1'],
+        'Numero': [1, 2, 3, 4, 1],
+        'Cheval': ['ALPHA', 'Beta', 'GAMMA ', 'DELTA', 'ALPHA'],
+        'Borda - Défaut': [100.0, 200.0, 150.0, np.nan, 999.0],
+        'Borda - Pau': [10.0, 20.0, 30.0, 40.0, 999.0],
+    })
+    return system
+
+
+def test_match_par_nom_puis_numero(system):
+    daily = pd.DataFrame({
+        'N°': [7, 9, 3, 4, 0],
+        'CHEVAL/MUSIQ.': ['alpha\n1a2a', 'BETA', 'GAMMA', ' DELTA', 'INCONNU'],
+        'Borda - Défaut': [-1.0, -2.0, -3.0, -4.0, -5.0],
+    })
+    result, message = system.match_horses(daily, {'date': '2026-01-16', 'hippodrome': 'deauville', 'course': 'R1C1'})
+
+    # ALPHA et Beta par nom ; 'GAMMA ' (export) et ' DELTA' (quotidien)
+    # ne sont pas retaillés : GAMMA et DELTA sont associés par numéro ;
+    # le numéro 0 n'est pas cherché
+    assert result['_has_borda'].tolist() == [True, True, True, True, False]
+    assert result['Borda - Pau'].tolist()[:4] == [10.0, 20.0, 30.0, 40.0]
+    assert np.isnan(result['Borda - Pau'][4])
+    # Remplacées pour les chevaux associés (même par NaN), conservées sinon
+    assert result['Borda - Défaut'].tolist()[:3] == [100.0, 200.0, 150.0]
+    assert np.isnan(result['Borda - Défaut'][3])
+    assert result['Borda - Défaut'][4] == -5.0
+    assert list(result.columns) == ['N°', 'CHEVAL/MUSIQ.', 'Borda - Défaut', 'Borda - Pau',
+                                    '_has_borda', '_match_quality']
+    assert message == "✅ 4/5 chevaux associés (80%)"
+
+
+def test_aucun_cheval_associe(system):
+    daily = pd.DataFrame({'N°': [5], 'CHEVAL/MUSIQ.': ['OMEGA']})
+    result, _ = system.match_horses(daily, {'date': '2026-01-16'})
+    assert result.columns.tolist() == ['N°', 'CHEVAL/MUSIQ.', '_has_borda', '_match_quality']
+    assert result['_match_quality'].tolist() == ['aucun']
@@ -3,14 +3,530 @@
 Architecture complète pour remplacer tous les CSV/JSON
 """
 
+import functools
+import hashlib
+import os
+import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from urllib.parse import quote
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import datetime, date
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterable
 import json
 
 
+def coerce_float_column(values: pd.Series) -> pd.Series:
+    """
+    Version vectorisée de safe_float pour une colonne entière
+
+    Gère les virgules françaises, les espaces et les valeurs vides ou
+    invalides (converties en NaN).
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+
+    texte = values.astype('string').str.replace(',', '.', regex=False).str.strip()
+    return pd.to_numeric(texte, errors='coerce').astype(float)
+
+
+def to_sql_values(values: Iterable) -> List:
+    """Convertit une colonne en liste Python (NaN → None) pour sqlite3"""
+    if hasattr(values, 'tolist'):
+        values = values.tolist()
+    return [None if pd.isna(v) else v for v in values]
+
+
+# Options de lecture des exports TurfBZH (format français)
+CSV_READ_OPTIONS = {'sep': ';', 'encoding': 'utf-8-sig', 'decimal': ','}
+
+# Colonnes utilisées pour découper un flux CSV en groupes complets
+DATE_COLUMNS = ('date', 'Date')
+COURSE_COLUMNS = ('Course', 'course_id', 'code_course')
+
+
+def iter_csv_courses(csv_path: str, chunksize: int = 20000, progress_callback=None):
+    """
+    Lit un CSV par morceaux bornés et produit des DataFrames ne contenant
+    que des courses complètes
+    
+    Les lignes de la dernière date (ou, sans colonne date, de la dernière
+    course) d'un morceau sont retenues et recollées au morceau suivant,
+    car elles peuvent continuer au-delà de la limite. Avec une colonne
+    date, chaque DataFrame produit correspond à une seule date.
+    
+    Args:
+        csv_path: Chemin du fichier CSV
+        chunksize: Nombre de lignes lues par morceau
+        progress_callback: Appelée avec (lignes lues, fraction du fichier)
+    
+    Yields:
+        DataFrame de courses complètes
+    """
+    
+    taille = max(os.path.getsize(csv_path), 1)
+    lignes_lues = 0
+    reste = None
+    
+    with open(csv_path, 'rb') as f, \
+            pd.read_csv(f, chunksize=chunksize, **CSV_READ_OPTIONS) as reader:
+        for chunk in reader:
+            lignes_lues += len(chunk)
+            if reste is not None:
+                chunk = pd.concat([reste, chunk], ignore_index=True)
+            
+            date_col = next((c for c in DATE_COLUMNS if c in chunk.columns), None)
+            key_col = date_col or next((c for c in COURSE_COLUMNS if c in chunk.columns), None)
+            
+            if key_col is None:
+                complet, reste = chunk, None
+            else:
+                keys = chunk[key_col]
+                differs = np.flatnonzero((keys != keys.iloc[-1]).to_numpy())
+                coupure = differs[-1] + 1 if len(differs) else 0
+                complet, reste = chunk.iloc[:coupure], chunk.iloc[coupure:]
+            
+            yield from _split_by_date(complet, date_col)
+            
+            if progress_callback is not None:
+                progress_callback(lignes_lues, min(f.tell() / taille, 1.0))
+        
+        if reste is not None:
+            yield from _split_by_date(reste, date_col)
+    
+    if progress_callback is not None:
+        progress_callback(lignes_lues, 1.0)
+
+
+def _split_by_date(df: pd.DataFrame, date_col: Optional[str]):
+    """Découpe un morceau en un DataFrame par date (ordre d'apparition)"""
+    if df.empty:
+        return
+    if date_col is None:
+        yield df
+        return
+    for _, groupe in df.groupby(date_col, sort=False, dropna=False):
+        yield groupe
+
+
+def merge_import_stats(total: Dict, partiel: Dict) -> Dict:
+    """Cumule les statistiques d'import d'un morceau dans le total"""
+    for cle, valeur in partiel.items():
+        if cle == 'errors':
+            total.setdefault('errors', []).extend(valeur)
+        elif cle in ('duree_sec', 'rows_per_sec'):
+            continue
+        elif isinstance(valeur, (int, float)):
+            total[cle] = total.get(cle, 0) + valeur
+    return total
+
+
+def prepare_import_batch(df: pd.DataFrame, date_reunion: date = None) -> Dict:
+    """
+    Prépare un export TurfBZH pour l'import en masse, sans accès à la base
+    
+    Toutes les conversions (dates, virgules françaises, types) sont faites
+    ici, colonne par colonne. Le résultat est un lot de staging composé de
+    listes Python (sérialisable, donc utilisable depuis un processus
+    séparé) à passer à TurfDatabase.write_import_batch.
+    
+    Returns:
+        Dict {'courses': [...], 'partants': {colonne: [...]}}
+    """
+    
+    if date_reunion is None:
+        date_reunion = datetime.now().date()
+    
+    df = df[df['Course'].notna()]
+    n = len(df)
+    
+    def colonne_float(nom):
+        if nom not in df.columns:
+            return [None] * n
+        return to_sql_values(coerce_float_column(df[nom]))
+    
+    def colonne_texte(nom):
+        if nom not in df.columns:
+            return [None] * n
+        return to_sql_values(df[nom])
+    
+    # ---------- Niveau course (première ligne de chaque course) ----------
+    premieres = df.drop_duplicates('Course')
+    nb_partants = df['Course'].value_counts()
+    
+    distances = (coerce_float_column(premieres['distance']).fillna(0).astype(int).tolist()
+                 if 'distance' in df.columns else [None] * len(premieres))
+    allocations = (to_sql_values(coerce_float_column(premieres['allocation']))
+                   if 'allocation' in df.columns else [None] * len(premieres))
+    
+    courses = []
+    for (_, first), distance, allocation in zip(premieres.iterrows(), distances, allocations):
+        date_course = date_reunion
+        if 'date' in df.columns and pd.notna(first['date']):
+            try:
+                date_course = pd.to_datetime(first['date']).date()
+            except:
+                pass
+        course_code = first['Course']
+        courses.append({
+            'course_code': course_code,
+            'date': date_course.isoformat(),
+            'hippodrome': first['hippodrome'],
+            'reunion_code': course_code[:2],
+            'numero_course': int(course_code[3:]),
+            'heure': to_sql_values([first['heure']])[0] if 'heure' in df.columns else None,
+            'discipline': to_sql_values([first['discipline']])[0],
+            'distance': distance,
+            'allocation': allocation,
+            'nombre_partants': int(nb_partants[course_code]),
+        })
+    
+    # ---------- Niveau partant ----------
+    ages = colonne_float('age')
+    
+    partants = {
+        'course_code': df['Course'].tolist(),
+        'cheval': df['Cheval'].tolist(),
+        'age': [int(a) if a is not None else None for a in ages],
+        'sexe': colonne_texte('Sexe'),
+        'driver': colonne_texte('Driver'),
+        'entraineur': colonne_texte('Entraineur'),
+        'numero': df['Numero'].astype(int).tolist(),
+        'cote_pmu': colonne_float('Cote'),
+        'cote_bzh': colonne_float('Cote BZH'),
+        'musique': colonne_texte('Musique'),
+        'ia_gagnant': colonne_float('IA_Gagnant'),
+        'ia_couple': colonne_float('IA_Couple'),
+        'ia_trio': colonne_float('IA_Trio'),
+        'note_ia': colonne_float('Note_IA_Decimale'),
+        'turf_points': colonne_float('Turf Points'),
+        'tpch_90': colonne_float('TPch 90'),
+        'tpj_365': colonne_float('TPJ 365'),
+    }
+    
+    return {'courses': courses, 'partants': partants}
+
+
+class EntityIdCache:
+    """
+    Cache LRU borné des ids des référentiels (clé naturelle → id)
+    
+    Un espace de noms par table ('hippodromes', 'chevaux', 'drivers',
+    'entraineurs', 'reunions'), chacun limité à `maxsize` entrées.
+    Les entrées ajoutées pendant une transaction restent « en attente »
+    jusqu'au commit et sont retirées en cas de rollback.
+    """
+    
+    def __init__(self, maxsize: int = 50000):
+        self.maxsize = maxsize
+        self._entries: Dict[str, OrderedDict] = {}
+        self._pending: List[Tuple[str, object]] = []
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+    
+    def get(self, table: str, key) -> Optional[int]:
+        """Retourne l'id en cache ou None (compte hit/miss)"""
+        entries = self._entries.get(table)
+        if entries is not None and key in entries:
+            entries.move_to_end(key)
+            self.hits[table] = self.hits.get(table, 0) + 1
+            return entries[key]
+        self.misses[table] = self.misses.get(table, 0) + 1
+        return None
+    
+    def put(self, table: str, key, row_id: int, pending: bool = False):
+        """Ajoute une entrée (en attente de commit si `pending`)"""
+        entries = self._entries.setdefault(table, OrderedDict())
+        entries[key] = row_id
+        entries.move_to_end(key)
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        if pending:
+            self._pending.append((table, key))
+    
+    def confirm(self):
+        """Appelé après un commit : les entrées en attente deviennent sûres"""
+        self._pending.clear()
+    
+    def discard_pending(self):
+        """Appelé après un rollback : retire les ids qui n'existent plus"""
+        for table, key in self._pending:
+            entries = self._entries.get(table)
+            if entries is not None:
+                entries.pop(key, None)
+        self._pending.clear()
+    
+    def clear(self, table: str = None):
+        """Vide le cache (une table ou tout)"""
+        if table is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(table, None)
+    
+    def stats(self) -> Dict:
+        """Compteurs hits/misses et taille par table"""
+        tables = sorted(set(self.hits) | set(self.misses) | set(self._entries))
+        detail = {
+            table: {
+                'hits': self.hits.get(table, 0),
+                'misses': self.misses.get(table, 0),
+                'taille': len(self._entries.get(table, ())),
+            }
+            for table in tables
+        }
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            'tables': detail,
+        }
+
+
+class StateCache:
+    """
+    Cache LRU borné et thread-safe d'états de calcul (clé → état)
+    
+    Sert aux calculs qui reprennent leur résultat précédent (ex. Borda
+    incrémental) : gardé sur la base pour survivre aux instances des
+    calculateurs, limité à `maxsize` entrées (les moins récentes sortent).
+    """
+    
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Retourne l'état en cache ou None"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+    
+    def put(self, key, state):
+        """Enregistre l'état (évince le moins récent au-delà de maxsize)"""
+        with self._lock:
+            self._entries[key] = state
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+class _CacheAwareConnection(sqlite3.Connection):
+    """Connexion SQLite qui synchronise le cache d'ids sur commit/rollback"""
+    
+    id_cache: Optional[EntityIdCache] = None
+    
+    def commit(self):
+        super().commit()
+        if self.id_cache is not None:
+            self.id_cache.confirm()
+    
+    def rollback(self):
+        super().rollback()
+        if self.id_cache is not None:
+            self.id_cache.discard_pending()
+
+
+class ConnectionManager:
+    """
+    Connexions SQLite en mode WAL : un écrivain unique sérialisé et une
+    connexion en lecture seule par thread
+    
+    En WAL, les lecteurs voient le dernier état validé pendant qu'une
+    transaction d'écriture est en cours : un import ne bloque plus les
+    pages du dashboard, et chaque thread a ses propres curseurs.
+    
+    Une base ':memory:' n'a qu'une connexion, l'écrivain : read() prend
+    alors le verrou d'écriture (les lectures attendent la fin de la
+    transaction en cours), mais reader() la renvoie telle quelle et ne
+    doit servir que depuis un seul thread.
+    """
+    
+    BUSY_TIMEOUT_MS = 30000
+    
+    def __init__(self, db_path: str, factory=sqlite3.Connection):
+        self.db_path = db_path
+        self.in_memory = db_path == ':memory:'
+        
+        self.writer = sqlite3.connect(db_path, check_same_thread=False, factory=factory)
+        self.writer.execute(f"PRAGMA busy_timeout = {self.BUSY_TIMEOUT_MS}")
+        if not self.in_memory:
+            self.writer.execute("PRAGMA journal_mode = WAL")
+        
+        # Écrivain : verrou réentrant, commit à la sortie du bloc le plus externe
+        self.write_lock = threading.RLock()
+        self._write_depth = 0
+        
+        # Lecteurs : une connexion par thread (celles des threads terminés sont fermées)
+        self._local = threading.local()
+        self._readers = {}
+        self._readers_lock = threading.Lock()
+    
+    def reader(self) -> sqlite3.Connection:
+        """Connexion en lecture seule du thread courant (l'écrivain en mémoire)"""
+        conn = getattr(self._local, 'reader', None)
+        if conn is not None:
+            return conn
+        
+        if self.in_memory:
+            # Base en mémoire : pas de seconde connexion possible
+            conn = self.writer
+        else:
+            # Autocommit : pas de BEGIN implicite qui figerait l'instantané
+            conn = sqlite3.connect(f"file:{quote(os.path.abspath(self.db_path))}?mode=ro",
+                                   uri=True, check_same_thread=False, isolation_level=None)
+            conn.execute(f"PRAGMA busy_timeout = {self.BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA query_only = ON")
+        
+        with self._readers_lock:
+            for thread in [t for t in self._readers if not t.is_alive()]:
+                ancienne = self._readers.pop(thread)
+                if ancienne is not self.writer:
+                    ancienne.close()
+            self._readers[threading.current_thread()] = conn
+        
+        self._local.reader = conn
+        return conn
+    
+    def writer_cursor(self) -> sqlite3.Cursor:
+        """Curseur de l'écrivain propre au thread courant"""
+        cursor = getattr(self._local, 'writer_cursor', None)
+        if cursor is None:
+            cursor = self._local.writer_cursor = self.writer.cursor()
+        return cursor
+    
+    def reader_cursor(self) -> 'ReadCursor':
+        """Curseur de lecture propre au thread courant (réutilisé d'un appel à l'autre)"""
+        cursor = getattr(self._local, 'reader_cursor', None)
+        if cursor is None:
+            cursor = self._local.reader_cursor = ReadCursor(self)
+        return cursor
+    
+    @contextmanager
+    def read(self):
+        """
+        Curseur de lecture (connexion du thread, jamais bloquée par
+        l'écrivain ; en mémoire, sous le verrou d'écriture)
+        """
+        with self.write_lock if self.in_memory else nullcontext():
+            cursor = self.reader().cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+    
+    @contextmanager
+    def write(self, savepoint: bool = False):
+        """
+        Curseur d'écriture sérialisé : commit en sortie du bloc le plus
+        externe, rollback si une exception sort du bloc
+        
+        Un bloc imbriqué fait partie de la transaction englobante ; avec
+        `savepoint`, une exception qui en sort n'annule que ses propres
+        écritures (SAVEPOINT), pour les appelants qui la rattrapent.
+        """
+        with self.write_lock:
+            cursor = self.writer.cursor()
+            self._write_depth += 1
+            nom = f"ecriture_{self._write_depth}" if savepoint and self._write_depth > 1 else None
+            try:
+                if nom:
+                    # Transaction explicite : le RELEASE ne doit pas la valider
+                    if not self.writer.in_transaction:
+                        cursor.execute("BEGIN")
+                    cursor.execute(f"SAVEPOINT {nom}")
+                yield cursor
+                if nom:
+                    cursor.execute(f"RELEASE {nom}")
+                elif self._write_depth == 1:
+                    self.writer.commit()
+            except:
+                if nom:
+                    cursor.execute(f"ROLLBACK TO {nom}")
+                    cursor.execute(f"RELEASE {nom}")
+                    # Ids mis en cache depuis le savepoint : peut-être annulés
+                    id_cache = getattr(self.writer, 'id_cache', None)
+                    if id_cache is not None:
+                        id_cache.discard_pending()
+                elif self._write_depth == 1:
+                    self.writer.rollback()
+                raise
+            finally:
+                self._write_depth -= 1
+                cursor.close()
+    
+    def close(self):
+        """Ferme les lecteurs puis l'écrivain"""
+        with self._readers_lock:
+            for conn in self._readers.values():
+                if conn is not self.writer:
+                    conn.close()
+            self._readers.clear()
+        self.writer.close()
+
+
+class ReadCursor:
+    """
+    Curseur de lecture (execute / fetchone / fetchall) sur le lecteur du thread
+    
+    Les lignes sont lues en entier à l'execute : aucune requête ne reste
+    ouverte sur le lecteur, qui verrait sinon un instantané figé jusqu'à la
+    requête suivante.
+    """
+    
+    def __init__(self, connections: ConnectionManager):
+        self.connections = connections
+        self.description = None
+        self._rows = deque()
+    
+    def execute(self, sql: str, parameters=()) -> 'ReadCursor':
+        with self.connections.read() as cursor:
+            cursor.execute(sql, parameters)
+            self.description = cursor.description
+            self._rows = deque(cursor.fetchall())
+        return self
+    
+    def fetchone(self):
+        return self._rows.popleft() if self._rows else None
+    
+    def fetchall(self) -> list:
+        rows, self._rows = list(self._rows), deque()
+        return rows
+    
+    def __iter__(self):
+        while self._rows:
+            yield self._rows.popleft()
+
+
+def serialized_write(method):
+    """
+    Exécute une méthode d'écriture de TurfDatabase dans un bloc
+    connections.write() : validée seule, ou avec le bloc englobant
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.connections.write():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class TurfDatabase:
     """
     Base de données SQLite complète pour le système Turf BZH
@@ -22,21 +538,509 @@ class TurfDatabase:
     - JSON des configs Borda
     """
     
-    def __init__(self, db_path: str = None):
+    # Tables dont les ids sont mis en cache par get_or_create_*
+    CACHED_TABLES = ('hippodromes', 'chevaux', 'drivers', 'entraineurs', 'reunions')
+    
+    # Tables dont le nom est indexé en plein texte ({table}_fts)
+    SEARCH_TABLES = ('chevaux', 'drivers', 'entraineurs', 'proprietaires')
+    
+    # Table de faits des partants (une ligne large par partant, rangée par
+    # date / course / numéro) : (colonne, type, expression de la jointure)
+    RUNNER_FACT_COLUMNS = (
+        ('date', 'DATE NOT NULL', 'r.date'),
+        ('course_code', 'TEXT NOT NULL', 'c.course_code'),
+        ('numero', 'INTEGER NOT NULL', 'p.numero'),
+        ('partant_id', 'INTEGER NOT NULL', 'p.id'),
+        ('course_id', 'INTEGER NOT NULL', 'c.id'),
+        ('reunion_code', 'TEXT', 'r.reunion_code'),
+        ('numero_course', 'INTEGER', 'c.numero_course'),
+        ('heure', 'TIME', 'c.heure'),
+        ('hippodrome_id', 'INTEGER', 'h.id'),
+        ('hippodrome', 'TEXT', 'h.nom'),
+        ('discipline', 'TEXT', 'c.discipline'),
+        ('distance', 'INTEGER', 'c.distance'),
+        ('allocation', 'REAL', 'c.allocation'),
+        ('nombre_partants', 'INTEGER', 'c.nombre_partants'),
+        ('cheval_id', 'INTEGER', 'ch.id'),
+        ('cheval', 'TEXT', 'ch.nom'),
+        ('age', 'INTEGER', 'ch.age'),
+        ('sexe', 'TEXT', 'ch.sexe'),
+        ('musique', 'TEXT', 'p.musique'),
+        ('driver_id', 'INTEGER', 'd.id'),
+        ('driver', 'TEXT', 'd.nom'),
+        ('entraineur_id', 'INTEGER', 'e.id'),
+        ('entraineur', 'TEXT', 'e.nom'),
+        ('cote_pmu', 'REAL', 'p.cote_pmu'),
+        ('cote_bzh', 'REAL', 'p.cote_bzh'),
+        ('elo_cheval', 'REAL', 'ch.elo'),
+        ('elo_jockey', 'REAL', 'd.elo'),
+        ('elo_entraineur', 'REAL', 'e.elo'),
+        ('ia_gagnant', 'REAL', 'p.ia_gagnant'),
+        ('ia_couple', 'REAL', 'p.ia_couple'),
+        ('ia_trio', 'REAL', 'p.ia_trio'),
+        ('ia_multi', 'REAL', 'p.ia_multi'),
+        ('note_ia', 'REAL', 'p.note_ia'),
+        ('turf_points', 'REAL', 'p.turf_points'),
+        ('tpch_90', 'REAL', 'p.tpch_90'),
+        ('tpj_365', 'REAL', 'p.tpj_365'),
+        ('tpj_90', 'REAL', 'p.tpj_90'),
+        ('non_partant', 'BOOLEAN', 'p.non_partant'),
+        ('rang_arrivee', 'INTEGER', 'p.rang_arrivee'),
+        ('rapport_simple_gagnant', 'REAL', 'p.rapport_simple_gagnant'),
+        ('rapport_simple_place', 'REAL', 'p.rapport_simple_place'),
+        # Scores de la config Borda 'default'
+        ('borda_score', 'REAL', 'bs.score_total'),
+        ('borda_rang', 'INTEGER', 'bs.rang'),
+        ('borda_details', 'TEXT', 'bs.details'),
+    )
+    
+    DEFAULT_BORDA_CONFIG = "(SELECT id FROM borda_configs WHERE config_id = 'default')"
+    
+    def __init__(self, db_path: str = None, cache_size: int = 50000,
+                 warm_cache: bool = False):
         if db_path is None:
             db_path = str(Path.home() / "bordasAnalyse" / "turf_complete.db")
         
         self.db_path = db_path
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.cursor = self.conn.cursor()
+        # Écrivain unique + lecteurs par thread, en mode WAL. L'écrivain
+        # n'est exposé qu'à travers connections.write() et les méthodes
+        # @serialized_write ; conn / cursor sont en lecture seule.
+        self.connections = ConnectionManager(db_path, factory=_CacheAwareConnection)
+        self._writer = self.connections.writer
+        
+        # Cache des ids des référentiels (invalidé sur rollback)
+        self.id_cache = EntityIdCache(cache_size)
+        self._writer.id_cache = self.id_cache
+        
+        # États des calculs incrémentaux (Borda), propres à cette base
+        self.incremental_states = StateCache()
         
         # Activer les clés étrangères
-        self.cursor.execute("PRAGMA foreign_keys = ON")
+        self._writer_cursor.execute("PRAGMA foreign_keys = ON")
         
         self._create_all_tables()
         self._create_indexes()
+        self._create_cache_triggers()
+        self._drop_ungated_triggers()
+        self._create_prediction_cache_triggers()
+        self._create_import_ledger_triggers()
+        self._create_runner_facts()
+        self._create_search_index()
+        
+        if warm_cache:
+            self.warm_id_cache()
+    
+    @property
+    def _writer_cursor(self) -> sqlite3.Cursor:
+        """Curseur de l'écrivain, propre à chaque thread (état de fetchone isolé)"""
+        return self.connections.writer_cursor()
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """
+        Connexion en lecture seule du thread (pd.read_sql_query, requêtes) ;
+        les écritures passent par connections.write()
+        """
+        return self.connections.reader()
+    
+    @property
+    def cursor(self) -> ReadCursor:
+        """Curseur en lecture seule du thread (état de fetchone isolé)"""
+        return self.connections.reader_cursor()
+    
+    def read_sql(self, query: str, params=None) -> pd.DataFrame:
+        """Requête de lecture sur la connexion en lecture seule du thread"""
+        with self.connections.read() as cursor:
+            return pd.read_sql_query(query, cursor.connection, params=params)
+    
+    def _create_cache_triggers(self):
+        """
+        Triggers temporaires : toute suppression dans un référentiel
+        vide le cache de la table concernée (ex: nettoyage d'une date)
+        """
+        self._writer.create_function(
+            "turf_cache_clear", 1,
+            lambda table: self.id_cache.clear(table),
+            deterministic=False
+        )
+        for table in self.CACHED_TABLES:
+            self._writer_cursor.execute(f"""
+                CREATE TEMP TRIGGER IF NOT EXISTS trg_cache_{table}_delete
+                AFTER DELETE ON main.{table}
+                BEGIN
+                    SELECT turf_cache_clear('{table}');
+                END
+            """)
+    
+    def _create_prediction_cache_triggers(self):
+        """
+        Triggers persistants : toute écriture dans partants ou borda_scores
+        supprime les pronostics en cache de la course concernée, quelle que
+        soit la connexion qui écrit (import, recalcul Borda, mise à jour de cote)
+        """
+        course_du_partant = "(SELECT course_id FROM partants WHERE id = {}.partant_id)"
+        cibles = {
+            'partants': ("NEW.course_id", "OLD.course_id"),
+            'borda_scores': (course_du_partant.format('NEW'), course_du_partant.format('OLD')),
+        }
+        
+        for table, (nouveau, ancien) in cibles.items():
+            for evenement, courses in (('insert', (nouveau,)),
+                                       ('update', (nouveau, ancien)),
+                                       ('delete', (ancien,))):
+                nom = f"trg_prediction_cache_{table}_{evenement}"
+                self._writer_cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {nom}
+                    AFTER {evenement.upper()} ON {table}
+                    {self._bulk_gate(nom)}
+                    BEGIN
+                        DELETE FROM prediction_cache WHERE course_id IN ({', '.join(courses)});
+                    END
+                """)
+        
+        self._writer.commit()
+    
+    def _bulk_gate(self, nom: str) -> str:
+        """Clause WHEN des triggers par partant, inactifs pendant un import en masse"""
+        if nom not in self.BULK_GATED_TRIGGERS:
+            return ''
+        return f"WHEN NOT EXISTS (SELECT 1 FROM {self.BULK_FLAG_TABLE})"
+    
+    def _drop_ungated_triggers(self):
+        """
+        Base existante : supprime les triggers par partant créés sans la
+        clause WHEN (CREATE TRIGGER IF NOT EXISTS ne les remplacerait pas)
+        """
+        for nom, sql in self._select_in_chunks(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+            list(self.BULK_GATED_TRIGGERS)
+        ):
+            if self.BULK_FLAG_TABLE not in sql:
+                self._writer_cursor.execute(f"DROP TRIGGER {nom}")
+    
+    def _create_import_ledger_triggers(self):
+        """
+        Triggers persistants : la suppression de partants ou de courses
+        (ex: nettoyage d'une date) oublie l'empreinte des courses touchées
+        et vide le journal des fichiers, qui ne sait pas quelles courses
+        chaque fichier contenait. Le fichier renvoyé est alors réimporté,
+        les courses restées intactes étant toujours ignorées par empreinte.
+        """
+        cibles = {
+            'partants': """
+                DELETE FROM import_course_hashes
+                WHERE (date, course_code) IN (
+                    SELECT r.date, c.course_code FROM courses c
+                    JOIN reunions r ON c.reunion_id = r.id
+                    WHERE c.id = OLD.course_id
+                );
+            """,
+            'courses': """
+                DELETE FROM import_course_hashes
+                WHERE course_code = OLD.course_code
+                AND date = (SELECT date FROM reunions WHERE id = OLD.reunion_id);
+            """,
+        }
+        
+        for table, corps in cibles.items():
+            self._writer_cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_import_ledger_{table}_delete
+                AFTER DELETE ON {table}
+                BEGIN
+                    {corps}
+                    DELETE FROM import_ledger;
+                END
+            """)
+        
+        self._writer.commit()
+    
+    def _runner_facts_insert(self, filtre: str) -> str:
+        """INSERT des lignes de faits des partants qui vérifient `filtre` (alias p, c, r...)"""
+        colonnes = ', '.join(colonne for colonne, _, _ in self.RUNNER_FACT_COLUMNS)
+        expressions = ', '.join(expression for _, _, expression in self.RUNNER_FACT_COLUMNS)
+        return f"""
+            INSERT INTO faits_partants ({colonnes})
+            SELECT {expressions}
+            FROM partants p
+            JOIN courses c ON p.course_id = c.id
+            JOIN reunions r ON c.reunion_id = r.id
+            JOIN hippodromes h ON r.hippodrome_id = h.id
+            JOIN chevaux ch ON p.cheval_id = ch.id
+            LEFT JOIN drivers d ON p.driver_id = d.id
+            LEFT JOIN entraineurs e ON p.entraineur_id = e.id
+            LEFT JOIN borda_scores bs ON bs.partant_id = p.id AND bs.config_id = {self.DEFAULT_BORDA_CONFIG}
+            WHERE {filtre}
+        """
+    
+    def _create_runner_facts(self):
+        """
+        Table de faits des partants : la jointure partants / courses /
+        réunions / hippodromes / chevaux / drivers / entraîneurs (+ ELO et
+        Borda 'default') matérialisée, rangée par (date, course_code,
+        numero) : les lectures d'une date ou d'une course sont des lectures
+        contiguës d'une seule table.
+        
+        Tenue à jour par triggers persistants, dans la transaction de
+        l'écriture (import, recalcul Borda, mise à jour d'ELO...) ; un
+        import en masse la reconstruit une fois par date du lot.
+        """
+        self._writer_cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'faits_partants'")
+        existe = self._writer_cursor.fetchone() is not None
+        
+        colonnes = ",\n".join(f"{colonne} {type_sql}" for colonne, type_sql, _ in self.RUNNER_FACT_COLUMNS)
+        self._writer_cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS faits_partants (
+                {colonnes},
+                PRIMARY KEY (date, course_code, numero, partant_id)
+            ) WITHOUT ROWID
+        """)
+        
+        for index_sql in (
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_faits_partants_partant ON faits_partants(partant_id)",
+            "CREATE INDEX IF NOT EXISTS idx_faits_partants_course ON faits_partants(course_id, numero)",
+            "CREATE INDEX IF NOT EXISTS idx_faits_partants_cheval ON faits_partants(cheval, date)",
+            "CREATE INDEX IF NOT EXISTS idx_faits_partants_driver ON faits_partants(driver_id)",
+            "CREATE INDEX IF NOT EXISTS idx_faits_partants_entraineur ON faits_partants(entraineur_id)",
+        ):
+            self._writer_cursor.execute(index_sql)
+        
+        defaut = self.DEFAULT_BORDA_CONFIG
+        triggers = {
+            # INSERT OR REPLACE ne déclenche pas les triggers de suppression :
+            # on retire aussi l'ancien partant au même numéro
+            ('partants', 'insert', 'INSERT'): f"""
+                DELETE FROM faits_partants WHERE course_id = NEW.course_id AND numero = NEW.numero;
+                DELETE FROM faits_partants WHERE partant_id = NEW.id;
+                {self._runner_facts_insert('p.id = NEW.id')};
+            """,
+            ('partants', 'update', 'UPDATE'): f"""
+                DELETE FROM faits_partants WHERE partant_id = OLD.id;
+                {self._runner_facts_insert('p.id = NEW.id')};
+            """,
+            ('partants', 'delete', 'DELETE'): """
+                DELETE FROM faits_partants WHERE partant_id = OLD.id;
+            """,
+            ('courses', 'update', 'UPDATE'): f"""
+                DELETE FROM faits_partants WHERE course_id = OLD.id;
+                {self._runner_facts_insert('c.id = NEW.id')};
+            """,
+            ('reunions', 'update', 'UPDATE'): f"""
+                DELETE FROM faits_partants WHERE course_id IN (SELECT id FROM courses WHERE reunion_id = OLD.id);
+                {self._runner_facts_insert('r.id = NEW.id')};
+            """,
+            ('hippodromes', 'update', 'UPDATE OF nom'): """
+                UPDATE faits_partants SET hippodrome = NEW.nom WHERE hippodrome_id = NEW.id;
+            """,
+            # Recherche par l'index (cheval, date) : pas d'index sur cheval_id
+            ('chevaux', 'update', 'UPDATE OF nom, age, sexe, elo'): """
+                UPDATE faits_partants SET cheval = NEW.nom, age = NEW.age, sexe = NEW.sexe, elo_cheval = NEW.elo
+                WHERE cheval = OLD.nom AND cheval_id = OLD.id;
+            """,
+            ('drivers', 'update', 'UPDATE OF nom, elo'): """
+                UPDATE faits_partants SET driver = NEW.nom, elo_jockey = NEW.elo WHERE driver_id = NEW.id;
+            """,
+            ('entraineurs', 'update', 'UPDATE OF nom, elo'): """
+                UPDATE faits_partants SET entraineur = NEW.nom, elo_entraineur = NEW.elo WHERE entraineur_id = NEW.id;
+            """,
+            ('borda_scores', 'insert', 'INSERT'): f"""
+                UPDATE faits_partants SET borda_score = NEW.score_total, borda_rang = NEW.rang, borda_details = NEW.details
+                WHERE partant_id = NEW.partant_id AND NEW.config_id = {defaut};
+            """,
+            ('borda_scores', 'update', 'UPDATE'): f"""
+                UPDATE faits_partants SET borda_score = NULL, borda_rang = NULL, borda_details = NULL
+                WHERE partant_id = OLD.partant_id AND OLD.config_id = {defaut};
+                UPDATE faits_partants SET borda_score = NEW.score_total, borda_rang = NEW.rang, borda_details = NEW.details
+                WHERE partant_id = NEW.partant_id AND NEW.config_id = {defaut};
+            """,
+            ('borda_scores', 'delete', 'DELETE'): f"""
+                UPDATE faits_partants SET borda_score = NULL, borda_rang = NULL, borda_details = NULL
+                WHERE partant_id = OLD.partant_id AND OLD.config_id = {defaut};
+            """,
+        }
+        
+        for (table, evenement, declencheur), corps in triggers.items():
+            nom = f"trg_faits_{table}_{evenement}"
+            self._writer_cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {nom}
+                AFTER {declencheur} ON {table}
+                {self._bulk_gate(nom)}
+                BEGIN
+                    {corps}
+                END
+            """)
+        
+        # Base existante : remplissage initial
+        if not existe:
+            self._writer_cursor.execute(self._runner_facts_insert('1 = 1'))
+        
+        self._writer.commit()
+    
+    @serialized_write
+    def rebuild_runner_facts(self, dates: List = None) -> int:
+        """
+        Reconstruit la table de faits des partants : entièrement (contrôle /
+        réparation) ou seulement pour quelques dates (import en masse)
+        
+        Returns:
+            Nombre de lignes de faits écrites
+        """
+        if dates is None:
+            self._writer_cursor.execute("DELETE FROM faits_partants")
+            self._writer_cursor.execute(self._runner_facts_insert('1 = 1'))
+            return self._writer_cursor.rowcount
+        
+        dates = list(dict.fromkeys(str(d) for d in dates))
+        nb_lignes = 0
+        for i in range(0, len(dates), self.SQL_IN_CHUNK):
+            chunk = dates[i:i + self.SQL_IN_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            self._writer_cursor.execute(f"DELETE FROM faits_partants WHERE date IN ({placeholders})", chunk)
+            self._writer_cursor.execute(self._runner_facts_insert(f"r.date IN ({placeholders})"), chunk)
+            nb_lignes += self._writer_cursor.rowcount
+        return nb_lignes
+    
+    def _create_search_index(self):
+        """
+        Index plein texte FTS5 des noms (contenu externe : seul l'index est
+        stocké), sans accents ni casse, avec index de préfixes pour la
+        recherche à la frappe ; tenu à jour par triggers persistants
+        """
+        for table in self.SEARCH_TABLES:
+            self._writer_cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (f"{table}_fts",))
+            existe = self._writer_cursor.fetchone() is not None
+            
+            self._writer_cursor.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+                    nom,
+                    content='{table}',
+                    content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                )
+            """)
+            
+            self._writer_cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_search_{table}_insert
+                AFTER INSERT ON {table}
+                BEGIN
+                    INSERT INTO {table}_fts (rowid, nom) VALUES (NEW.id, NEW.nom);
+                END
+            """)
+            self._writer_cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_search_{table}_delete
+                AFTER DELETE ON {table}
+                BEGIN
+                    INSERT INTO {table}_fts ({table}_fts, rowid, nom) VALUES ('delete', OLD.id, OLD.nom);
+                END
+            """)
+            self._writer_cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_search_{table}_update
+                AFTER UPDATE OF nom ON {table}
+                BEGIN
+                    INSERT INTO {table}_fts ({table}_fts, rowid, nom) VALUES ('delete', OLD.id, OLD.nom);
+                    INSERT INTO {table}_fts (rowid, nom) VALUES (NEW.id, NEW.nom);
+                END
+            """)
+            
+            # Base existante : indexer les noms déjà présents
+            if not existe:
+                self._writer_cursor.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+        
+        self._writer.commit()
+    
+    @staticmethod
+    def search_match(terme: str) -> Optional[str]:
+        """
+        Expression FTS5 d'une saisie utilisateur : chaque mot est un préfixe
+        (« dad co » trouve « DADDY COOL »), tous les mots sont requis
+        
+        Returns:
+            Expression pour MATCH, None si la saisie ne contient aucun mot
+        """
+        mots = re.findall(r"\w+", terme or "")
+        if not mots:
+            return None
+        return " ".join(f'"{mot}"*' for mot in mots)
+    
+    def search_names(self, table: str, terme: str, limit: int = 20) -> pd.DataFrame:
+        """
+        Recherche par nom dans un référentiel (SEARCH_TABLES), classée par
+        pertinence (bm25 : les noms les plus courts / exacts d'abord)
+        
+        Returns:
+            DataFrame (id, nom)
+        """
+        if table not in self.SEARCH_TABLES:
+            raise ValueError(f"Table non indexée: {table}")
+        
+        match = self.search_match(terme)
+        if match is None:
+            return pd.DataFrame(columns=['id', 'nom'])
+        
+        query = f"""
+            SELECT t.id, t.nom
+            FROM {table}_fts
+            JOIN {table} t ON t.id = {table}_fts.rowid
+            WHERE {table}_fts MATCH ?
+            ORDER BY {table}_fts.rank
+            LIMIT ?
+        """
+        return self.read_sql(query, params=[match, limit])
+    
+    # ==================== CACHE DES IDS ====================
+    
+    def warm_id_cache(self) -> Dict:
+        """
+        Précharge le cache avec les entités les plus récentes de la base
+        
+        Returns:
+            Dict {table: nombre d'entrées chargées}
+        """
+        limit = self.id_cache.maxsize
+        queries = {
+            'hippodromes': "SELECT nom, id FROM hippodromes ORDER BY id DESC LIMIT ?",
+            'drivers': "SELECT nom, id FROM drivers ORDER BY id DESC LIMIT ?",
+            'entraineurs': "SELECT nom, id FROM entraineurs ORDER BY id DESC LIMIT ?",
+            'chevaux': "SELECT nom, age, id FROM chevaux ORDER BY id DESC LIMIT ?",
+            'reunions': """
+                SELECT reunion_code, date, hippodrome_id, id FROM reunions
+                ORDER BY date DESC, id DESC LIMIT ?
+            """,
+        }
+        
+        # Lecteur : seulement des ids validés, pas ceux d'une écriture en cours
+        charges = {}
+        for table, query in queries.items():
+            with self.connections.read() as cursor:
+                rows = cursor.execute(query, (limit,)).fetchall()
+            # Du plus ancien au plus récent : les récents restent en tête du LRU
+            for row in reversed(rows):
+                key = row[0] if len(row) == 2 else tuple(row[:-1])
+                self.id_cache.put(table, key, row[-1])
+            charges[table] = len(rows)
+        
+        return charges
+    
+    def id_cache_stats(self) -> Dict:
+        """Compteurs hits/misses du cache des ids"""
+        return self.id_cache.stats()
+    
+    def _cache_put(self, table: str, key, row_id: int):
+        """Met en cache un id (en attente si une transaction est ouverte)"""
+        self.id_cache.put(table, key, row_id, pending=self._writer.in_transaction)
+    
+    @staticmethod
+    def _cheval_key(nom: str, age) -> Tuple:
+        """Clé naturelle d'un cheval (un âge manquant vaut NULL en base)"""
+        if age is not None and pd.isna(age):
+            age = None
+        return (nom, age)
+    
+    @staticmethod
+    def _reunion_key(reunion_code: str, date_reunion, hippodrome_id: int) -> Tuple:
+        return (reunion_code, str(date_reunion), hippodrome_id)
     
     def _create_all_tables(self):
         """Crée toutes les tables du système"""
@@ -44,7 +1048,7 @@ class TurfDatabase:
         # ==================== RÉFÉRENTIELS ====================
         
         # Table Hippodromes
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS hippodromes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 nom TEXT NOT NULL UNIQUE,
@@ -56,7 +1060,7 @@ class TurfDatabase:
         """)
         
         # Table Chevaux
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS chevaux (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 nom TEXT NOT NULL,
@@ -77,7 +1081,7 @@ class TurfDatabase:
         """)
         
         # Table Drivers (Jockeys)
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS drivers (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 nom TEXT NOT NULL UNIQUE,
@@ -95,7 +1099,7 @@ class TurfDatabase:
         """)
         
         # Table Entraîneurs
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS entraineurs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 nom TEXT NOT NULL UNIQUE,
@@ -110,7 +1114,7 @@ class TurfDatabase:
         """)
         
         # Table Propriétaires
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS proprietaires (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 nom TEXT NOT NULL UNIQUE,
@@ -122,7 +1126,7 @@ class TurfDatabase:
         # ==================== COURSES ET RÉUNIONS ====================
         
         # Table Réunions
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS reunions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 reunion_code TEXT NOT NULL,
@@ -136,7 +1140,7 @@ class TurfDatabase:
         """)
         
         # Table Courses
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS courses (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 course_code TEXT NOT NULL,
@@ -157,7 +1161,7 @@ class TurfDatabase:
         """)
         
         # Table Partants (Chevaux dans une course)
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS partants (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 course_id INTEGER NOT NULL,
@@ -208,7 +1212,7 @@ class TurfDatabase:
         """)
         
         # Table Arrivées
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS arrivees (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 course_id INTEGER NOT NULL UNIQUE,
@@ -232,7 +1236,7 @@ class TurfDatabase:
         # ==================== SYSTÈMES BORDA ====================
         
         # Table Configurations Borda
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS borda_configs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 config_id TEXT NOT NULL UNIQUE,
@@ -250,7 +1254,7 @@ class TurfDatabase:
         """)
         
         # Table Critères Borda (points par critère)
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS borda_criteres (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 config_id INTEGER NOT NULL,
@@ -262,7 +1266,7 @@ class TurfDatabase:
         """)
         
         # Table Scores Borda calculés
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS borda_scores (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 partant_id INTEGER NOT NULL,
@@ -280,7 +1284,7 @@ class TurfDatabase:
         # ==================== PRONOSTICS ====================
         
         # Table Pronostics
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS pronostics (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 course_id INTEGER NOT NULL,
@@ -297,7 +1301,7 @@ class TurfDatabase:
         # ==================== PARIS ====================
         
         # Table Paris Joués
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS paris (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 course_id INTEGER NOT NULL,
@@ -324,7 +1328,7 @@ class TurfDatabase:
         # ==================== FAVORIS ====================
         
         # Table Favoris Chevaux
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS favoris_chevaux (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 cheval_id INTEGER NOT NULL UNIQUE,
@@ -335,7 +1339,7 @@ class TurfDatabase:
         """)
         
         # Table Favoris Drivers
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS favoris_drivers (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 driver_id INTEGER NOT NULL UNIQUE,
@@ -346,7 +1350,7 @@ class TurfDatabase:
         """)
         
         # Table Favoris Entraîneurs
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS favoris_entraineurs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 entraineur_id INTEGER NOT NULL UNIQUE,
@@ -359,7 +1363,7 @@ class TurfDatabase:
         # ==================== STATISTIQUES ====================
         
         # Table Statistiques par Hippodrome
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS stats_hippodromes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 hippodrome_id INTEGER NOT NULL,
@@ -373,7 +1377,7 @@ class TurfDatabase:
         """)
         
         # Table Performance Chevaux/Drivers
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             CREATE TABLE IF NOT EXISTS synergies (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 cheval_id INTEGER NOT NULL,
@@ -387,7 +1391,63 @@ class TurfDatabase:
             )
         """)
         
-        self.conn.commit()
+        # ==================== JOURNAL DES IMPORTS ====================
+        
+        # Fichiers déjà importés (empreinte du contenu)
+        self._writer_cursor.execute("""
+            CREATE TABLE IF NOT EXISTS import_ledger (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fichier TEXT NOT NULL,
+                content_hash TEXT NOT NULL UNIQUE,
+                nb_lignes INTEGER,
+                nb_courses INTEGER,
+                nb_partants INTEGER,
+                imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Empreinte des partants de chaque course (import incrémental)
+        self._writer_cursor.execute("""
+            CREATE TABLE IF NOT EXISTS import_course_hashes (
+                date DATE NOT NULL,
+                course_code TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (date, course_code)
+            )
+        """)
+        
+        # Drapeau d'import en masse : posé et retiré dans la transaction du
+        # lot (jamais validé), il désactive les triggers par partant
+        self._writer_cursor.execute("""
+            CREATE TABLE IF NOT EXISTS import_en_masse (
+                actif INTEGER PRIMARY KEY CHECK (actif = 1)
+            )
+        """)
+        
+        # ==================== CACHE DES PRONOSTICS ====================
+        
+        # Base existante : l'ancienne clé (colonne config_override, toujours
+        # vide) est abandonnée avec son contenu, qui n'est qu'un cache
+        self._writer_cursor.execute("SELECT 1 FROM pragma_table_info('prediction_cache') WHERE name = 'config_override'")
+        if self._writer_cursor.fetchone() is not None:
+            self._writer_cursor.execute("DROP TABLE prediction_cache")
+        
+        # Classement calculé par course (JSON), invalidé par triggers
+        self._writer_cursor.execute("""
+            CREATE TABLE IF NOT EXISTS prediction_cache (
+                date DATE NOT NULL,
+                engine_version TEXT NOT NULL,
+                weights_hash TEXT NOT NULL,
+                course_code TEXT NOT NULL,
+                course_id INTEGER NOT NULL,
+                predictions TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (date, engine_version, weights_hash, course_code)
+            )
+        """)
+        
+        self._writer.commit()
     
     def _create_indexes(self):
         """Crée les index pour accélérer les recherches"""
@@ -410,6 +1470,9 @@ class TurfDatabase:
             "CREATE INDEX IF NOT EXISTS idx_borda_scores_partant ON borda_scores(partant_id)",
             "CREATE INDEX IF NOT EXISTS idx_borda_scores_config ON borda_scores(config_id)",
             
+            # Cache des pronostics (invalidation par course)
+            "CREATE INDEX IF NOT EXISTS idx_prediction_cache_course ON prediction_cache(course_id)",
+            
             # Paris
             "CREATE INDEX IF NOT EXISTS idx_paris_course ON paris(course_id)",
             "CREATE INDEX IF NOT EXISTS idx_paris_statut ON paris(statut)",
@@ -422,34 +1485,75 @@ class TurfDatabase:
         
         for index_sql in indexes:
             try:
-                self.cursor.execute(index_sql)
+                self._writer_cursor.execute(index_sql)
             except sqlite3.OperationalError:
                 pass  # Index existe déjà
         
-        self.conn.commit()
+        self._writer.commit()
     
     # ==================== IMPORT CSV COMPLET ====================
     
-    def import_from_csv(self, csv_path: str, date_reunion: date = None) -> Dict:
+    def import_from_csv(self, csv_path: str, date_reunion: date = None,
+                        bulk: bool = False, batch_size: int = 5000,
+                        stream: bool = False, chunksize: int = 20000,
+                        progress_callback=None) -> Dict:
         """
         Importe un export CSV complet dans la base de données
         
+        Args:
+            csv_path: Chemin du fichier CSV
+            date_reunion: Date par défaut si absente du CSV
+            bulk: Mode import en masse (référentiels résolus en une passe,
+                  partants insérés par lots via executemany)
+            batch_size: Taille des lots de partants en mode bulk
+            stream: Lecture par morceaux de `chunksize` lignes, commit
+                    après chaque groupe de courses complet (mémoire constante)
+            progress_callback: Appelée avec (lignes lues, fraction du fichier)
+                               en mode stream
+        
         Returns:
-            Dict avec statistiques d'import
+            Dict avec statistiques d'import (dont durée et lignes/seconde)
         """
         
         if date_reunion is None:
             date_reunion = datetime.now().date()
         
+        if stream:
+            debut = time.perf_counter()
+            stats = self._empty_import_stats()
+            for df in iter_csv_courses(csv_path, chunksize, progress_callback):
+                merge_import_stats(stats, self.import_dataframe(df, date_reunion, bulk, batch_size))
+            self._add_throughput(stats, debut)
+            return stats
+        
         # Lire le CSV avec format français (virgule comme séparateur décimal)
-        df = pd.read_csv(csv_path, sep=';', encoding='utf-8-sig', decimal=',')
+        df = pd.read_csv(csv_path, **CSV_READ_OPTIONS)
+        
+        return self.import_dataframe(df, date_reunion, bulk, batch_size)
+    
+    def import_dataframe(self, df: pd.DataFrame, date_reunion: date = None,
+                         bulk: bool = False, batch_size: int = 5000) -> Dict:
+        """
+        Importe un export TurfBZH déjà chargé (voir import_from_csv)
+        
+        Returns:
+            Dict avec statistiques d'import
+        """
+        
+        if date_reunion is None:
+            date_reunion = datetime.now().date()
+        
+        if bulk:
+            return self.import_dataframe_bulk(df, date_reunion, batch_size)
+        
+        debut = time.perf_counter()
         
         # Fonction pour convertir les nombres au format français
         def safe_float(value):
             """Convertit une valeur en float, gère virgules et valeurs manquantes"""
             if pd.isna(value):
                 return None
-            if isinstance(value, (int, float)):
+            if isinstance(value, (int, float, np.number)):
                 return float(value)
             if isinstance(value, str):
                 # Remplacer virgule par point
@@ -475,203 +1579,722 @@ class TurfDatabase:
         }
         
         try:
-            # Grouper par course
-            for course_code in df['Course'].unique():
-                course_df = df[df['Course'] == course_code]
-                
-                # Lire la date depuis le CSV (pas le paramètre)
-                if 'date' in course_df.columns and pd.notna(course_df['date'].iloc[0]):
-                    date_str = course_df['date'].iloc[0]
-                    try:
-                        date_course = pd.to_datetime(date_str).date()
-                    except:
+            # Une transaction (ou un savepoint si l'appelant en a ouvert une)
+            with self.connections.write(savepoint=True):
+                # Grouper par course
+                for course_code in df['Course'].unique():
+                    course_df = df[df['Course'] == course_code]
+                    
+                    # Lire la date depuis le CSV (pas le paramètre)
+                    if 'date' in course_df.columns and pd.notna(course_df['date'].iloc[0]):
+                        date_str = course_df['date'].iloc[0]
+                        try:
+                            date_course = pd.to_datetime(date_str).date()
+                        except:
+                            date_course = date_reunion
+                    else:
                         date_course = date_reunion
-                else:
-                    date_course = date_reunion
-                
-                # 1. Hippodrome
-                hippodrome_nom = course_df['hippodrome'].iloc[0]
-                hippodrome_id = self.get_or_create_hippodrome(hippodrome_nom)
-                
-                # 2. Réunion
-                reunion_code = course_code[:2]  # R1, R2, etc.
-                reunion_id = self.get_or_create_reunion(
-                    reunion_code, date_course, hippodrome_id
+                    
+                    # 1. Hippodrome
+                    hippodrome_nom = course_df['hippodrome'].iloc[0]
+                    hippodrome_id = self.get_or_create_hippodrome(hippodrome_nom)
+                    
+                    # 2. Réunion
+                    reunion_code = course_code[:2]  # R1, R2, etc.
+                    reunion_id = self.get_or_create_reunion(
+                        reunion_code, date_course, hippodrome_id
+                    )
+                    
+                    # 3. Course
+                    course_id = self.create_course(
+                        course_code=course_code,
+                        reunion_id=reunion_id,
+                        numero_course=int(course_code[3:]),
+                        heure=course_df['heure'].iloc[0] if 'heure' in course_df.columns else None,
+                        discipline=course_df['discipline'].iloc[0],
+                        distance=int(safe_float(course_df['distance'].iloc[0]) or 0) if 'distance' in course_df.columns else None,
+                        allocation=safe_float(course_df['allocation'].iloc[0]) if 'allocation' in course_df.columns else None,
+                        nombre_partants=len(course_df)
+                    )
+                    
+                    stats['courses'] += 1
+                    
+                    # 4. Partants
+                    for _, row in course_df.iterrows():
+                        # Cheval
+                        cheval_id = self.get_or_create_cheval(
+                            row['Cheval'],
+                            age=row.get('age'),
+                            sexe=row.get('Sexe')
+                        )
+                        stats['chevaux'] += 1
+                        
+                        # Driver
+                        driver_id = None
+                        if 'Driver' in row and pd.notna(row['Driver']):
+                            driver_id = self.get_or_create_driver(row['Driver'])
+                            stats['drivers'] += 1
+                        
+                        # Entraîneur
+                        entraineur_id = None
+                        if 'Entraineur' in row and pd.notna(row['Entraineur']):
+                            entraineur_id = self.get_or_create_entraineur(row['Entraineur'])
+                            stats['entraineurs'] += 1
+                        
+                        # Partant
+                        self.create_partant(
+                            course_id=course_id,
+                            cheval_id=cheval_id,
+                            driver_id=driver_id,
+                            entraineur_id=entraineur_id,
+                            numero=int(row['Numero']),
+                            cote_pmu=safe_float(row.get('Cote')),
+                            cote_bzh=safe_float(row.get('Cote BZH')),
+                            musique=row.get('Musique'),
+                            ia_data={
+                                'ia_gagnant': safe_float(row.get('IA_Gagnant')),
+                                'ia_couple': safe_float(row.get('IA_Couple')),
+                                'ia_trio': safe_float(row.get('IA_Trio')),
+                                'note_ia': safe_float(row.get('Note_IA_Decimale'))
+                            },
+                            performance_data={
+                                'turf_points': safe_float(row.get('Turf Points')),
+                                'tpch_90': safe_float(row.get('TPch 90')),
+                                'tpj_365': safe_float(row.get('TPJ 365'))
+                            }
+                        )
+                        stats['partants'] += 1
+            
+        except Exception as e:
+            stats['errors'].append(str(e))
+        
+        self._add_throughput(stats, debut)
+        return stats
+    
+    @staticmethod
+    def _add_throughput(stats: Dict, debut: float):
+        """Ajoute la durée et le débit (partants/seconde) aux stats d'import"""
+        duree = time.perf_counter() - debut
+        stats['duree_sec'] = round(duree, 3)
+        stats['rows_per_sec'] = round(stats['partants'] / duree, 1) if duree > 0 else 0.0
+    
+    # ==================== IMPORT EN MASSE ====================
+    
+    # PRAGMAs appliqués pendant un import en masse (restaurés ensuite)
+    BULK_PRAGMAS = {
+        'synchronous': 'NORMAL',
+        'temp_store': 'MEMORY',
+        'cache_size': -65536,  # 64 Mo
+    }
+    
+    # Nombre max de paramètres par requête IN (...)
+    SQL_IN_CHUNK = 500
+    
+    # Triggers par partant inactifs pendant l'écriture d'un lot (drapeau
+    # BULK_FLAG_TABLE) : les faits des dates du lot et le cache de ses
+    # courses sont refaits une fois
+    BULK_FLAG_TABLE = 'import_en_masse'
+    BULK_GATED_TRIGGERS = (
+        'trg_faits_partants_insert',
+        'trg_faits_partants_update',
+        'trg_prediction_cache_partants_insert',
+        'trg_prediction_cache_partants_update',
+    )
+    
+    def _apply_pragmas(self, pragmas: Dict) -> Dict:
+        """Applique des PRAGMAs et retourne les valeurs précédentes"""
+        anciennes = {}
+        for nom, valeur in pragmas.items():
+            self._writer_cursor.execute(f"PRAGMA {nom}")
+            anciennes[nom] = self._writer_cursor.fetchone()[0]
+            self._writer_cursor.execute(f"PRAGMA {nom} = {valeur}")
+        return anciennes
+    
+    @contextmanager
+    def _bulk_mode(self):
+        """
+        Pose le drapeau d'import en masse le temps d'un bloc, dans la
+        transaction de l'appelant : les autres connexions ne le voient
+        jamais et le schéma (triggers) n'est pas modifié
+        """
+        self._writer_cursor.execute(f"INSERT INTO {self.BULK_FLAG_TABLE} (actif) VALUES (1)")
+        try:
+            yield
+        finally:
+            self._writer_cursor.execute(f"DELETE FROM {self.BULK_FLAG_TABLE}")
+    
+    def _select_in_chunks(self, query: str, values: List) -> List[Tuple]:
+        """Exécute `query` (contenant {placeholders}) par paquets de valeurs"""
+        rows = []
+        for i in range(0, len(values), self.SQL_IN_CHUNK):
+            chunk = values[i:i + self.SQL_IN_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            self._writer_cursor.execute(query.format(placeholders=placeholders), chunk)
+            rows.extend(self._writer_cursor.fetchall())
+        return rows
+    
+    def _bulk_resolve_noms(self, table: str, noms: Iterable[str]) -> Dict[str, int]:
+        """
+        Résout nom → id pour une table à nom unique (hippodromes, drivers,
+        entraineurs), en créant les manquants avec un seul executemany
+        """
+        ids = {}
+        noms_a_chercher = []
+        for nom in dict.fromkeys(noms):
+            cached = self.id_cache.get(table, nom)
+            if cached is None:
+                noms_a_chercher.append(nom)
+            else:
+                ids[nom] = cached
+        
+        query = f"SELECT nom, id FROM {table} WHERE nom IN ({{placeholders}})"
+        ids.update(self._select_in_chunks(query, noms_a_chercher))
+        
+        manquants = [nom for nom in noms_a_chercher if nom not in ids]
+        if manquants:
+            if table == 'hippodromes':
+                self._writer_cursor.executemany(
+                    "INSERT INTO hippodromes (nom, pays) VALUES (?, ?)",
+                    [(nom, 'France') for nom in manquants]
                 )
-                
-                # 3. Course
-                course_id = self.create_course(
-                    course_code=course_code,
-                    reunion_id=reunion_id,
-                    numero_course=int(course_code[3:]),
-                    heure=course_df['heure'].iloc[0] if 'heure' in course_df.columns else None,
-                    discipline=course_df['discipline'].iloc[0],
-                    distance=int(safe_float(course_df['distance'].iloc[0]) or 0) if 'distance' in course_df.columns else None,
-                    allocation=safe_float(course_df['allocation'].iloc[0]) if 'allocation' in course_df.columns else None,
-                    nombre_partants=len(course_df)
+            else:
+                self._writer_cursor.executemany(
+                    f"INSERT INTO {table} (nom) VALUES (?)",
+                    [(nom,) for nom in manquants]
                 )
-                
-                stats['courses'] += 1
-                
-                # 4. Partants
-                for _, row in course_df.iterrows():
-                    # Cheval
-                    cheval_id = self.get_or_create_cheval(
-                        row['Cheval'],
-                        age=row.get('age'),
-                        sexe=row.get('Sexe')
+            ids.update(self._select_in_chunks(query, manquants))
+        
+        for nom in noms_a_chercher:
+            self._cache_put(table, nom, ids[nom])
+        
+        return ids
+    
+    def _bulk_resolve_chevaux(self, chevaux: List[Tuple]) -> Dict[Tuple, int]:
+        """
+        Résout (nom, age) → id pour les chevaux, même règle que
+        get_or_create_cheval : âge identique ou inconnu (en base ou dans le
+        fichier, ex: import JSON sans âge)
+        
+        Args:
+            chevaux: Liste de (nom, age, sexe) dans l'ordre du fichier
+        """
+        resolus = {}
+        restants = []
+        for nom, age, sexe in chevaux:
+            key = self._cheval_key(nom, age)
+            if key in resolus:
+                continue
+            cached = self.id_cache.get('chevaux', key)
+            if cached is None:
+                restants.append((nom, age, sexe))
+            else:
+                resolus[key] = cached
+        chevaux = restants
+        
+        noms = list(dict.fromkeys(nom for nom, _, _ in chevaux))
+        connus = {}
+        for cheval_id, nom, age in self._select_in_chunks(
+            "SELECT id, nom, age FROM chevaux WHERE nom IN ({placeholders}) ORDER BY id",
+            noms
+        ):
+            connus.setdefault(nom, []).append([cheval_id, age])
+        
+        def trouver(nom, age):
+            for candidat in connus.get(nom, []):
+                if age is None or candidat[1] == age or candidat[1] is None:
+                    return candidat
+            return None
+        
+        a_creer = []
+        for nom, age, sexe in chevaux:
+            if trouver(nom, age) is None:
+                # id résolu après insertion
+                connus.setdefault(nom, []).append([None, age])
+                a_creer.append((nom, age, sexe))
+        
+        if a_creer:
+            self._writer_cursor.executemany(
+                "INSERT INTO chevaux (nom, age, sexe) VALUES (?, ?, ?)",
+                a_creer
+            )
+            crees = {}
+            for cheval_id, nom, age in self._select_in_chunks(
+                "SELECT id, nom, age FROM chevaux WHERE nom IN ({placeholders}) ORDER BY id",
+                list(dict.fromkeys(nom for nom, _, _ in a_creer))
+            ):
+                crees.setdefault((nom, age), cheval_id)
+            for nom, candidats in connus.items():
+                for candidat in candidats:
+                    if candidat[0] is None:
+                        candidat[0] = crees[(nom, candidat[1])]
+        
+        for nom, age, _ in chevaux:
+            key = self._cheval_key(nom, age)
+            if key not in resolus:
+                resolus[key] = trouver(nom, age)[0]
+                self._cache_put('chevaux', key, resolus[key])
+        
+        return resolus
+    
+    def import_dataframe_bulk(self, df: pd.DataFrame, date_reunion: date = None,
+                              batch_size: int = 5000) -> Dict:
+        """
+        Import ensembliste d'un export TurfBZH déjà chargé
+        
+        Toutes les entités (hippodromes, réunions, courses, chevaux, drivers,
+        entraîneurs) sont résolues en une passe avec des dictionnaires en
+        mémoire, puis les partants sont insérés par lots de `batch_size`,
+        le tout dans une seule transaction avec des PRAGMAs adaptés.
+        
+        Returns:
+            Dict avec statistiques d'import (mêmes clés que import_from_csv)
+        """
+        
+        debut = time.perf_counter()
+        
+        try:
+            batch = prepare_import_batch(df, date_reunion)
+        except Exception as e:
+            stats = self._empty_import_stats()
+            stats['errors'].append(str(e))
+            self._add_throughput(stats, debut)
+            return stats
+        
+        stats = self.write_import_batch(batch, batch_size)
+        self._add_throughput(stats, debut)
+        return stats
+    
+    @staticmethod
+    def _empty_import_stats() -> Dict:
+        return {
+            'hippodromes': 0,
+            'courses': 0,
+            'chevaux': 0,
+            'drivers': 0,
+            'entraineurs': 0,
+            'partants': 0,
+            'errors': []
+        }
+    
+    def write_import_batch(self, batch: Dict, batch_size: int = 5000) -> Dict:
+        """
+        Écrit un lot préparé par prepare_import_batch dans la base
+        
+        Une seule transaction par lot : en cas d'erreur, rien n'est écrit.
+        Le lot peut aussi porter les rangs d'arrivée et rapports simples
+        (colonnes 'rang_arrivee', 'rapport_simple_gagnant',
+        'rapport_simple_place' des partants) et les arrivées ('arrivees'),
+        cf. import_json.
+        
+        Un partant déjà présent (même course, même numéro) est réécrit en
+        entier, sauf si le lot liste dans 'mise_a_jour' les seules colonnes
+        qu'il fournit : le partant garde alors son id et ses autres
+        colonnes (cotes BZH, IA...), et une valeur NULL du lot ne remplace
+        pas la valeur en base.
+        
+        Returns:
+            Dict avec statistiques d'import (mêmes clés que import_from_csv)
+        """
+        
+        stats = self._empty_import_stats()
+        debut = time.perf_counter()
+        courses = batch['courses']
+        p = batch['partants']
+        
+        with self.connections.write_lock:
+            # PRAGMAs non modifiables dans une transaction : seulement si le
+            # lot n'est pas écrit dans celle d'un appelant
+            anciens_pragmas = {} if self._writer.in_transaction else self._apply_pragmas(self.BULK_PRAGMAS)
+            
+            try:
+                with self.connections.write(savepoint=True):
+                    hippodrome_ids = self._bulk_resolve_noms(
+                        'hippodromes', [c['hippodrome'] for c in courses]
                     )
-                    stats['chevaux'] += 1
                     
-                    # Driver
-                    driver_id = None
-                    if 'Driver' in row and pd.notna(row['Driver']):
-                        driver_id = self.get_or_create_driver(row['Driver'])
-                        stats['drivers'] += 1
+                    # Réunions
+                    for c in courses:
+                        c['reunion_key'] = (c['reunion_code'], c['date'], hippodrome_ids[c['hippodrome']])
+                    reunion_keys = list(dict.fromkeys(c['reunion_key'] for c in courses))
+                    reunion_query = """
+                        SELECT reunion_code, date, hippodrome_id, id FROM reunions
+                        WHERE date IN ({placeholders})
+                    """
+                    dates = list(dict.fromkeys(k[1] for k in reunion_keys))
+                    reunion_ids = {tuple(r[:3]): r[3] for r in self._select_in_chunks(reunion_query, dates)}
+                    manquantes = [k for k in reunion_keys if k not in reunion_ids]
+                    if manquantes:
+                        self._writer_cursor.executemany(
+                            "INSERT INTO reunions (reunion_code, date, hippodrome_id) VALUES (?, ?, ?)",
+                            manquantes
+                        )
+                        reunion_ids = {tuple(r[:3]): r[3] for r in self._select_in_chunks(reunion_query, dates)}
                     
-                    # Entraîneur
-                    entraineur_id = None
-                    if 'Entraineur' in row and pd.notna(row['Entraineur']):
-                        entraineur_id = self.get_or_create_entraineur(row['Entraineur'])
-                        stats['entraineurs'] += 1
+                    # Courses
+                    self._writer_cursor.executemany("""
+                        INSERT OR IGNORE INTO courses 
+                        (course_code, reunion_id, numero_course, heure, discipline, distance, allocation, nombre_partants)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """, [
+                        (c['course_code'], reunion_ids[c['reunion_key']], c['numero_course'], c['heure'],
+                         c['discipline'], c['distance'], c['allocation'], c['nombre_partants'])
+                        for c in courses
+                    ])
+                    course_ids = {
+                        (code, reunion_id): course_id
+                        for code, reunion_id, course_id in self._select_in_chunks(
+                            "SELECT course_code, reunion_id, id FROM courses WHERE reunion_id IN ({placeholders})",
+                            list(dict.fromkeys(reunion_ids[c['reunion_key']] for c in courses))
+                        )
+                    }
+                    course_id_by_code = {
+                        c['course_code']: course_ids[(c['course_code'], reunion_ids[c['reunion_key']])]
+                        for c in courses
+                    }
+                    stats['courses'] = len(courses)
                     
-                    # Partant
-                    self.create_partant(
-                        course_id=course_id,
-                        cheval_id=cheval_id,
-                        driver_id=driver_id,
-                        entraineur_id=entraineur_id,
-                        numero=int(row['Numero']),
-                        cote_pmu=safe_float(row.get('Cote')),
-                        cote_bzh=safe_float(row.get('Cote BZH')),
-                        musique=row.get('Musique'),
-                        ia_data={
-                            'ia_gagnant': safe_float(row.get('IA_Gagnant')),
-                            'ia_couple': safe_float(row.get('IA_Couple')),
-                            'ia_trio': safe_float(row.get('IA_Trio')),
-                            'note_ia': safe_float(row.get('Note_IA_Decimale'))
-                        },
-                        performance_data={
-                            'turf_points': safe_float(row.get('Turf Points')),
-                            'tpch_90': safe_float(row.get('TPch 90')),
-                            'tpj_365': safe_float(row.get('TPJ 365'))
-                        }
+                    # Référentiels des partants
+                    cheval_ids = self._bulk_resolve_chevaux(list(zip(p['cheval'], p['age'], p['sexe'])))
+                    driver_ids = self._bulk_resolve_noms(
+                        'drivers', [d for d in p['driver'] if d is not None]
                     )
-                    stats['partants'] += 1
-            
-            self.conn.commit()
+                    entraineur_ids = self._bulk_resolve_noms(
+                        'entraineurs', [e for e in p['entraineur'] if e is not None]
+                    )
+                    
+                    partant_rows = list(zip(
+                        [course_id_by_code[code] for code in p['course_code']],
+                        [cheval_ids[(nom, age)] for nom, age in zip(p['cheval'], p['age'])],
+                        [driver_ids.get(d) for d in p['driver']],
+                        [entraineur_ids.get(e) for e in p['entraineur']],
+                        p['numero'],
+                        p['cote_pmu'],
+                        p['cote_bzh'],
+                        p['musique'],
+                        p['ia_gagnant'],
+                        p['ia_couple'],
+                        p['ia_trio'],
+                        p['note_ia'],
+                        p['turf_points'],
+                        p['tpch_90'],
+                        p['tpj_365'],
+                        p.get('rang_arrivee', [None] * len(p['numero'])),
+                        p.get('rapport_simple_gagnant', [None] * len(p['numero'])),
+                        p.get('rapport_simple_place', [None] * len(p['numero'])),
+                    ))
+                    
+                    partants_sql = """
+                        INSERT {conflit} INTO partants
+                        (course_id, cheval_id, driver_id, entraineur_id, numero,
+                         cote_pmu, cote_bzh, musique, ia_gagnant, ia_couple, ia_trio,
+                         note_ia, turf_points, tpch_90, tpj_365, rang_arrivee,
+                         rapport_simple_gagnant, rapport_simple_place)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """
+                    if batch.get('mise_a_jour'):
+                        partants_sql = partants_sql.format(conflit='') + (
+                            "ON CONFLICT(course_id, numero) DO UPDATE SET "
+                            + ', '.join(f"{col} = COALESCE(excluded.{col}, {col})" for col in batch['mise_a_jour'])
+                        )
+                    else:
+                        partants_sql = partants_sql.format(conflit='OR REPLACE')
+                    
+                    # Faits et cache des pronostics refaits une fois pour le lot
+                    # (et non ligne à ligne par les triggers)
+                    with self._bulk_mode():
+                        for i in range(0, len(partant_rows), batch_size):
+                            self._writer_cursor.executemany(partants_sql, partant_rows[i:i + batch_size])
+                    
+                    self.rebuild_runner_facts(dates)
+                    lot_course_ids = list(dict.fromkeys(course_id_by_code.values()))
+                    for i in range(0, len(lot_course_ids), self.SQL_IN_CHUNK):
+                        chunk = lot_course_ids[i:i + self.SQL_IN_CHUNK]
+                        self._writer_cursor.execute(
+                            f"DELETE FROM prediction_cache WHERE course_id IN ({','.join('?' * len(chunk))})", chunk
+                        )
+                    
+                    # Arrivées et rapports (import JSON)
+                    if batch.get('arrivees'):
+                        self._writer_cursor.executemany("""
+                            INSERT OR REPLACE INTO arrivees
+                            (course_id, ordre_arrivee, rapport_simple_gagnant, rapport_simple_place,
+                             rapport_couple_gagnant, rapport_trio)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                        """, [
+                            (course_id_by_code[a['course_code']], a['ordre_arrivee'],
+                             a['rapport_simple_gagnant'], a['rapport_simple_place'],
+                             a['rapport_couple_gagnant'], a['rapport_trio'])
+                            for a in batch['arrivees']
+                        ])
+                        stats['arrivees'] = len(batch['arrivees'])
+                    
+                    stats['chevaux'] = len(partant_rows)
+                    stats['drivers'] = sum(d is not None for d in p['driver'])
+                    stats['entraineurs'] = sum(e is not None for e in p['entraineur'])
+                    stats['partants'] = len(partant_rows)
+                    
+            except Exception as e:
+                stats['errors'].append(str(e))
             
-        except Exception as e:
-            self.conn.rollback()
-            stats['errors'].append(str(e))
+            finally:
+                self._apply_pragmas(anciens_pragmas)
         
+        self._add_throughput(stats, debut)
         return stats
 
+    # ==================== JOURNAL DES IMPORTS ====================
+    
+    @staticmethod
+    def file_fingerprint(csv_path: str) -> Tuple[str, int]:
+        """
+        Empreinte SHA-256 du contenu d'un fichier (lu par blocs)
+        
+        Returns:
+            Tuple (hash hexadécimal, nombre de lignes de données)
+        """
+        digest = hashlib.sha256()
+        nb_lignes = 0
+        with open(csv_path, 'rb') as f:
+            for bloc in iter(lambda: f.read(1 << 20), b''):
+                digest.update(bloc)
+                nb_lignes += bloc.count(b'\n')
+        return digest.hexdigest(), max(nb_lignes - 1, 0)
+    
+    def is_file_imported(self, content_hash: str) -> bool:
+        """Vrai si un fichier de même contenu a déjà été importé (journal validé)"""
+        with self.connections.read() as cursor:
+            cursor.execute("SELECT 1 FROM import_ledger WHERE content_hash = ?", (content_hash,))
+            return cursor.fetchone() is not None
+    
+    @serialized_write
+    def record_file_import(self, fichier: str, content_hash: str, nb_lignes: int,
+                           stats: Dict):
+        """Enregistre un fichier importé avec succès dans le journal"""
+        self._writer_cursor.execute("""
+            INSERT OR IGNORE INTO import_ledger
+            (fichier, content_hash, nb_lignes, nb_courses, nb_partants)
+            VALUES (?, ?, ?, ?, ?)
+        """, (fichier, content_hash, nb_lignes, stats.get('courses'), stats.get('partants')))
+    
+    def get_course_hash(self, date_course, course_code: str) -> Optional[str]:
+        """
+        Empreinte des partants de la course lors du dernier import, lue par
+        l'écrivain : dans la transaction de l'import appelant, elle tient
+        compte de ses propres écritures (set_course_hash, suppressions)
+        """
+        with self.connections.write() as cursor:
+            cursor.execute(
+                "SELECT content_hash FROM import_course_hashes WHERE date = ? AND course_code = ?",
+                (str(date_course), course_code)
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+    
+    @serialized_write
+    def set_course_hash(self, date_course, course_code: str, content_hash: str):
+        """Met à jour l'empreinte d'une course (dans la transaction de l'appelant s'il y en a une)"""
+        self._writer_cursor.execute("""
+            INSERT OR REPLACE INTO import_course_hashes (date, course_code, content_hash)
+            VALUES (?, ?, ?)
+        """, (str(date_course), course_code, content_hash))
+    
+    # ==================== CACHE DES PRONOSTICS ====================
+    
+    def get_cached_predictions(self, date_course, engine_version: str, weights_hash: str) -> Dict[str, str]:
+        """
+        Pronostics en cache de toutes les courses d'une date (une lecture indexée)
+        
+        Returns:
+            Dict {course_code: classement JSON}
+        """
+        with self.connections.read() as cursor:
+            cursor.execute("""
+                SELECT course_code, predictions FROM prediction_cache
+                WHERE date = ? AND engine_version = ? AND weights_hash = ?
+            """, (str(date_course), engine_version, weights_hash))
+            return dict(cursor.fetchall())
+    
+    @serialized_write
+    def store_cached_predictions(self, date_course, engine_version: str, weights_hash: str,
+                                 entries: List[Tuple]):
+        """
+        Enregistre des pronostics en cache
+        
+        Args:
+            entries: Liste de (course_code, course_id, classement JSON)
+        """
+        self._writer_cursor.executemany("""
+            INSERT OR REPLACE INTO prediction_cache
+            (date, engine_version, weights_hash, course_code, course_id, predictions)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(str(date_course), engine_version, weights_hash, course_code, course_id, predictions)
+              for course_code, course_id, predictions in entries])
+    
+    @serialized_write
+    def clear_prediction_cache(self, date_course=None) -> int:
+        """Vide le cache des pronostics (d'une date, ou entièrement)"""
+        if date_course is None:
+            self._writer_cursor.execute("DELETE FROM prediction_cache")
+        else:
+            self._writer_cursor.execute("DELETE FROM prediction_cache WHERE date = ?", (str(date_course),))
+        return self._writer_cursor.rowcount
+    
     # ==================== MÉTHODES UTILITAIRES ====================
     
+    @serialized_write
     def get_or_create_hippodrome(self, nom: str, pays: str = 'France') -> int:
         """Récupère ou crée un hippodrome"""
-        self.cursor.execute("SELECT id FROM hippodromes WHERE nom = ?", (nom,))
-        row = self.cursor.fetchone()
+        cached = self.id_cache.get('hippodromes', nom)
+        if cached is not None:
+            return cached
+        
+        self._writer_cursor.execute("SELECT id FROM hippodromes WHERE nom = ?", (nom,))
+        row = self._writer_cursor.fetchone()
         
         if row:
+            self._cache_put('hippodromes', nom, row[0])
             return row[0]
         
-        self.cursor.execute(
+        self._writer_cursor.execute(
             "INSERT INTO hippodromes (nom, pays) VALUES (?, ?)",
             (nom, pays)
         )
-        return self.cursor.lastrowid
+        self._cache_put('hippodromes', nom, self._writer_cursor.lastrowid)
+        return self._writer_cursor.lastrowid
     
+    @serialized_write
     def get_or_create_cheval(self, nom: str, age: int = None, sexe: str = None) -> int:
-        """Récupère ou crée un cheval"""
-        self.cursor.execute(
-            "SELECT id FROM chevaux WHERE nom = ? AND (age = ? OR age IS NULL)",
-            (nom, age)
+        """Récupère ou crée un cheval (un âge inconnu retrouve le cheval par son nom)"""
+        key = self._cheval_key(nom, age)
+        cached = self.id_cache.get('chevaux', key)
+        if cached is not None:
+            return cached
+        
+        self._writer_cursor.execute(
+            "SELECT id FROM chevaux WHERE nom = ? AND (age = ? OR age IS NULL OR ? IS NULL) ORDER BY id",
+            (nom, key[1], key[1])
         )
-        row = self.cursor.fetchone()
+        row = self._writer_cursor.fetchone()
         
         if row:
+            self._cache_put('chevaux', key, row[0])
             return row[0]
         
-        self.cursor.execute(
+        self._writer_cursor.execute(
             "INSERT INTO chevaux (nom, age, sexe) VALUES (?, ?, ?)",
             (nom, age, sexe)
         )
-        return self.cursor.lastrowid
+        self._cache_put('chevaux', key, self._writer_cursor.lastrowid)
+        return self._writer_cursor.lastrowid
     
+    @serialized_write
     def get_or_create_driver(self, nom: str) -> int:
         """Récupère ou crée un driver"""
-        self.cursor.execute("SELECT id FROM drivers WHERE nom = ?", (nom,))
-        row = self.cursor.fetchone()
+        cached = self.id_cache.get('drivers', nom)
+        if cached is not None:
+            return cached
+        
+        self._writer_cursor.execute("SELECT id FROM drivers WHERE nom = ?", (nom,))
+        row = self._writer_cursor.fetchone()
         
         if row:
+            self._cache_put('drivers', nom, row[0])
             return row[0]
         
-        self.cursor.execute("INSERT INTO drivers (nom) VALUES (?)", (nom,))
-        return self.cursor.lastrowid
+        self._writer_cursor.execute("INSERT INTO drivers (nom) VALUES (?)", (nom,))
+        self._cache_put('drivers', nom, self._writer_cursor.lastrowid)
+        return self._writer_cursor.lastrowid
     
+    @serialized_write
     def get_or_create_entraineur(self, nom: str) -> int:
         """Récupère ou crée un entraîneur"""
-        self.cursor.execute("SELECT id FROM entraineurs WHERE nom = ?", (nom,))
-        row = self.cursor.fetchone()
+        cached = self.id_cache.get('entraineurs', nom)
+        if cached is not None:
+            return cached
+        
+        self._writer_cursor.execute("SELECT id FROM entraineurs WHERE nom = ?", (nom,))
+        row = self._writer_cursor.fetchone()
         
         if row:
+            self._cache_put('entraineurs', nom, row[0])
             return row[0]
         
-        self.cursor.execute("INSERT INTO entraineurs (nom) VALUES (?)", (nom,))
-        return self.cursor.lastrowid
+        self._writer_cursor.execute("INSERT INTO entraineurs (nom) VALUES (?)", (nom,))
+        self._cache_put('entraineurs', nom, self._writer_cursor.lastrowid)
+        return self._writer_cursor.lastrowid
     
+    @serialized_write
     def get_or_create_reunion(self, reunion_code: str, date: date, hippodrome_id: int) -> int:
         """Récupère ou crée une réunion"""
-        self.cursor.execute(
+        key = self._reunion_key(reunion_code, date, hippodrome_id)
+        cached = self.id_cache.get('reunions', key)
+        if cached is not None:
+            return cached
+        
+        self._writer_cursor.execute(
             "SELECT id FROM reunions WHERE reunion_code = ? AND date = ? AND hippodrome_id = ?",
             (reunion_code, date, hippodrome_id)
         )
-        row = self.cursor.fetchone()
+        row = self._writer_cursor.fetchone()
         
         if row:
+            self._cache_put('reunions', key, row[0])
             return row[0]
         
-        self.cursor.execute(
+        self._writer_cursor.execute(
             "INSERT INTO reunions (reunion_code, date, hippodrome_id) VALUES (?, ?, ?)",
             (reunion_code, date, hippodrome_id)
         )
-        return self.cursor.lastrowid
+        self._cache_put('reunions', key, self._writer_cursor.lastrowid)
+        return self._writer_cursor.lastrowid
     
+    @serialized_write
     def create_course(self, course_code: str, reunion_id: int, numero_course: int,
                      heure: str = None, discipline: str = None, distance: int = None,
                      allocation: float = None, nombre_partants: int = None) -> int:
         """Crée une course"""
-        self.cursor.execute("""
+        self._writer_cursor.execute("""
             INSERT OR IGNORE INTO courses 
             (course_code, reunion_id, numero_course, heure, discipline, distance, allocation, nombre_partants)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (course_code, reunion_id, numero_course, heure, discipline, distance, allocation, nombre_partants))
         
         # CRITIQUE : Chercher avec course_code ET reunion_id
-        self.cursor.execute(
+        self._writer_cursor.execute(
             "SELECT id FROM courses WHERE course_code = ? AND reunion_id = ?", 
             (course_code, reunion_id)
         )
-        return self.cursor.fetchone()[0]
+        return self._writer_cursor.fetchone()[0]
     
+    @serialized_write
     def create_partant(self, course_id: int, cheval_id: int, numero: int,
                       driver_id: int = None, entraineur_id: int = None,
                       cote_pmu: float = None, cote_bzh: float = None,
                       musique: str = None, ia_data: Dict = None,
                       performance_data: Dict = None) -> int:
-        """Crée un partant"""
+        """
+        Crée un partant, ou met à jour sur place celui de même course et
+        même numéro : il garde son id (scores Borda, paris) et les colonnes
+        non fournies ici (rang, rapports...)
+        """
         
         ia_data = ia_data or {}
         performance_data = performance_data or {}
         
-        self.cursor.execute("""
-            INSERT OR REPLACE INTO partants
+        self._writer_cursor.execute("""
+            INSERT INTO partants
             (course_id, cheval_id, driver_id, entraineur_id, numero,
              cote_pmu, cote_bzh, musique, ia_gagnant, ia_couple, ia_trio,
              note_ia, turf_points, tpch_90, tpj_365)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(course_id, numero) DO UPDATE SET
+                cheval_id = excluded.cheval_id, driver_id = excluded.driver_id,
+                entraineur_id = excluded.entraineur_id, cote_pmu = excluded.cote_pmu,
+                cote_bzh = excluded.cote_bzh, musique = excluded.musique,
+                ia_gagnant = excluded.ia_gagnant, ia_couple = excluded.ia_couple,
+                ia_trio = excluded.ia_trio, note_ia = excluded.note_ia,
+                turf_points = excluded.turf_points, tpch_90 = excluded.tpch_90,
+                tpj_365 = excluded.tpj_365
         """, (
             course_id, cheval_id, driver_id, entraineur_id, numero,
             cote_pmu, cote_bzh, musique,
@@ -681,7 +2304,12 @@ class TurfDatabase:
             performance_data.get('tpj_365')
         ))
         
-        return self.cursor.lastrowid
+        # lastrowid n'est pas mis à jour quand le partant existait déjà
+        self._writer_cursor.execute(
+            "SELECT id FROM partants WHERE course_id = ? AND numero = ?",
+            (course_id, numero)
+        )
+        return self._writer_cursor.fetchone()[0]
     
     # ==================== REQUÊTES ====================
     
@@ -695,7 +2323,7 @@ class TurfDatabase:
             WHERE r.date = ?
             ORDER BY c.numero_course
         """
-        return pd.read_sql_query(query, self.conn, params=[date])
+        return self.read_sql(query, params=[date])
     
     def get_partants_by_course(self, course_code: str) -> pd.DataFrame:
         """Récupère tous les partants d'une course"""
@@ -713,11 +2341,11 @@ class TurfDatabase:
             WHERE c.course_code = ?
             ORDER BY p.numero
         """
-        return pd.read_sql_query(query, self.conn, params=[course_code])
+        return self.read_sql(query, params=[course_code])
     
     def close(self):
-        """Ferme la connexion"""
-        self.conn.close()
+        """Ferme les connexions"""
+        self.connections.close()
 
 
 # Instance globale
@@ -728,6 +2356,6 @@ def get_turf_database() -> TurfDatabase:
     global _db_instance
     
     if _db_instance is None:
-        _db_instance = TurfDatabase()
+        _db_instance = TurfDatabase(warm_cache=True)
     
     return _db_instance
@@ -3,9 +3,15 @@
 S'adapte automatiquement à tous les formats TurfBZH
 """
 
+import hashlib
+import os
+import numpy as np
 import pandas as pd
 from datetime import datetime, date
-from turf_database_complete import get_turf_database
+from turf_database_complete import (
+    get_turf_database, coerce_float_column, to_sql_values,
+    iter_csv_courses, merge_import_stats, CSV_READ_OPTIONS
+)
 
 
 class UniversalCSVImporter:
@@ -53,32 +59,93 @@ class UniversalCSVImporter:
             'rapport_sg': ['Rapport_SG', 'rapport_simple_gagnant']
         }
     
-    def find_column(self, df, field_name):
-        """Trouve la colonne correspondante dans le DataFrame"""
-        possible_names = self.column_mappings.get(field_name, [])
-        
-        for col_name in possible_names:
-            if col_name in df.columns:
+    # Champs convertis en float64 (logique de safe_float, vectorisée)
+    NUMERIC_FIELDS = (
+        'distance', 'allocation', 'nombre_partants', 'numero', 'age',
+        'cote_pmu', 'cote_bzh', 'ia_gagnant', 'ia_couple', 'ia_trio', 'note_ia',
+        'turf_points', 'tpch_90', 'tpj_365',
+        'elo_cheval', 'elo_jockey', 'elo_entraineur',
+        'rang_arrivee', 'rapport_sg'
+    )
+    
+    def _match_column(self, columns, field_name):
+        """Premier nom possible du champ présent dans `columns`"""
+        for col_name in self.column_mappings.get(field_name, []):
+            if col_name in columns:
                 return col_name
-        
         return None
     
+    def find_column(self, df, field_name):
+        """Trouve la colonne correspondante dans le DataFrame"""
+        return self._match_column(df.columns, field_name)
+    
     def get_value(self, row, field_name, default=None):
         """Récupère une valeur avec le bon nom de colonne"""
-        col_name = self.find_column(row.to_frame().T, field_name)
+        col_name = self._match_column(row.index, field_name)
         
-        if col_name and col_name in row.index:
+        if col_name:
             value = row[col_name]
             if pd.notna(value):
                 return value
         
         return default
     
+    def compile_schema(self, df):
+        """
+        Résout une seule fois par fichier chaque champ logique vers
+        la colonne réelle du CSV (None si absente)
+        """
+        return {field: self._match_column(df.columns, field) for field in self.column_mappings}
+    
+    def extract_columns(self, df, schema):
+        """
+        Convertit toutes les colonnes du schéma en tableaux NumPy typés
+        
+        Returns:
+            Dict champ → np.ndarray (float64 pour les champs numériques avec
+            NaN pour les manquants, object avec None pour les textes)
+        """
+        n = len(df)
+        columns = {}
+        
+        for field, col_name in schema.items():
+            if field in self.NUMERIC_FIELDS:
+                if col_name is None:
+                    columns[field] = np.full(n, np.nan)
+                else:
+                    columns[field] = coerce_float_column(df[col_name]).to_numpy(dtype=float)
+            else:
+                if col_name is None:
+                    columns[field] = np.full(n, None, dtype=object)
+                else:
+                    columns[field] = np.array(to_sql_values(df[col_name]), dtype=object)
+        
+        return columns
+    
+    def course_fingerprint(self, cols, positions):
+        """
+        Empreinte des valeurs extraites des lignes d'une course : ne dépend
+        ni des autres courses du fichier (types déduits par pandas) ni des
+        colonnes que l'import n'utilise pas
+        """
+        champs = sorted(cols)
+        lignes = [
+            tuple(self._float_at(cols[f], i) if f in self.NUMERIC_FIELDS else cols[f][i] for f in champs)
+            for i in positions
+        ]
+        return hashlib.sha1(repr((champs, lignes)).encode()).hexdigest()
+    
+    @staticmethod
+    def _float_at(array, i):
+        """Valeur float d'un tableau numérique (None si NaN)"""
+        value = array[i]
+        return None if np.isnan(value) else float(value)
+    
     def safe_float(self, value):
         """Convertit en float, gère virgules françaises"""
         if pd.isna(value):
             return None
-        if isinstance(value, (int, float)):
+        if isinstance(value, (int, float, np.number)):
             return float(value)
         if isinstance(value, str):
             value = value.replace(',', '.').strip()
@@ -108,13 +175,20 @@ class UniversalCSVImporter:
         
         return 'inconnu'
     
-    def import_csv(self, csv_path, date_reunion=None):
+    def import_csv(self, csv_path, date_reunion=None, stream=False, chunksize=20000,
+                   progress_callback=None, incremental=False, source_name=None):
         """
         Importe n'importe quel format de CSV TurfBZH
         
         Args:
             csv_path: Chemin du fichier
             date_reunion: Date par défaut si absent du CSV
+            stream: Lecture par morceaux de `chunksize` lignes, regroupées en
+                    courses complètes et commitées au fil de l'eau
+            progress_callback: Appelée avec (lignes lues, fraction du fichier)
+            incremental: Ignore un fichier déjà importé (même contenu) et ne
+                         réécrit que les courses dont les partants ont changé
+            source_name: Nom du fichier pour le journal (défaut: csv_path)
         
         Returns:
             Dict avec stats d'import
@@ -122,179 +196,226 @@ class UniversalCSVImporter:
         
         print(f"📥 Import: {csv_path}")
         
-        # Lire avec format français
-        df = pd.read_csv(csv_path, sep=';', encoding='utf-8-sig', decimal=',')
+        if incremental:
+            content_hash, nb_lignes = self.db.file_fingerprint(csv_path)
+            if self.db.is_file_imported(content_hash):
+                print("⏭️  Fichier déjà importé (contenu identique), ignoré")
+                return {'courses': 0, 'partants': 0, 'chevaux': 0,
+                        'courses_inchangees': 0, 'errors': [], 'deja_importe': True}
         
-        print(f"📊 {len(df)} lignes")
+        if stream:
+            stats = self.import_csv_stream(csv_path, date_reunion, chunksize,
+                                           progress_callback, incremental)
+        else:
+            # Lire avec format français
+            df = pd.read_csv(csv_path, **CSV_READ_OPTIONS)
+            
+            print(f"📊 {len(df)} lignes")
+            
+            # Détecter le format
+            format_type = self.detect_format(df)
+            print(f"🔍 Format détecté: {format_type}")
+            
+            if format_type == 'historique':
+                stats = self.import_historique(df)
+            else:
+                stats = self.import_standard(df, date_reunion, incremental)
+        
+        if incremental and not stats['errors']:
+            self.db.record_file_import(
+                source_name or os.path.basename(csv_path), content_hash, nb_lignes, stats
+            )
         
-        # Détecter le format
-        format_type = self.detect_format(df)
-        print(f"🔍 Format détecté: {format_type}")
+        return stats
+    
+    def import_csv_stream(self, csv_path, date_reunion=None, chunksize=20000,
+                          progress_callback=None, incremental=False):
+        """Import en flux : mémoire bornée quelle que soit la taille du fichier"""
+        
+        # Le format se détecte sur l'en-tête seul
+        header = pd.read_csv(csv_path, nrows=0, **CSV_READ_OPTIONS)
+        format_type = self.detect_format(header)
+        print(f"🔍 Format détecté: {format_type} (lecture par morceaux de {chunksize} lignes)")
         
         if format_type == 'historique':
-            return self.import_historique(df)
-        else:
-            return self.import_standard(df, date_reunion)
+            from import_historique import import_historique_csv
+            return import_historique_csv(csv_path, stream=True, chunksize=chunksize,
+                                         progress_callback=progress_callback)
+        
+        stats = {'courses': 0, 'partants': 0, 'chevaux': 0, 'courses_inchangees': 0, 'errors': []}
+        for df in iter_csv_courses(csv_path, chunksize, progress_callback):
+            merge_import_stats(stats, self.import_standard(df, date_reunion, incremental))
+        
+        return stats
     
-    def import_standard(self, df, date_reunion=None):
-        """Import format standard TurfBZH"""
+    def import_standard(self, df, date_reunion=None, incremental=False):
+        """
+        Import format standard TurfBZH
+        
+        En mode incrémental, les courses dont l'empreinte des lignes est
+        identique au dernier import sont ignorées. Les partants d'une course
+        réécrite sont mis à jour sur place (voir create_partant).
+        """
         
         stats = {
             'courses': 0,
             'partants': 0,
             'chevaux': 0,
+            'courses_inchangees': 0,
             'errors': []
         }
         
-        # Trouver la colonne course
-        course_col = self.find_column(df, 'course_code')
+        # Résolution des colonnes une fois pour tout le fichier
+        schema = self.compile_schema(df)
+        course_col = schema['course_code']
         if not course_col:
             stats['errors'].append("Colonne Course non trouvée")
             return stats
         
         try:
-            for course_code in df[course_col].unique():
-                if pd.isna(course_code):
-                    continue
+            # Une transaction pour tout le fichier (commit à la sortie du bloc)
+            with self.db.connections.write() as cursor:
+                cols = self.extract_columns(df, schema)
                 
-                course_df = df[df[course_col] == course_code]
+                # Positions des lignes de chaque course (ordre d'apparition)
+                course_codes = cols['course_code']
+                course_rows = {}
+                for i, code in enumerate(course_codes):
+                    if code is not None:
+                        course_rows.setdefault(code, []).append(i)
                 
-                # Date
-                date_col = self.find_column(course_df, 'date')
-                if date_col and pd.notna(course_df[date_col].iloc[0]):
-                    date_str = course_df[date_col].iloc[0]
-                    try:
-                        date_course = pd.to_datetime(date_str).date()
-                    except:
-                        date_course = date_reunion or datetime.now().date()
-                else:
+                for course_code, positions in course_rows.items():
+                    first = positions[0]
+                    
+                    # Date
                     date_course = date_reunion or datetime.now().date()
-                
-                # Hippodrome
-                hippo_col = self.find_column(course_df, 'hippodrome')
-                hippodrome_nom = course_df[hippo_col].iloc[0] if hippo_col else "Inconnu"
-                hippodrome_id = self.db.get_or_create_hippodrome(hippodrome_nom)
-                
-                # Réunion
-                reunion_code = course_code[:2]
-                reunion_id = self.db.get_or_create_reunion(
-                    reunion_code, date_course, hippodrome_id
-                )
-                
-                # Course
-                disc_col = self.find_column(course_df, 'discipline')
-                discipline = course_df[disc_col].iloc[0] if disc_col else None
-                
-                dist_col = self.find_column(course_df, 'distance')
-                distance = None
-                if dist_col:
-                    distance = int(self.safe_float(course_df[dist_col].iloc[0]) or 0)
-                
-                alloc_col = self.find_column(course_df, 'allocation')
-                allocation = None
-                if alloc_col:
-                    allocation = self.safe_float(course_df[alloc_col].iloc[0])
-                
-                heure_col = self.find_column(course_df, 'heure')
-                heure = course_df[heure_col].iloc[0] if heure_col else None
-                
-                course_id = self.db.create_course(
-                    course_code=course_code,
-                    reunion_id=reunion_id,
-                    numero_course=int(course_code[3:]) if len(course_code) > 3 else 1,
-                    heure=heure,
-                    discipline=discipline,
-                    distance=distance,
-                    allocation=allocation,
-                    nombre_partants=len(course_df)
-                )
-                
-                stats['courses'] += 1
-                
-                # Partants
-                for idx, (_, row) in enumerate(course_df.iterrows()):
-                    # Cheval
-                    cheval_nom = self.get_value(row, 'cheval')
-                    if pd.isna(cheval_nom):
-                        continue
+                    if cols['date'][first] is not None:
+                        try:
+                            date_course = pd.to_datetime(cols['date'][first]).date()
+                        except:
+                            pass
                     
-                    if idx == 0:  # Log premier partant
-                        print(f"      🐴 Création partants pour {course_code}...")
+                    # Course inchangée depuis le dernier import : rien à réécrire
+                    if incremental:
+                        course_hash = self.course_fingerprint(cols, positions)
+                        if self.db.get_course_hash(date_course, course_code) == course_hash:
+                            stats['courses_inchangees'] += 1
+                            continue
                     
-                    age = self.get_value(row, 'age')
-                    sexe = self.get_value(row, 'sexe')
+                    # Hippodrome
+                    hippodrome_nom = cols['hippodrome'][first] if schema['hippodrome'] else "Inconnu"
+                    hippodrome_id = self.db.get_or_create_hippodrome(hippodrome_nom)
                     
-                    cheval_id = self.db.get_or_create_cheval(
-                        cheval_nom,
-                        age=int(age) if age and pd.notna(age) else None,
-                        sexe=sexe
+                    # Réunion
+                    reunion_code = course_code[:2]
+                    reunion_id = self.db.get_or_create_reunion(
+                        reunion_code, date_course, hippodrome_id
                     )
-                    stats['chevaux'] += 1
-                    
-                    # Driver
-                    driver_nom = self.get_value(row, 'driver')
-                    driver_id = None
-                    if driver_nom:
-                        driver_id = self.db.get_or_create_driver(driver_nom)
-                    
-                    # Entraîneur
-                    entraineur_nom = self.get_value(row, 'entraineur')
-                    entraineur_id = None
-                    if entraineur_nom:
-                        entraineur_id = self.db.get_or_create_entraineur(entraineur_nom)
-                    
-                    # Numéro
-                    numero = self.get_value(row, 'numero', 0)
                     
-                    # Rang (si disponible)
-                    rang = self.get_value(row, 'rang_arrivee')
-                    if rang:
-                        try:
-                            rang = int(rang)
-                        except:
-                            rang = None
+                    # Course
+                    distance = None
+                    if schema['distance']:
+                        distance = int(self._float_at(cols['distance'], first) or 0)
                     
-                    # Créer partant
-                    partant_id = self.db.create_partant(
-                        course_id=course_id,
-                        cheval_id=cheval_id,
-                        driver_id=driver_id,
-                        entraineur_id=entraineur_id,
-                        numero=int(numero),
-                        cote_pmu=self.safe_float(self.get_value(row, 'cote_pmu')),
-                        cote_bzh=self.safe_float(self.get_value(row, 'cote_bzh')),
-                        musique=self.get_value(row, 'musique'),
-                        ia_data={
-                            'ia_gagnant': self.safe_float(self.get_value(row, 'ia_gagnant')),
-                            'ia_couple': self.safe_float(self.get_value(row, 'ia_couple')),
-                            'ia_trio': self.safe_float(self.get_value(row, 'ia_trio')),
-                            'note_ia': self.safe_float(self.get_value(row, 'note_ia'))
-                        },
-                        performance_data={
-                            'turf_points': self.safe_float(self.get_value(row, 'turf_points')),
-                            'tpch_90': self.safe_float(self.get_value(row, 'tpch_90')),
-                            'tpj_365': self.safe_float(self.get_value(row, 'tpj_365'))
-                        }
+                    course_id = self.db.create_course(
+                        course_code=course_code,
+                        reunion_id=reunion_id,
+                        numero_course=int(course_code[3:]) if len(course_code) > 3 else 1,
+                        heure=cols['heure'][first],
+                        discipline=cols['discipline'][first],
+                        distance=distance,
+                        allocation=self._float_at(cols['allocation'], first),
+                        nombre_partants=len(positions)
                     )
                     
-                    # Mettre à jour le rang si disponible
-                    if rang:
-                        self.db.cursor.execute(
-                            "UPDATE partants SET rang_arrivee = ? WHERE id = ?",
-                            (rang, partant_id)
+                    stats['courses'] += 1
+                    
+                    # Partants
+                    for idx, i in enumerate(positions):
+                        # Cheval
+                        cheval_nom = cols['cheval'][i]
+                        if cheval_nom is None:
+                            continue
+                        
+                        if idx == 0:  # Log premier partant
+                            print(f"      🐴 Création partants pour {course_code}...")
+                        
+                        age = self._float_at(cols['age'], i)
+                        
+                        cheval_id = self.db.get_or_create_cheval(
+                            cheval_nom,
+                            age=int(age) if age else None,
+                            sexe=cols['sexe'][i]
+                        )
+                        stats['chevaux'] += 1
+                        
+                        # Driver
+                        driver_nom = cols['driver'][i]
+                        driver_id = None
+                        if driver_nom:
+                            driver_id = self.db.get_or_create_driver(driver_nom)
+                        
+                        # Entraîneur
+                        entraineur_nom = cols['entraineur'][i]
+                        entraineur_id = None
+                        if entraineur_nom:
+                            entraineur_id = self.db.get_or_create_entraineur(entraineur_nom)
+                        
+                        # Numéro
+                        numero = self._float_at(cols['numero'], i) or 0
+                        
+                        # Rang (si disponible)
+                        rang = self._float_at(cols['rang_arrivee'], i)
+                        rang = int(rang) if rang else None
+                        
+                        # Créer partant
+                        partant_id = self.db.create_partant(
+                            course_id=course_id,
+                            cheval_id=cheval_id,
+                            driver_id=driver_id,
+                            entraineur_id=entraineur_id,
+                            numero=int(numero),
+                            cote_pmu=self._float_at(cols['cote_pmu'], i),
+                            cote_bzh=self._float_at(cols['cote_bzh'], i),
+                            musique=cols['musique'][i],
+                            ia_data={
+                                'ia_gagnant': self._float_at(cols['ia_gagnant'], i),
+                                'ia_couple': self._float_at(cols['ia_couple'], i),
+                                'ia_trio': self._float_at(cols['ia_trio'], i),
+                                'note_ia': self._float_at(cols['note_ia'], i)
+                            },
+                            performance_data={
+                                'turf_points': self._float_at(cols['turf_points'], i),
+                                'tpch_90': self._float_at(cols['tpch_90'], i),
+                                'tpj_365': self._float_at(cols['tpj_365'], i)
+                            }
                         )
+                        
+                        # Mettre à jour le rang si disponible
+                        if rang:
+                            cursor.execute(
+                                "UPDATE partants SET rang_arrivee = ? WHERE id = ?",
+                                (rang, partant_id)
+                            )
+                        
+                        stats['partants'] += 1
                     
-                    stats['partants'] += 1
+                    if incremental:
+                        self.db.set_course_hash(date_course, course_code, course_hash)
+                    
+                    if stats['partants'] % 100 == 0:  # Log tous les 100 partants
+                        print(f"      📊 {stats['partants']} partants créés...")
                 
-                if stats['partants'] % 100 == 0:  # Log tous les 100 partants
-                    print(f"      📊 {stats['partants']} partants créés...")
+                print(f"   💾 Commit des données...")
             
-            print(f"   💾 Commit des données...")
-            self.db.conn.commit()
             print(f"   ✅ Commit réussi - {stats['courses']} courses, {stats['partants']} partants")
-            
+            if stats['courses_inchangees']:
+                print(f"   ⏭️  {stats['courses_inchangees']} courses inchangées ignorées")
+
+            cache_stats = self.db.id_cache_stats()
+            print(f"   🗂️  Cache ids: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+
         except Exception as e:
-            self.db.conn.rollback()
             stats['errors'].append(str(e))
             import traceback
             traceback.print_exc()
@@ -318,10 +439,13 @@ class UniversalCSVImporter:
         return stats
 
 
-def import_any_csv(csv_path, date_reunion=None):
+def import_any_csv(csv_path, date_reunion=None, stream=False, progress_callback=None,
+                   incremental=False, source_name=None):
     """Fonction utilitaire pour import universel"""
     importer = UniversalCSVImporter()
-    return importer.import_csv(csv_path, date_reunion)
+    return importer.import_csv(csv_path, date_reunion, stream=stream,
+                               progress_callback=progress_callback,
+                               incremental=incremental, source_name=source_name)
 
 
 if __name__ == "__main__":